@@ -4,6 +4,9 @@ from .config import SECRET_KEY
 from app.routes import register_blueprints
 from app.utils.keep_alive import keep_db_alive  # ✅ this still works
 from app.database import SessionLocal
+from app.utils.email_utils import mailer
+from app.utils.notifications import notifications
+from app.utils.reminders import reminders
 from sqlalchemy import text
 import asyncio
 
@@ -32,7 +35,8 @@ def create_app():
         app,
         allow_origin=["https://pathsix-crm.vercel.app", "https://test-crm-six.vercel.app", "https://test-crm-virid.vercel.app", "http://localhost:5173"],
         allow_credentials=True,
-        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"]
+        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        expose_headers=["X-Search-Incomplete"]
     )
 
     app.config.from_pyfile("config.py")
@@ -43,5 +47,15 @@ def create_app():
     async def startup():
         await warmup_db()
         app.add_background_task(keep_db_alive)
+        await mailer.start()
+        await notifications.start()
+        await reminders.start()
+
+    # Let queued notifications and mail go out before the worker exits
+    @app.after_serving
+    async def shutdown():
+        await reminders.stop()
+        await notifications.stop()
+        await mailer.stop()
 
     return app
@@ -28,3 +28,7 @@ PROJECT_STATUS_OPTIONS = ["pending", "won", "lost"]
 
 # Account statuses
 ACCOUNT_STATUS_OPTIONS = ["active", "inactive", "closed"]
+
+
+# How imports treat rows that match an existing lead/client
+IMPORT_DUPLICATE_POLICIES = ["skip", "update", "flag"]
\ No newline at end of file
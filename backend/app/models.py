@@ -2,7 +2,7 @@ from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKe
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
-from sqlalchemy import Enum, Index, UniqueConstraint, JSON
+from sqlalchemy import Enum, Index, UniqueConstraint, JSON, event, DDL
 import enum
 
 # Association table for many-to-many User ↔ Role
@@ -50,11 +50,11 @@ class Client(Base):
     __tablename__ = 'clients'
     id = Column(Integer, primary_key=True, index=True)
     tenant_id = Column(Integer, nullable=False)
-    created_by = Column(Integer, ForeignKey('users.id'), nullable=False)
+    created_by = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
     updated_by = Column(Integer, ForeignKey('users.id'), nullable=True)
     updated_at = Column(DateTime, onupdate=datetime.utcnow)
     deleted_by = Column(Integer, ForeignKey('users.id'), nullable=True)
-    assigned_to = Column(Integer, ForeignKey('users.id'), nullable=True)
+    assigned_to = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)
     name = Column(String(100), nullable=False)
     contact_person = Column(String(100))
     contact_title = Column(String(100))
@@ -103,12 +103,12 @@ class Lead(Base):
     __tablename__ = 'leads'
     id = Column(Integer, primary_key=True)
     tenant_id = Column(Integer, nullable=False)
-    created_by = Column(Integer, ForeignKey('users.id'), nullable=False)
+    created_by = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
     updated_by = Column(Integer, ForeignKey('users.id'), nullable=True)
     updated_at = Column(DateTime, onupdate=datetime.utcnow)
     deleted_at = Column(DateTime, nullable=True)
     deleted_by = Column(Integer, ForeignKey('users.id'), nullable=True)
-    assigned_to = Column(Integer, ForeignKey('users.id'), nullable=True)
+    assigned_to = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)
     name = Column(String(100), nullable=False)
     contact_person = Column(String(100))
     contact_title = Column(String(100))
@@ -142,7 +142,7 @@ class Contact(Base):
     tenant_id = Column(Integer, nullable=False, index=True)
 
     client_id = Column(Integer, ForeignKey('clients.id'), nullable=True)
-    lead_id = Column(Integer, ForeignKey('leads.id'), nullable=True)
+    lead_id = Column(Integer, ForeignKey('leads.id'), nullable=True, index=True)
 
     first_name = Column(String(100))
     last_name = Column(String(100))
@@ -166,8 +166,8 @@ class Project(Base):
     __tablename__ = 'projects'
 
     id = Column(Integer, primary_key=True)
-    lead_id = Column(Integer, ForeignKey('leads.id'), nullable=True)
-    client_id = Column(Integer, ForeignKey('clients.id'), nullable=True)
+    lead_id = Column(Integer, ForeignKey('leads.id'), nullable=True, index=True)
+    client_id = Column(Integer, ForeignKey('clients.id'), nullable=True, index=True)
     tenant_id = Column(Integer, nullable=False)
     project_name = Column(String(255), nullable=False)
     project_description = Column(Text, nullable=True)
@@ -183,7 +183,7 @@ class Project(Base):
     project_end = Column(DateTime, nullable=True)
     project_worth = Column(Float, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
-    created_by = Column(Integer, ForeignKey('users.id'), nullable=False)
+    created_by = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
     updated_at = Column(DateTime, onupdate=datetime.utcnow)
     last_updated_by = Column(Integer, ForeignKey('users.id'), nullable=True)
 
@@ -199,9 +199,9 @@ class Interaction(Base):
     __tablename__ = 'interactions'
 
     id = Column(Integer, primary_key=True)
-    lead_id = Column(Integer, ForeignKey('leads.id'), nullable=True)
-    client_id = Column(Integer, ForeignKey('clients.id'), nullable=True)
-    project_id = Column(Integer, ForeignKey('projects.id'), nullable=True)  # 🆕 NEW FIELD
+    lead_id = Column(Integer, ForeignKey('leads.id'), nullable=True, index=True)
+    client_id = Column(Integer, ForeignKey('clients.id'), nullable=True, index=True)
+    project_id = Column(Integer, ForeignKey('projects.id'), nullable=True, index=True)  # 🆕 NEW FIELD
     tenant_id = Column(Integer, nullable=False)
     contact_person = Column(String)
     email = Column(String)
@@ -212,12 +212,21 @@ class Interaction(Base):
     follow_up = Column(DateTime, nullable=True)
     followup_status = Column(Enum(FollowUpStatus), default=FollowUpStatus.pending, nullable=False)
     summary = Column(String(255))
+    # Copies of the parent client / lead / project owners, kept current by
+    # access_utils.sync_interaction_owners so visibility checks need no join
+    owner_created_by = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)
+    owner_assigned_to = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)
 
     # Relationships
     lead = relationship("Lead", backref="interactions")
     client = relationship("Client", backref="interactions")
     project = relationship("Project", backref="interactions")  # 🆕 NEW RELATIONSHIP
 
+    __table_args__ = (
+        # Range scans over pending follow-ups (reminder scheduler, calendar feeds)
+        Index('idx_interactions_followup_due', 'followup_status', 'follow_up'),
+    )
+
     def __repr__(self):
         return f"<Interaction {self.id} on {self.contact_date}>"
     
@@ -253,7 +262,7 @@ class ChatMessage(Base):
     recipient_id = Column(Integer, ForeignKey('users.id'), nullable=True)  # null for room chats
     room = Column(String(100), nullable=True)  # null for direct messages
     client_id = Column(Integer, ForeignKey('clients.id'), nullable=True)
-    lead_id = Column(Integer, ForeignKey('leads.id'), nullable=True)
+    lead_id = Column(Integer, ForeignKey('leads.id'), nullable=True, index=True)
     content = Column(Text, nullable=False)
     is_read = Column(Boolean, default=False)
     timestamp = Column(DateTime, default=datetime.utcnow, index=True)
@@ -304,4 +313,113 @@ class UserPreference(Base):
     )
 
     def __repr__(self):
-        return f"<UserPreference user_id={self.user_id} {self.category}.{self.preference_key}>"
\ No newline at end of file
+        return f"<UserPreference user_id={self.user_id} {self.category}.{self.preference_key}>"
+
+class SearchDocument(Base):
+    """
+    One row per searchable record, maintained by app.utils.search_index.
+    The full-text index lives outside the mapped columns: a generated
+    tsvector column with a GIN index on PostgreSQL, an FTS5 table kept in
+    step by triggers on SQLite.
+    """
+    __tablename__ = 'search_documents'
+
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(Integer, nullable=False, index=True)
+    entity_type = Column(String(20), nullable=False)  # "client", "lead", "project", "account", "user"
+    entity_id = Column(Integer, nullable=False)
+    name = Column(String(255))
+    body = Column(Text)  # contact details, descriptions
+    notes = Column(Text)
+    link = Column(String(255))
+    # Owners of the record (or of its client, for accounts) for visibility filtering
+    owner_created_by = Column(Integer, nullable=True)
+    owner_assigned_to = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint('entity_type', 'entity_id', name='uq_search_documents_entity'),
+    )
+
+    def __repr__(self):
+        return f"<SearchDocument {self.entity_type} {self.entity_id}>"
+
+
+class PhoneIndexEntry(Base):
+    """
+    Normalized phone digits -> the record carrying that number, maintained
+    by app.utils.phone_index for reverse ("who is calling") lookups.
+    """
+    __tablename__ = 'phone_index'
+
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(Integer, nullable=False)
+    digits = Column(String(15), nullable=False)  # last 10 digits for US numbers
+    phone = Column(String(32))  # as stored on the record
+    entity_type = Column(String(20), nullable=False)  # "client", "lead", "contact", "project", "interaction"
+    entity_id = Column(Integer, nullable=False)
+    name = Column(String(255))
+    link = Column(String(255))
+    owner_created_by = Column(Integer, nullable=True)
+    owner_assigned_to = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index('ix_phone_index_tenant_digits', 'tenant_id', 'digits'),
+        Index('ix_phone_index_entity', 'entity_type', 'entity_id'),
+    )
+
+    def __repr__(self):
+        return f"<PhoneIndexEntry {self.digits} {self.entity_type} {self.entity_id}>"
+
+
+class BackfillCheckpoint(Base):
+    """
+    Progress of a batched data backfill (app.utils.backfill), committed with
+    each batch so an interrupted run resumes after the last finished batch.
+    """
+    __tablename__ = 'backfill_checkpoints'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False, unique=True)
+    last_id = Column(Integer, nullable=False, default=0)  # highest primary key done
+    processed = Column(Integer, nullable=False, default=0)  # rows walked
+    changed = Column(Integer, nullable=False, default=0)  # rows rewritten
+    status = Column(String(20), nullable=False, default="running")  # "running", "paused", "completed", "failed"
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<BackfillCheckpoint {self.name} {self.status} {self.last_id}>"
+
+
+SEARCH_DOCUMENT_TSVECTOR = """
+ALTER TABLE search_documents ADD COLUMN document tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple', regexp_replace(coalesce(name, ''), '[^[:alnum:]]+', ' ', 'g')), 'A') ||
+    setweight(to_tsvector('simple', regexp_replace(coalesce(body, ''), '[^[:alnum:]]+', ' ', 'g')), 'B') ||
+    setweight(to_tsvector('simple', regexp_replace(coalesce(notes, ''), '[^[:alnum:]]+', ' ', 'g')), 'C')
+) STORED
+"""
+SEARCH_DOCUMENT_GIN = "CREATE INDEX ix_search_documents_document ON search_documents USING GIN (document)"
+
+SEARCH_DOCUMENT_FTS5 = [
+    "CREATE VIRTUAL TABLE search_documents_fts USING fts5("
+    "name, body, notes, content='search_documents', content_rowid='id')",
+    "CREATE TRIGGER search_documents_ai AFTER INSERT ON search_documents BEGIN "
+    "INSERT INTO search_documents_fts(rowid, name, body, notes) VALUES (new.id, new.name, new.body, new.notes); END",
+    "CREATE TRIGGER search_documents_ad AFTER DELETE ON search_documents BEGIN "
+    "INSERT INTO search_documents_fts(search_documents_fts, rowid, name, body, notes) "
+    "VALUES ('delete', old.id, old.name, old.body, old.notes); END",
+    "CREATE TRIGGER search_documents_au AFTER UPDATE ON search_documents BEGIN "
+    "INSERT INTO search_documents_fts(search_documents_fts, rowid, name, body, notes) "
+    "VALUES ('delete', old.id, old.name, old.body, old.notes); "
+    "INSERT INTO search_documents_fts(rowid, name, body, notes) VALUES (new.id, new.name, new.body, new.notes); END",
+]
+
+# create_all() gets the same full-text structures the migration creates
+for statement in [SEARCH_DOCUMENT_TSVECTOR, SEARCH_DOCUMENT_GIN]:
+    event.listen(SearchDocument.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in SEARCH_DOCUMENT_FTS5:
+    event.listen(SearchDocument.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(SearchDocument.__table__, "before_drop",
+             DDL("DROP TABLE IF EXISTS search_documents_fts").execute_if(dialect="sqlite"))
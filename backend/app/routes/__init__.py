@@ -13,6 +13,8 @@ from app.routes.utils import utils_bp
 from app.routes.contacts import contacts_bp
 from app.routes.imports import imports_bp
 from app.routes.user_preferences import preferences_bp
+from app.routes.exports import exports_bp
+from app.routes.dedup import dedup_bp
 
 def register_blueprints(app):
     app.register_blueprint(auth_bp)
@@ -28,4 +30,6 @@ def register_blueprints(app):
     app.register_blueprint(utils_bp)
     app.register_blueprint(contacts_bp)
     app.register_blueprint(imports_bp)
-    app.register_blueprint(preferences_bp)
\ No newline at end of file
+    app.register_blueprint(preferences_bp)
+    app.register_blueprint(exports_bp)
+    app.register_blueprint(dedup_bp)
\ No newline at end of file
@@ -1,12 +1,16 @@
 from quart import Blueprint, request, jsonify
 from datetime import datetime
-from app.models import Client, ActivityLog, ActivityType, User
+from app.models import Client, Interaction, ActivityLog, ActivityType, User
 from app.database import SessionLocal
 from app.utils.auth_utils import requires_auth
-from app.utils.email_utils import send_assignment_notification
+from app.utils.notifications import assignment_event, publish_after_commit
+from app.utils.calendar_feed import calendar_feeds
+from app.utils.bulk_utils import CLIENT_BULK, BulkError, run_bulk
+from app.utils.access_utils import sync_interaction_owners
+from app.utils.user_lookup import user_ids
 from app.utils.phone_utils import clean_phone_number
 from app.constants import TYPE_OPTIONS, PHONE_LABELS
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, false
 from sqlalchemy.orm import joinedload
 
 clients_bp = Blueprint("clients", __name__, url_prefix="/api/clients")
@@ -220,6 +224,7 @@ async def update_client(client_id):
         client.updated_at = datetime.utcnow()
 
         session.commit()
+        calendar_feeds.invalidate(user.tenant_id)
         session.refresh(client)
         return jsonify({"id": client.id})
     finally:
@@ -286,20 +291,52 @@ async def assign_client(client_id):
         client.assigned_to = assigned_to
         client.updated_by = user.id
         client.updated_at = datetime.utcnow()
+        sync_interaction_owners(session, Interaction.client_id == client.id, parent=Client)
 
-        await send_assignment_notification(
-            to_email=assigned_user.email,
+        # Email the assigned user once the assignment is committed
+        publish_after_commit(session, assignment_event(
+            tenant_id=user.tenant_id,
+            recipient_email=assigned_user.email,
             entity_type="client",
             entity_name=client.name,
+            entity_id=client.id,
             assigned_by=user.email
-        )
+        ))
 
         session.commit()
+        # Ownership decides whose follow-up feed the interactions land in
+        calendar_feeds.invalidate(user.tenant_id)
         return jsonify({"message": "Client assigned successfully"})
     finally:
         session.close()
 
 
+@clients_bp.route("/bulk", methods=["POST"])
+@requires_auth()
+async def bulk_update_clients():
+    """
+    Apply one action to many clients in a single UPDATE.
+
+    Body: {"action": "assign" | "status" | "type" | "delete" | "restore",
+            "value": <user id, status or type; omitted for delete/restore>,
+            "ids": [1, 2, ...]  or  "filter": {"status": "open", "city": "Tulsa", ...}}
+    Returns the updated ids and, for id lists, "updated" / "skipped" per id.
+    """
+    user = request.user
+    data = await request.get_json()
+    session = SessionLocal()
+    try:
+        result = run_bulk(session, CLIENT_BULK, user, data or {})
+        session.commit()
+        calendar_feeds.invalidate(user.tenant_id)
+        return jsonify(result)
+    except BulkError as e:
+        session.rollback()
+        return jsonify({"error": str(e)}), e.status
+    finally:
+        session.close()
+
+
 @clients_bp.route("/all", methods=["GET"])
 @requires_auth(roles=["admin"])
 async def list_all_clients():
@@ -326,12 +363,11 @@ async def list_all_clients():
 
         # Filter by user if specified
         if user_email:
-            query = query.filter(
-                or_(
-                    Client.assigned_user.has(User.email == user_email),
-                    Client.created_by_user.has(User.email == user_email)
-                )
-            )
+            owner_id = user_ids.resolve(session, user.tenant_id, user_email)
+            if owner_id is None:
+                query = query.filter(false())
+            else:
+                query = query.filter(or_(Client.assigned_to == owner_id, Client.created_by == owner_id))
 
         # Apply sorting
         if sort_order == "newest":
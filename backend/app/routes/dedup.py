@@ -0,0 +1,84 @@
+from quart import Blueprint, request, jsonify
+from app.utils.auth_utils import requires_auth
+from app.utils.background_jobs import jobs
+from app.utils.fuzzy_dedup import DEDUP_MIN_SCORE, dedup_results, run_dedup_scan
+
+dedup_bp = Blueprint("dedup", __name__, url_prefix="/api/dedup")
+
+DEDUP_ENTITY_TYPES = ["client", "lead", "contact"]
+
+
+@dedup_bp.route("/scan", methods=["POST"])
+@requires_auth(roles=["admin"])
+async def start_dedup_scan():
+    """
+    Start a fuzzy duplicate scan of the tenant's leads, clients and contacts.
+    Poll /api/dedup/jobs/<job_id>; results are read from /api/dedup/pairs.
+    """
+    user = request.user
+    data = await request.get_json(silent=True) or {}
+    try:
+        min_score = float(data.get("min_score", DEDUP_MIN_SCORE))
+    except (TypeError, ValueError):
+        return jsonify({"error": "min_score must be a number"}), 400
+
+    running = [job for job in jobs.list(user.tenant_id, kind="dedup_scan") if not job.finished]
+    if running:
+        return jsonify({"error": "A duplicate scan is already running", "job_id": running[0].id}), 409
+
+    job = jobs.submit("dedup_scan", user.tenant_id, user.id, run_dedup_scan, min_score=min_score)
+    return jsonify({
+        "message": "Duplicate scan started",
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/dedup/jobs/{job.id}"
+    }), 202
+
+
+@dedup_bp.route("/jobs/<job_id>", methods=["GET"])
+@requires_auth(roles=["admin"])
+async def get_dedup_job(job_id):
+    user = request.user
+    job = jobs.get(job_id, user.tenant_id)
+    if not job or job.kind != "dedup_scan":
+        return jsonify({"error": "Scan job not found"}), 404
+
+    response = jsonify(job.to_dict())
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+@dedup_bp.route("/pairs", methods=["GET"])
+@requires_auth(roles=["admin"])
+async def list_duplicate_pairs():
+    """
+    Likely duplicates from the latest scan, best first.
+    Optional: min_score, type (pairs involving that entity type), page, per_page.
+    """
+    user = request.user
+    result = dedup_results.get(user.tenant_id)
+    if result is None:
+        return jsonify({"error": "No duplicate scan has run yet. POST /api/dedup/scan first."}), 404
+
+    min_score = request.args.get("min_score", result["min_score"], type=float)
+    entity_type = request.args.get("type")
+    if entity_type and entity_type not in DEDUP_ENTITY_TYPES:
+        return jsonify({"error": f"type must be one of {DEDUP_ENTITY_TYPES}"}), 400
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = min(max(request.args.get("per_page", 50, type=int), 1), 500)
+
+    pairs = [
+        pair for pair in result["pairs"]
+        if pair["score"] >= min_score
+        and (not entity_type or entity_type in (pair["a"]["type"], pair["b"]["type"]))
+    ]
+    response = jsonify({
+        "pairs": pairs[(page - 1) * per_page:page * per_page],
+        "total": len(pairs),
+        "page": page,
+        "per_page": per_page,
+        "records": result["records"],
+        "scanned_at": result["scanned_at"],
+    })
+    response.headers["Cache-Control"] = "no-store"
+    return response
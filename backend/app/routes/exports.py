@@ -0,0 +1,73 @@
+from quart import Blueprint, Response, request, jsonify
+import asyncio
+from datetime import datetime, timedelta
+from app.utils.auth_utils import requires_auth
+from app.utils.export_utils import (
+    EXPORTS, COLUMNAR_FORMATS, stream_csv, write_columnar, stream_file
+)
+
+exports_bp = Blueprint("exports", __name__, url_prefix="/api/export")
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    return datetime.fromisoformat(value)
+
+
+@exports_bp.route("/<entity>", methods=["GET"])
+@requires_auth()
+async def export_entity(entity):
+    """
+    Stream every record of one entity type the user can see.
+    Supported: leads, clients, projects, interactions, accounts, contacts, activity.
+    Non-admins get the same rows their list views show; admins get the whole tenant.
+
+    Query params:
+      format - csv (default), or parquet / arrow for leads, projects,
+               interactions and activity (typed columns for analytics)
+      start, end - ISO dates; end is inclusive when given as a plain date
+    """
+    user = request.user
+    spec = EXPORTS.get(entity)
+    if not spec:
+        return jsonify({"error": f"Unknown export type. Use one of {list(EXPORTS)}"}), 404
+
+    file_format = request.args.get("format", "csv").lower()
+    if file_format != "csv" and file_format not in COLUMNAR_FORMATS:
+        return jsonify({"error": f"format must be one of {['csv'] + list(COLUMNAR_FORMATS)}"}), 400
+    if file_format != "csv" and not spec.columnar:
+        return jsonify({"error": f"{entity} can only be exported as csv"}), 400
+
+    try:
+        start = _parse_date(request.args.get("start"))
+        end_arg = request.args.get("end")
+        end = _parse_date(end_arg)
+        if end is not None and len(end_arg) == 10:
+            end += timedelta(days=1)
+    except ValueError:
+        return jsonify({"error": "start and end must be ISO dates (YYYY-MM-DD)"}), 400
+
+    stmt = spec.query(user, start=start, end=end)
+    stamp = datetime.utcnow().strftime('%Y%m%d')
+
+    if file_format == "csv":
+        response = Response(
+            stream_csv(spec.headers, stmt),
+            mimetype="text/csv",
+            headers={"Content-Disposition": f"attachment; filename={entity}_{stamp}.csv"}
+        )
+    else:
+        # Columnar files need their footer written before the first byte can go out
+        path = await asyncio.to_thread(write_columnar, spec, stmt, file_format)
+        extension, mimetype = COLUMNAR_FORMATS[file_format]
+        response = Response(
+            stream_file(path),
+            mimetype=mimetype,
+            headers={"Content-Disposition": f"attachment; filename={entity}_{stamp}{extension}"}
+        )
+
+    response.headers["Cache-Control"] = "no-store"
+    # Rows are sent as they are read; don't let a proxy buffer the whole file
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
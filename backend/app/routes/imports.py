@@ -1,46 +1,54 @@
 from quart import Blueprint, request, jsonify
-from datetime import datetime
+import asyncio
 import pandas as pd
 import io
-from app.models import Lead, User
+from app.models import User
 from app.database import SessionLocal
 from app.utils.auth_utils import requires_auth
-from app.utils.email_utils import send_assignment_notification
-from app.utils.import_utils import map_lead_data
+from app.utils.background_jobs import jobs
+from app.utils.import_utils import SUPPORTED_IMPORT_EXTENSIONS
+from app.utils.import_engine import run_import, dry_run_import
+from app.utils.import_specs import IMPORT_SPECS
+from app.constants import IMPORT_DUPLICATE_POLICIES
 
 # Change to a separate blueprint to avoid conflicts
 imports_bp = Blueprint("imports", __name__, url_prefix="/api/import")
 
 
-@imports_bp.route("/leads", methods=["POST"])
+@imports_bp.route("/<entity>", methods=["POST"])
 @requires_auth(roles=["admin"])
-async def import_leads():
+async def import_records(entity):
     """
-    Import leads from CSV/Excel file and assign to a specific user.
-    Expected CSV columns: OWNER_NAME, PLANT_NAME, ADDRESS, CITY, STATE, PHONE, 
+    Import leads, clients, contacts, projects, accounts or interactions from a
+    CSV/Excel file. Accepted columns per entity are defined in import_specs.py;
+    GET /api/import/<entity>/template returns an example file.
+    Lead files use the vendor columns: OWNER_NAME, PLANT_NAME, ADDRESS, CITY, STATE, PHONE,
                          SIC_DESC, CONTACT TITLE, CONTACT FIRST NAME, CONTACT LAST NAME, CONTACT EMAIL
+
+    The file is processed by a background job; poll /api/import/jobs/<job_id> for progress.
+    assigned_user_email is required for leads and clients (the new owner) and
+    optional for projects (created on that user's behalf).
+    Optional duplicate_policy (skip | update | flag) decides what happens to lead/client
+    rows matching an existing lead or client by name+city, phone or email.
+    With dry_run=true nothing is written; the response reports validation
+    issue counts and sample rows instead.
     """
     user = request.user
+    spec = IMPORT_SPECS.get(entity)
+    if not spec:
+        return jsonify({"error": f"Unknown import type. Use one of {list(IMPORT_SPECS)}"}), 404
+
     session = SessionLocal()
     
     try:
         # Get form data
         form = await request.form
         assigned_user_email = form.get('assigned_user_email')
+        duplicate_policy = form.get('duplicate_policy', IMPORT_DUPLICATE_POLICIES[0])
         
-        if not assigned_user_email:
-            return jsonify({"error": "assigned_user_email is required"}), 400
-        
-        # Validate that the assigned user exists and is active
-        assigned_user = session.query(User).filter(
-            User.email == assigned_user_email,
-            User.tenant_id == user.tenant_id,
-            User.is_active == True
-        ).first()
-        
-        if not assigned_user:
-            return jsonify({"error": f"User with email {assigned_user_email} not found or inactive"}), 400
-        
+        if duplicate_policy not in IMPORT_DUPLICATE_POLICIES:
+            return jsonify({"error": f"duplicate_policy must be one of {IMPORT_DUPLICATE_POLICIES}"}), 400
+
         # Get the uploaded file
         files = await request.files
         if 'file' not in files:
@@ -49,125 +57,117 @@ async def import_leads():
         file = files['file']
         if file.filename == '':
             return jsonify({"error": "No file selected"}), 400
+
+        if not file.filename.endswith(SUPPORTED_IMPORT_EXTENSIONS):
+            return jsonify({"error": "Unsupported file format. Please upload CSV or Excel file."}), 400
         
         # Read file content
         file_content = file.read()
-        
-        # Determine file type and parse accordingly
-        if file.filename.endswith('.xlsx'):
-            # Parse Excel file
-            df = pd.read_excel(io.BytesIO(file_content))
-        elif file.filename.endswith('.csv'):
-            # Parse CSV file
-            df = pd.read_csv(io.StringIO(file_content.decode('utf-8')))
-        else:
-            return jsonify({"error": "Unsupported file format. Please upload CSV or Excel file."}), 400
-        
-        # Clean column names (remove extra spaces)
-        df.columns = df.columns.str.strip()
-        
-        # Validate required columns
-        required_columns = ['PLANT_NAME']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            return jsonify({"error": f"Missing required columns: {missing_columns}"}), 400
-        
-        successful_imports = 0
-        failed_imports = []
-        
-        for index, row in df.iterrows():
+
+        if form.get('dry_run', '').lower() in ('1', 'true', 'yes'):
+            # Validate only: cheap enough to answer inline, off the event loop
             try:
-                # Use utility function to map and validate data
-                lead_data = map_lead_data(row)
-                
-                # Create the lead with validated data
-                lead = Lead(
-                    tenant_id=user.tenant_id,
-                    created_by=user.id,  # Admin who imported
-                    assigned_to=assigned_user.id,  # User it's assigned to
-                    name=lead_data['name'] or f"Plant {index + 1}",
-                    contact_person=lead_data['contact_person'],
-                    contact_title=lead_data['contact_title'],
-                    email=lead_data['email'],
-                    phone=lead_data['phone'],
-                    phone_label=lead_data['phone_label'],
-                    address=lead_data['address'],
-                    city=lead_data['city'],
-                    state=lead_data['state'],
-                    zip=lead_data['zip'],
-                    notes=lead_data['notes'],
-                    type=lead_data['type'],
-                    lead_status=lead_data['lead_status'],
-                    created_at=datetime.utcnow()
+                report = await asyncio.to_thread(
+                    dry_run_import, spec, file.filename, file_content, user.tenant_id, user.id
                 )
-                
-                session.add(lead)
-                successful_imports += 1
-                
-            except Exception as e:
-                failed_imports.append({
-                    "row": index + 1,
-                    "plant_name": str(row.get('PLANT_NAME', 'Unknown')),
-                    "error": str(e)
-                })
-                continue
-        
-        # Commit all successful imports
-        if successful_imports > 0:
-            session.commit()
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            return jsonify(report), 200
+
+        if spec.assignable and not assigned_user_email:
+            return jsonify({"error": "assigned_user_email is required"}), 400
+
+        assigned_user = None
+        if assigned_user_email:
+            # Validate that the assigned user exists and is active
+            assigned_user = session.query(User).filter(
+                User.email == assigned_user_email,
+                User.tenant_id == user.tenant_id,
+                User.is_active == True
+            ).first()
             
-            # Send notification email to assigned user
-            try:
-                await send_assignment_notification(
-                    to_email=assigned_user.email,
-                    entity_type="leads",
-                    entity_name=f"{successful_imports} imported leads",
-                    assigned_by=user.email
-                )
-            except Exception as email_error:
-                # Don't fail the import if email fails
-                print(f"Failed to send email notification: {email_error}")
-        
-        response_data = {
-            "message": f"Import completed. {successful_imports} leads imported successfully.",
-            "successful_imports": successful_imports,
-            "failed_imports": len(failed_imports),
-            "failures": failed_imports[:10] if failed_imports else []  # Limit to first 10 failures
-        }
-        
-        if failed_imports:
-            response_data["message"] += f" {len(failed_imports)} imports failed."
-        
-        return jsonify(response_data), 200
+            if not assigned_user:
+                return jsonify({"error": f"User with email {assigned_user_email} not found or inactive"}), 400
+        
+        job = jobs.submit(
+            f"{spec.entity_type}_import",
+            user.tenant_id,
+            user.id,
+            run_import,
+            spec=spec,
+            filename=file.filename,
+            content=file_content,
+            imported_by_email=user.email,
+            assigned_user_id=assigned_user.id if assigned_user else None,
+            assigned_user_email=assigned_user.email if assigned_user else None,
+            duplicate_policy=duplicate_policy
+        )
+
+        return jsonify({
+            "message": "Import started",
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/api/import/jobs/{job.id}"
+        }), 202
         
     except Exception as e:
-        session.rollback()
         return jsonify({"error": f"Import failed: {str(e)}"}), 500
     finally:
         session.close()
 
 
-@imports_bp.route("/leads/template", methods=["GET"])
+@imports_bp.route("/jobs", methods=["GET"])
+@requires_auth(roles=["admin"])
+async def list_import_jobs():
+    user = request.user
+    response = jsonify([job.to_dict() for job in jobs.list(user.tenant_id)])
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+@imports_bp.route("/jobs/<job_id>", methods=["GET"])
 @requires_auth(roles=["admin"])
-async def download_import_template():
+async def get_import_job(job_id):
     """
-    Provide a CSV template for lead imports
+    Report rows processed, failures and ETA for an import job
     """
-    template_data = {
-        "OWNER_NAME": ["Example Company LLC"],
-        "PLANT_NAME": ["Example Plant Name"],
-        "ADDRESS": ["123 Main Street"],
-        "CITY": ["Anytown"],
-        "STATE": ["Kansas"],
-        "PHONE": ["316-555-1234"],
-        "SIC_DESC": ["Food Processing"],
-        "CONTACT TITLE": ["Plant Manager"],
-        "CONTACT FIRST NAME": ["John"],
-        "CONTACT LAST NAME": ["Doe"],
-        "CONTACT EMAIL": ["john.doe@example.com"]
-    }
-    
-    df = pd.DataFrame(template_data)
+    user = request.user
+    job = jobs.get(job_id, user.tenant_id)
+    if not job:
+        return jsonify({"error": "Import job not found"}), 404
+
+    response = jsonify(job.to_dict())
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+@imports_bp.route("/jobs/<job_id>/cancel", methods=["POST"])
+@requires_auth(roles=["admin"])
+async def cancel_import_job(job_id):
+    """
+    Stop an import job after its current chunk. Rows already committed are kept.
+    """
+    user = request.user
+    job = jobs.cancel(job_id, user.tenant_id)
+    if not job:
+        return jsonify({"error": "Import job not found"}), 404
+    if job.finished:
+        return jsonify({"error": f"Import job already {job.status}"}), 409
+
+    return jsonify({"message": "Cancellation requested", "job_id": job.id, "status": job.status})
+
+
+@imports_bp.route("/<entity>/template", methods=["GET"])
+@requires_auth(roles=["admin"])
+async def download_import_template(entity):
+    """
+    Provide a CSV template for an import type
+    """
+    spec = IMPORT_SPECS.get(entity)
+    if not spec:
+        return jsonify({"error": f"Unknown import type. Use one of {list(IMPORT_SPECS)}"}), 404
+
+    df = pd.DataFrame(spec.template_columns())
     
     # Convert to CSV
     output = io.StringIO()
@@ -178,7 +178,7 @@ async def download_import_template():
     return Response(
         csv_content,
         mimetype='text/csv',
-        headers={"Content-Disposition": "attachment; filename=lead_import_template.csv"}
+        headers={"Content-Disposition": f"attachment; filename={spec.entity_type}_import_template.csv"}
     )
 
 @imports_bp.route("/test", methods=["GET"])
@@ -1,12 +1,19 @@
-from quart import Blueprint, request, jsonify, Response
+from quart import Blueprint, request, jsonify, Response, current_app
 from datetime import datetime
 from sqlalchemy.orm import joinedload
-from sqlalchemy import or_, and_, func
-from icalendar import Calendar, Event
+from sqlalchemy import or_, and_, false, func
 
 from app.models import Interaction, Client, Lead, Project, FollowUpStatus, User, ActivityLog, ActivityType
 from app.database import SessionLocal
 from app.utils.auth_utils import requires_auth
+from app.utils.access_utils import is_admin, interaction_filter, can_access_interaction, interaction_owner_values
+from app.utils.reminders import reminders
+from app.utils.lead_conversion import move_lead_records
+from app.utils.user_lookup import user_ids
+from app.utils.calendar_feed import (
+    calendar_feeds, follow_up_query, build_event, new_calendar, generate_feed_token,
+    load_feed_token, token_matches_user, http_date, not_modified
+)
 
 interactions_bp = Blueprint("interactions", __name__, url_prefix="/api/interactions")
 
@@ -41,36 +48,9 @@ async def list_interactions():
         ).filter(Interaction.tenant_id == user.tenant_id)
 
         # Apply entity-based access control
-        if not any(role.name == "admin" for role in user.roles):
-            query = query.filter(
-                or_(
-                    # Client interactions - user has access to client
-                    and_(
-                        Interaction.client_id != None,
-                        Interaction.client.has(
-                            or_(
-                                Client.created_by == user.id,
-                                Client.assigned_to == user.id
-                            )
-                        )
-                    ),
-                    # Lead interactions - user has access to lead
-                    and_(
-                        Interaction.lead_id != None,
-                        Interaction.lead.has(
-                            or_(
-                                Lead.created_by == user.id,
-                                Lead.assigned_to == user.id
-                            )
-                        )
-                    ),
-                    # Project interactions - user created the project
-                    and_(
-                        Interaction.project_id != None,
-                        Interaction.project.has(Project.created_by == user.id)
-                    )
-                )
-            )
+        access = interaction_filter(user)
+        if access is not None:
+            query = query.filter(access)
 
         # Apply entity-specific filters
         if client_id:
@@ -246,11 +226,14 @@ async def create_interaction():
             follow_up=datetime.fromisoformat(data["follow_up"]) if data.get("follow_up") else None,
             contact_person=data.get("contact_person"),
             email=data.get("email"),
-            phone=data.get("phone")
+            phone=data.get("phone"),
+            **interaction_owner_values(entity)
         )
         session.add(interaction)
         session.commit()
+        calendar_feeds.invalidate(user.tenant_id)
         session.refresh(interaction)
+        reminders.schedule(interaction.id, interaction.follow_up, interaction.followup_status)
 
         return jsonify({"id": interaction.id}), 201
     finally:
@@ -264,11 +247,7 @@ async def update_interaction(interaction_id):
     user = request.user
     session = SessionLocal()
     try:
-        interaction = session.query(Interaction).options(
-            joinedload(Interaction.client),
-            joinedload(Interaction.lead),
-            joinedload(Interaction.project)  # NEW: Load project
-        ).filter(
+        interaction = session.query(Interaction).filter(
             Interaction.id == interaction_id,
             Interaction.tenant_id == user.tenant_id
         ).first()
@@ -276,18 +255,8 @@ async def update_interaction(interaction_id):
         if not interaction:
             return jsonify({"error": "Interaction not found"}), 404
 
-        # Validate user has access to the associated entity
-        if not any(role.name == "admin" for role in user.roles):
-            has_access = False
-            if interaction.client_id:
-                has_access = interaction.client.created_by == user.id or interaction.client.assigned_to == user.id
-            elif interaction.lead_id:
-                has_access = interaction.lead.created_by == user.id or interaction.lead.assigned_to == user.id
-            elif interaction.project_id:  # NEW: Project access check
-                has_access = interaction.project.created_by == user.id
-                
-            if not has_access:
-                return jsonify({"error": "Access denied"}), 403
+        if not can_access_interaction(user, interaction):
+            return jsonify({"error": "Access denied"}), 403
 
         for field in [
             "contact_date", "summary", "outcome",
@@ -300,7 +269,9 @@ async def update_interaction(interaction_id):
                     setattr(interaction, field, data[field] or None)
 
         session.commit()
+        calendar_feeds.invalidate(user.tenant_id)
         session.refresh(interaction)
+        reminders.schedule(interaction.id, interaction.follow_up, interaction.followup_status)
         return jsonify({"id": interaction.id})
     finally:
         session.close()
@@ -312,11 +283,7 @@ async def delete_interaction(interaction_id):
     user = request.user
     session = SessionLocal()
     try:
-        interaction = session.query(Interaction).options(
-            joinedload(Interaction.client),
-            joinedload(Interaction.lead),
-            joinedload(Interaction.project)  # NEW: Load project
-        ).filter(
+        interaction = session.query(Interaction).filter(
             Interaction.id == interaction_id,
             Interaction.tenant_id == user.tenant_id
         ).first()
@@ -324,21 +291,13 @@ async def delete_interaction(interaction_id):
         if not interaction:
             return jsonify({"error": "Interaction not found"}), 404
 
-        # Validate user has access to delete
-        if not any(role.name == "admin" for role in user.roles):
-            has_access = False
-            if interaction.client_id:
-                has_access = interaction.client.created_by == user.id or interaction.client.assigned_to == user.id
-            elif interaction.lead_id:
-                has_access = interaction.lead.created_by == user.id or interaction.lead.assigned_to == user.id
-            elif interaction.project_id:  # NEW: Project access check
-                has_access = interaction.project.created_by == user.id
-                
-            if not has_access:
-                return jsonify({"error": "Access denied"}), 403
+        if not can_access_interaction(user, interaction):
+            return jsonify({"error": "Access denied"}), 403
 
         session.delete(interaction)
         session.commit()
+        calendar_feeds.invalidate(user.tenant_id)
+        reminders.cancel(interaction_id)
         return jsonify({"message": "Interaction deleted"})
     finally:
         session.close()
@@ -357,20 +316,16 @@ async def transfer_interactions():
 
     session = SessionLocal()
     try:
-        interactions = session.query(Interaction).filter(
-            Interaction.tenant_id == user.tenant_id,
-            Interaction.lead_id == from_lead_id
-        ).all()
-
-        for interaction in interactions:
-            interaction.lead_id = None
-            interaction.client_id = to_client_id
-
+        moved = move_lead_records(
+            session, user.tenant_id, from_lead_id, to_client_id,
+            models={"interactions": Interaction}
+        )
         session.commit()
+        calendar_feeds.invalidate(user.tenant_id)
 
         return jsonify({
             "success": True,
-            "transferred": len(interactions)
+            "transferred": moved["interactions"]
         })
     finally:
         session.close()
@@ -380,91 +335,97 @@ async def transfer_interactions():
 async def get_interaction_ics(interaction_id):
     session = SessionLocal()
     try:
-        interaction = session.query(Interaction).options(
-            joinedload(Interaction.client),
-            joinedload(Interaction.lead),
-            joinedload(Interaction.project)  # NEW: Load project
-        ).filter(
-            Interaction.id == interaction_id
+        row = session.execute(
+            follow_up_query().where(Interaction.id == interaction_id)
         ).first()
 
-        if not interaction:
+        if not row:
             return Response("Interaction not found", status=404)
 
-        if not interaction.follow_up:
+        if not row.follow_up:
             return Response("This interaction has no follow-up date", status=400)
 
-        cal = Calendar()
-        cal.add("prodid", "-//PathSix CRM//EN")
-        cal.add("version", "2.0")
-
-        # Determine entity name for calendar event
-        entity_name = (
-            interaction.client.name if interaction.client else
-            interaction.lead.name if interaction.lead else
-            interaction.project.project_name if interaction.project else  # NEW: Project name
-            "CRM Entity"
-        )
-
-        contact_name = (
-            interaction.contact_person or
-            (interaction.client.contact_person if interaction.client else None) or
-            (interaction.lead.contact_person if interaction.lead else None) or
-            (interaction.project.primary_contact_name if interaction.project else None) or  # NEW: Project contact
-            "Contact"
-        )
-
-        event = Event()
-        event.add("summary", f"Follow-up: {entity_name} - {contact_name}")
-        event.add("dtstart", interaction.follow_up)
-        event.add("dtend", interaction.follow_up)
-        event.add("dtstamp", interaction.contact_date)
-        event.add("description", f"Outcome: {interaction.outcome or ''}\nNotes: {interaction.notes or ''}")
-        
-        # Build location string with contact info
-        location_parts = []
-        if interaction.phone or (interaction.client and interaction.client.phone) or (interaction.lead and interaction.lead.phone) or (interaction.project and interaction.project.primary_contact_phone):
-            phone = (interaction.phone or 
-                    (interaction.client.phone if interaction.client else None) or
-                    (interaction.lead.phone if interaction.lead else None) or
-                    (interaction.project.primary_contact_phone if interaction.project else None))
-            location_parts.append(f"Phone: {phone}")
-            
-        if interaction.email or (interaction.client and interaction.client.email) or (interaction.lead and interaction.lead.email) or (interaction.project and interaction.project.primary_contact_email):
-            email = (interaction.email or 
-                    (interaction.client.email if interaction.client else None) or
-                    (interaction.lead.email if interaction.lead else None) or
-                    (interaction.project.primary_contact_email if interaction.project else None))
-            location_parts.append(f"Email: {email}")
-            
-        event.add("location", "\n".join(location_parts))
-        event["uid"] = f"interaction-{interaction.id}@pathsixcrm"
-
-        cal.add_component(event)
+        cal = new_calendar()
+        cal.add_component(build_event(row))
         ics_content = cal.to_ical()
 
         return Response(
             ics_content,
             content_type="text/calendar",
             headers={
-                "Content-Disposition": f"attachment; filename=interaction-{interaction.id}.ics"
+                "Content-Disposition": f"attachment; filename=interaction-{row.id}.ics"
             }
         )
     finally:
         session.close()
 
 
+@interactions_bp.route("/calendar/feed-urls", methods=["GET"])
+@requires_auth()
+async def get_calendar_feed_urls():
+    """
+    Subscription URLs for the user's follow-up feed (and the team feed for admins).
+    The URLs stop working when the user's password changes.
+    """
+    user = request.user
+    secret_key = current_app.config["SECRET_KEY"]
+    base_url = request.host_url.rstrip("/") + interactions_bp.url_prefix
+
+    urls = {"user": f"{base_url}/feed/{generate_feed_token(secret_key, user, 'user')}.ics"}
+    if is_admin(user):
+        urls["team"] = f"{base_url}/feed/{generate_feed_token(secret_key, user, 'team')}.ics"
+
+    response = jsonify(urls)
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+@interactions_bp.route("/feed/<token>.ics", methods=["GET"])
+async def get_calendar_feed(token):
+    """
+    Pending follow-ups as a subscribable calendar; authenticated by the signed
+    token in the URL since calendar apps can't send headers.
+    """
+    data = load_feed_token(current_app.config["SECRET_KEY"], token)
+    if not data:
+        return Response("Feed not found", status=404)
+
+    session = SessionLocal()
+    try:
+        user = session.query(User).options(
+            joinedload(User.roles)
+        ).filter(
+            User.id == data["u"],
+            User.is_active == True
+        ).first()
+
+        if not user or not token_matches_user(data, user):
+            return Response("Feed not found", status=404)
+        if data["s"] == "team" and not is_admin(user):
+            return Response("Feed not found", status=404)
+
+        entry = calendar_feeds.get(session, user, data["s"])
+    finally:
+        session.close()
+
+    headers = {
+        "ETag": f'"{entry.etag}"',
+        "Last-Modified": http_date(entry.last_modified),
+        "Cache-Control": "private, max-age=300",
+    }
+    if not_modified(entry, request.headers.get("If-None-Match"), request.headers.get("If-Modified-Since")):
+        return Response(b"", status=304, headers=headers)
+
+    return Response(entry.body, content_type="text/calendar; charset=utf-8", headers=headers)
+
+
 @interactions_bp.route("/<int:interaction_id>/complete", methods=["PUT"])
 @requires_auth()
 async def complete_interaction(interaction_id):
     user = request.user
     session = SessionLocal()
     try:
-        interaction = session.query(Interaction).options(
-            joinedload(Interaction.client),
-            joinedload(Interaction.lead),
-            joinedload(Interaction.project)  # NEW: Load project
-        ).filter(
+        interaction = session.query(Interaction).filter(
             Interaction.id == interaction_id,
             Interaction.tenant_id == user.tenant_id
         ).first()
@@ -472,21 +433,13 @@ async def complete_interaction(interaction_id):
         if not interaction:
             return jsonify({"error": "Interaction not found"}), 404
 
-        # Validate user has access
-        if not any(role.name == "admin" for role in user.roles):
-            has_access = False
-            if interaction.client_id:
-                has_access = interaction.client.created_by == user.id or interaction.client.assigned_to == user.id
-            elif interaction.lead_id:
-                has_access = interaction.lead.created_by == user.id or interaction.lead.assigned_to == user.id
-            elif interaction.project_id:  # NEW: Project access check
-                has_access = interaction.project.created_by == user.id
-                
-            if not has_access:
-                return jsonify({"error": "Access denied"}), 403
+        if not can_access_interaction(user, interaction):
+            return jsonify({"error": "Access denied"}), 403
 
         interaction.followup_status = FollowUpStatus.completed
         session.commit()
+        calendar_feeds.invalidate(user.tenant_id)
+        reminders.cancel(interaction.id)
         return jsonify({"message": "Interaction marked as completed"})
     finally:
         session.close()
@@ -518,33 +471,13 @@ async def list_all_interactions_admin():
 
         # Filter by user if specified
         if user_email:
-            query = query.filter(
-                or_(
-                    # Client interactions
-                    and_(
-                        Interaction.client_id != None,
-                        or_(
-                            Interaction.client.has(Client.assigned_user.has(User.email == user_email)),
-                            Interaction.client.has(Client.created_by_user.has(User.email == user_email))
-                        )
-                    ),
-                    # Lead interactions
-                    and_(
-                        Interaction.lead_id != None,
-                        or_(
-                            Interaction.lead.has(Lead.assigned_user.has(User.email == user_email)),
-                            Interaction.lead.has(Lead.created_by_user.has(User.email == user_email))
-                        )
-                    ),
-                    # Project interactions - NEW: Add project filtering
-                    and_(
-                        Interaction.project_id != None,
-                        Interaction.project.has(Project.created_by == 
-                            session.query(User.id).filter(User.email == user_email).scalar_subquery()
-                        )
-                    )
+            owner_id = user_ids.resolve(session, user.tenant_id, user_email)
+            if owner_id is None:
+                query = query.filter(false())
+            else:
+                query = query.filter(
+                    or_(Interaction.owner_created_by == owner_id, Interaction.owner_assigned_to == owner_id)
                 )
-            )
 
         # Apply sorting
         if sort_order == "newest":
@@ -1,12 +1,17 @@
 from quart import Blueprint, request, jsonify
 from datetime import datetime
-from app.models import Lead, ActivityLog, ActivityType, User
+from app.models import Lead, Interaction, ActivityLog, ActivityType, User
 from app.database import SessionLocal
 from app.utils.auth_utils import requires_auth
-from app.utils.email_utils import send_assignment_notification
+from app.utils.notifications import assignment_event, publish_after_commit
+from app.utils.calendar_feed import calendar_feeds
+from app.utils.bulk_utils import LEAD_BULK, BulkError, run_bulk
+from app.utils.access_utils import is_admin, owned_lead_filter, sync_interaction_owners
+from app.utils.lead_conversion import convert_lead
+from app.utils.user_lookup import user_ids
 from app.utils.phone_utils import clean_phone_number
 from app.constants import TYPE_OPTIONS, LEAD_STATUS_OPTIONS, PHONE_LABELS
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, false
 from sqlalchemy.orm import joinedload
 
 leads_bp = Blueprint("leads", __name__, url_prefix="/api/leads")
@@ -244,6 +249,7 @@ async def update_lead(lead_id):
         lead.updated_at = datetime.utcnow()
 
         session.commit()
+        calendar_feeds.invalidate(user.tenant_id)
         session.refresh(lead)
         return jsonify({"id": lead.id})
     finally:
@@ -309,24 +315,23 @@ async def assign_lead(lead_id):
         lead.assigned_to = assigned_to
         lead.updated_by = user.id
         lead.updated_at = datetime.utcnow()
+        sync_interaction_owners(session, Interaction.lead_id == lead.id, parent=Lead)
 
-        # Send email to assigned user (before commit in case it fails)
+        # Email the assigned user once the assignment is committed
         if assigned_to:
-            assigned_user = session.query(User).get(assigned_to)
-            if assigned_user:
-                try:
-                    await send_assignment_notification(
-                        to_email=assigned_user.email,
-                        entity_type="lead",
-                        entity_name=lead.name,
-                        assigned_by=user.email
-                    )
-                except Exception as email_error:
-                    print(f"DEBUG: Email notification failed: {email_error}")
-                    # Don't fail the assignment if email fails
+            publish_after_commit(session, assignment_event(
+                tenant_id=user.tenant_id,
+                recipient_email=assigned_user.email,
+                entity_type="lead",
+                entity_name=lead.name,
+                entity_id=lead.id,
+                assigned_by=user.email
+            ))
 
         try:
             session.commit()
+            # Ownership decides whose follow-up feed the interactions land in
+            calendar_feeds.invalidate(user.tenant_id)
             return jsonify({"message": "Lead assigned successfully"})
         except Exception as e:
             session.rollback()
@@ -338,6 +343,76 @@ async def assign_lead(lead_id):
         session.close()
 
 
+@leads_bp.route("/bulk", methods=["POST"])
+@requires_auth()
+async def bulk_update_leads():
+    """
+    Apply one action to many leads in a single UPDATE.
+
+    Body: {"action": "assign" | "status" | "type" | "delete" | "restore",
+            "value": <user id, status or type; omitted for delete/restore>,
+            "ids": [1, 2, ...]  or  "filter": {"status": "open", "city": "Tulsa", ...}}
+    Returns the updated ids and, for id lists, "updated" / "skipped" per id.
+    """
+    user = request.user
+    data = await request.get_json()
+    session = SessionLocal()
+    try:
+        result = run_bulk(session, LEAD_BULK, user, data or {})
+        session.commit()
+        calendar_feeds.invalidate(user.tenant_id)
+        return jsonify(result)
+    except BulkError as e:
+        session.rollback()
+        return jsonify({"error": str(e)}), e.status
+    finally:
+        session.close()
+
+
+@leads_bp.route("/<int:lead_id>/convert", methods=["POST"])
+@requires_auth()
+async def convert_lead_to_client(lead_id):
+    """
+    Turn a lead into a client in one transaction: the client is created from
+    the lead (optional body fields override it), the lead's interactions,
+    projects, contacts and chat messages move to the client, and the lead
+    is marked converted.
+    """
+    user = request.user
+    data = await request.get_json(silent=True) or {}
+    session = SessionLocal()
+    try:
+        lead_query = session.query(Lead).filter(
+            Lead.id == lead_id,
+            Lead.tenant_id == user.tenant_id,
+            Lead.deleted_at == None
+        )
+        if not is_admin(user):
+            lead_query = lead_query.filter(owned_lead_filter(user))
+        # Lock the lead so two conversions can't both create a client
+        lead = lead_query.with_for_update().first()
+
+        if not lead:
+            return jsonify({"error": "Lead not found"}), 404
+        if lead.lead_status == "converted":
+            return jsonify({"error": "Lead is already converted"}), 409
+
+        for field in ["phone", "secondary_phone"]:
+            if data.get(field):
+                data[field] = clean_phone_number(data[field])
+
+        client, moved = convert_lead(session, lead, user, data)
+        session.commit()
+        calendar_feeds.invalidate(user.tenant_id)
+
+        return jsonify({
+            "client_id": client.id,
+            "moved": moved
+        }), 201
+    finally:
+        session.close()
+
+
 # Replace the existing /all endpoint in leads.py with this paginated version
 
 @leads_bp.route("/all", methods=["GET"])
@@ -366,12 +441,11 @@ async def list_all_leads_admin():
 
         # Filter by user if specified
         if user_email:
-            query = query.filter(
-                or_(
-                    Lead.assigned_user.has(User.email == user_email),
-                    Lead.created_by_user.has(User.email == user_email)
-                )
-            )
+            owner_id = user_ids.resolve(session, user.tenant_id, user_email)
+            if owner_id is None:
+                query = query.filter(false())
+            else:
+                query = query.filter(or_(Lead.assigned_to == owner_id, Lead.created_by == owner_id))
 
         # Apply sorting
         if sort_order == "newest":
@@ -1,12 +1,13 @@
 from quart import Blueprint, request, jsonify
 from datetime import datetime
-from app.models import Project, ActivityLog, ActivityType, Client, Lead, User
+from app.models import Project, ActivityLog, ActivityType, Client, Lead
 from app.database import SessionLocal
 from app.utils.auth_utils import requires_auth
+from app.utils.user_lookup import user_ids
 from app.utils.phone_utils import clean_phone_number  # NEW: Add phone utility
 from app.constants import PROJECT_STATUS_OPTIONS, PHONE_LABELS
 from sqlalchemy.orm import joinedload
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, false, select
 
 projects_bp = Blueprint("projects", __name__, url_prefix="/api/projects")
 
@@ -328,26 +329,21 @@ async def list_all_projects():
         )
 
         if user_email:
-            query = query.filter(
-                or_(
-                    # Client projects
-                    and_(
-                        Project.client_id != None,
-                        or_(
-                            Project.client.has(Client.assigned_user.has(User.email == user_email)),
-                            Project.client.has(Client.created_by_user.has(User.email == user_email))
-                        )
-                    ),
-                    # Lead projects
-                    and_(
-                        Project.lead_id != None,
-                        or_(
-                            Project.lead.has(Lead.assigned_user.has(User.email == user_email)),
-                            Project.lead.has(Lead.created_by_user.has(User.email == user_email))
+            # Projects on clients or leads the rep owns
+            owner_id = user_ids.resolve(session, user.tenant_id, user_email)
+            if owner_id is None:
+                query = query.filter(false())
+            else:
+                query = query.filter(
+                    or_(
+                        Project.client_id.in_(
+                            select(Client.id).where(or_(Client.assigned_to == owner_id, Client.created_by == owner_id))
+                        ),
+                        Project.lead_id.in_(
+                            select(Lead.id).where(or_(Lead.assigned_to == owner_id, Lead.created_by == owner_id))
                         )
                     )
                 )
-            )
 
         if sort_order == "newest":
             query = query.order_by(Project.created_at.desc())
@@ -1,31 +1,14 @@
 from quart import Blueprint, request, jsonify
 from app.database import SessionLocal
 from app.utils.auth_utils import requires_auth
-from app.models import User, UserPreference
+from app.utils.preferences import (
+    PAGINATION_TABLES, MAX_BULK_PREFERENCES, preference_cache, upsert_preferences,
+    validate_pagination, validate_preference,
+)
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import and_
-from datetime import datetime
 
 preferences_bp = Blueprint("preferences", __name__, url_prefix="/api/preferences")
 
-# Default preferences - this is what users get if they haven't customized anything
-DEFAULT_PREFERENCES = {
-    "pagination": {
-        "clients": {"perPage": 10, "sort": "newest"},
-        "leads": {"perPage": 10, "sort": "newest"},
-        "projects": {"perPage": 10, "sort": "newest"},
-        "interactions": {"perPage": 10, "sort": "newest"},
-        "admin_clients": {"perPage": 20, "sort": "newest"},
-        "admin_leads": {"perPage": 20, "sort": "newest"},
-        "admin_projects": {"perPage": 20, "sort": "newest"},
-        "admin_interactions": {"perPage": 20, "sort": "newest"}
-    },
-    "display": {
-        "sidebar_collapsed": False,
-        "theme": "light"
-    }
-}
-
 @preferences_bp.route("/", methods=["GET"])
 @requires_auth()
 async def get_user_preferences():
@@ -34,20 +17,8 @@ async def get_user_preferences():
     session = SessionLocal()
     
     try:
-        # Get all user preferences from database
-        user_prefs = session.query(UserPreference).filter(
-            UserPreference.user_id == user.id
-        ).all()
-        
-        # Convert to nested structure
-        preferences = {}
-        for pref in user_prefs:
-            if pref.category not in preferences:
-                preferences[pref.category] = {}
-            preferences[pref.category][pref.preference_key] = pref.preference_value
-        
-        # Merge with defaults (defaults take precedence for missing values)
-        merged_preferences = merge_with_defaults(DEFAULT_PREFERENCES, preferences)
+        # Cached per user until their next write
+        merged_preferences = preference_cache.get(session, user.id)
         
         return jsonify(merged_preferences)
         
@@ -57,60 +28,66 @@ async def get_user_preferences():
     finally:
         session.close()
 
+@preferences_bp.route("/", methods=["PUT"])
+@requires_auth()
+async def update_user_preferences():
+    """
+    Update many preferences at once, in one upsert.
+
+    Body: {"pagination": {"clients": {"perPage": 25, "sort": "oldest"}, ...},
+           "display": {"theme": "dark", ...}}
+    Returns all preferences merged with the defaults.
+    """
+    user = request.user
+    data = await request.get_json(silent=True)
+    if not isinstance(data, dict) or not data:
+        return jsonify({"error": "Expected an object of preference categories"}), 400
+
+    values = []
+    for category, preferences in data.items():
+        if not isinstance(preferences, dict):
+            return jsonify({"error": f"{category} must be an object"}), 400
+        for key, value in preferences.items():
+            value, error = validate_preference(category, key, value)
+            if error:
+                return jsonify({"error": error}), 400
+            values.append((category, key, value))
+    if len(values) > MAX_BULK_PREFERENCES:
+        return jsonify({"error": f"At most {MAX_BULK_PREFERENCES} preferences per request"}), 400
+
+    session = SessionLocal()
+    try:
+        upsert_preferences(session, user.id, values)
+        session.commit()
+        preference_cache.invalidate(user.id)
+        return jsonify(preference_cache.get(session, user.id))
+    except SQLAlchemyError:
+        session.rollback()
+        return jsonify({"error": "Database error"}), 500
+    finally:
+        session.close()
+
 @preferences_bp.route("/pagination/<table_name>", methods=["PUT"])
 @requires_auth()
 async def update_pagination_preference(table_name):
     """Update pagination preferences for a specific table"""
     user = request.user
     data = await request.get_json()
-    session = SessionLocal()
     
     # Validate table name
-    allowed_tables = [
-        'clients', 'leads', 'projects', 'interactions',
-        'admin_clients', 'admin_leads', 'admin_projects', 'admin_interactions'
-    ]
-    if table_name not in allowed_tables:
+    if table_name not in PAGINATION_TABLES:
         return jsonify({"error": "Invalid table name"}), 400
     
     # Validate data
-    per_page = data.get('perPage', 10)
-    sort_order = data.get('sort', 'newest')
-    
-    if not isinstance(per_page, int) or per_page < 1 or per_page > 100:
-        return jsonify({"error": "Invalid perPage value (1-100)"}), 400
-        
-    if sort_order not in ['newest', 'oldest', 'alphabetical', 'pending', 'completed']:
-        return jsonify({"error": "Invalid sort order"}), 400
+    preference_value, error = validate_pagination(data)
+    if error:
+        return jsonify({"error": error}), 400
     
+    session = SessionLocal()
     try:
-        # Find existing preference or create new
-        existing_pref = session.query(UserPreference).filter(
-            and_(
-                UserPreference.user_id == user.id,
-                UserPreference.category == 'pagination',
-                UserPreference.preference_key == table_name
-            )
-        ).first()
-        
-        preference_value = {
-            'perPage': per_page,
-            'sort': sort_order
-        }
-        
-        if existing_pref:
-            existing_pref.preference_value = preference_value
-            existing_pref.updated_at = datetime.utcnow()
-        else:
-            new_pref = UserPreference(
-                user_id=user.id,
-                category='pagination',
-                preference_key=table_name,
-                preference_value=preference_value
-            )
-            session.add(new_pref)
-        
+        upsert_preferences(session, user.id, [('pagination', table_name, preference_value)])
         session.commit()
+        preference_cache.invalidate(user.id)
         
         return jsonify({
             "message": f"Pagination preferences updated for {table_name}",
@@ -122,18 +99,3 @@ async def update_pagination_preference(table_name):
         return jsonify({"error": "Database error"}), 500
     finally:
         session.close()
-
-def merge_with_defaults(defaults, user_prefs):
-    """Deep merge user preferences with defaults"""
-    if not isinstance(user_prefs, dict):
-        return defaults.copy()
-        
-    result = defaults.copy()
-    
-    for key, value in user_prefs.items():
-        if key in result and isinstance(result[key], dict) and isinstance(value, dict):
-            result[key] = merge_with_defaults(result[key], value)
-        else:
-            result[key] = value
-            
-    return result
\ No newline at end of file
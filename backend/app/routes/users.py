@@ -2,6 +2,7 @@ from quart import Blueprint, request, jsonify
 from app.models import User, Role, ActivityLog, ActivityType
 from app.database import SessionLocal
 from app.utils.auth_utils import requires_auth, hash_password
+from app.utils.user_lookup import user_ids
 
 users_bp = Blueprint("users", __name__, url_prefix="/api/users")
 
@@ -66,6 +67,7 @@ async def create_user():
 
         session.add(new_user)
         session.commit()
+        user_ids.invalidate(user.tenant_id)
         session.refresh(new_user)
 
         return jsonify({
@@ -164,6 +166,7 @@ async def update_user_email(user_id):
 
         target.email = new_email
         session.commit()
+        user_ids.invalidate(user.tenant_id)
 
         return jsonify({
             "id": target.id,
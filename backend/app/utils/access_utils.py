@@ -0,0 +1,142 @@
+"""
+Row visibility rules shared by list, export and bulk endpoints.
+
+Each helper returns a SQL predicate for the records a user may see, or None
+when nothing beyond the tenant filter applies (admins).
+
+Interactions carry copies of their parent's owners (owner_created_by,
+owner_assigned_to) so their filter is two indexed comparisons instead of
+EXISTS subqueries against clients, leads and projects. Anything that
+changes those owners or moves interactions calls sync_interaction_owners.
+"""
+from sqlalchemy import or_, and_, select, update
+from app.models import Client, Lead, Project, Interaction, Account, Contact, ActivityLog
+
+
+def is_admin(user) -> bool:
+    return any(role.name == "admin" for role in user.roles)
+
+
+def owned_client_filter(user):
+    """
+    Clients the user created or is assigned to (detail/interaction access)
+    """
+    return or_(Client.created_by == user.id, Client.assigned_to == user.id)
+
+
+def owned_lead_filter(user):
+    return or_(Lead.created_by == user.id, Lead.assigned_to == user.id)
+
+
+def listed_client_filter(user):
+    """
+    Clients shown in the user's client list: assigned to them, or unassigned and created by them
+    """
+    if is_admin(user):
+        return None
+    return or_(
+        Client.assigned_to == user.id,
+        and_(Client.assigned_to == None, Client.created_by == user.id)
+    )
+
+
+def listed_lead_filter(user):
+    if is_admin(user):
+        return None
+    return or_(
+        Lead.assigned_to == user.id,
+        and_(Lead.assigned_to == None, Lead.created_by == user.id)
+    )
+
+
+def project_filter(user):
+    if is_admin(user):
+        return None
+    return Project.created_by == user.id
+
+
+def owned_interaction_filter(user):
+    """
+    Interactions on the user's own clients, leads and projects (admins included)
+    """
+    return or_(Interaction.owner_created_by == user.id, Interaction.owner_assigned_to == user.id)
+
+
+def can_access_interaction(user, interaction) -> bool:
+    return is_admin(user) or user.id in (interaction.owner_created_by, interaction.owner_assigned_to)
+
+
+# Parent models of an interaction and the column pointing at them
+INTERACTION_PARENTS = [
+    (Client, Interaction.client_id),
+    (Lead, Interaction.lead_id),
+    (Project, Interaction.project_id),
+]
+
+
+def interaction_owner_values(entity) -> dict:
+    """
+    Owner columns for a new interaction on `entity` (client, lead or project)
+    """
+    return {
+        "owner_created_by": entity.created_by,
+        "owner_assigned_to": getattr(entity, "assigned_to", None),
+    }
+
+
+def sync_interaction_owners(session, *conditions, parent=None):
+    """
+    Copy parent owners onto the interactions matching `conditions`; one
+    UPDATE per parent type (only `parent`'s when given). Call after
+    assignments change or interactions move, before committing.
+    """
+    session.flush()
+    for model, parent_id in INTERACTION_PARENTS:
+        if parent is not None and model is not parent:
+            continue
+        assigned_to = select(model.assigned_to) if hasattr(model, "assigned_to") else None
+        session.execute(
+            update(Interaction).where(
+                parent_id != None,
+                *conditions
+            ).values(
+                owner_created_by=select(model.created_by).where(model.id == parent_id).scalar_subquery(),
+                owner_assigned_to=(
+                    assigned_to.where(model.id == parent_id).scalar_subquery()
+                    if assigned_to is not None else None
+                ),
+            ).execution_options(synchronize_session=False)
+        )
+
+
+def interaction_filter(user):
+    """
+    Interactions inherit visibility from the client, lead or project they belong to
+    """
+    if is_admin(user):
+        return None
+    return owned_interaction_filter(user)
+
+
+def account_filter(user):
+    if is_admin(user):
+        return None
+    return Account.client.has(owned_client_filter(user))
+
+
+def contact_filter(user):
+    if is_admin(user):
+        return None
+    return or_(
+        and_(Contact.client_id != None, Contact.client.has(owned_client_filter(user))),
+        and_(Contact.lead_id != None, Contact.lead.has(owned_lead_filter(user)))
+    )
+
+
+def activity_filter(user):
+    """
+    Non-admins only see their own activity log
+    """
+    if is_admin(user):
+        return None
+    return ActivityLog.user_id == user.id
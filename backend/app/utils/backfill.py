@@ -0,0 +1,316 @@
+"""
+Batched online backfills.
+
+A Backfill walks one table in primary-key order and hands each batch of ids
+to its apply function, one short transaction per batch, so a rewrite of a
+large table never holds locks for long and can run while the app serves
+traffic. The batch's checkpoint (backfill_checkpoints) is locked and
+advanced in that same transaction: an interrupted run resumes after the
+last committed batch, and two runners of the same backfill take turns
+instead of repeating work. A pause between batches leaves the database room
+for live queries.
+
+Backfills are registered in BACKFILLS below and run with run_backfill.py.
+"""
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import pandas as pd
+from sqlalchemy import select, update, func, text, bindparam
+from app.database import SessionLocal
+from app.models import BackfillCheckpoint, Client, Lead, Contact, Project, Interaction, Account, User
+from app.utils.phone_utils import clean_phone_numbers
+from app.utils import search_index, phone_index
+
+# Rows per batch transaction
+BACKFILL_BATCH_SIZE = int(os.environ.get("BACKFILL_BATCH_SIZE", 1000))
+# Seconds to sleep between batches
+BACKFILL_PAUSE = float(os.environ.get("BACKFILL_PAUSE", 0.1))
+# Postgres: fail a batch rather than queue behind a long-held row lock
+BACKFILL_LOCK_TIMEOUT_MS = int(os.environ.get("BACKFILL_LOCK_TIMEOUT_MS", 2000))
+
+
+class BackfillError(Exception):
+    pass
+
+
+class Backfill:
+    """
+    apply(session, ids) rewrites the rows with those ids and returns how many
+    it changed; it must not commit.
+    """
+    def __init__(self, name: str, model, apply: Callable[..., int], description: str = "", where=None):
+        self.name = name
+        self.model = model
+        self.apply = apply
+        self.description = description
+        self.where = where                  # optional filter on the rows walked
+
+    def next_ids(self, session, after_id: int, batch_size: int) -> List[int]:
+        stmt = select(self.model.id).where(self.model.id > after_id)
+        if self.where is not None:
+            stmt = stmt.where(self.where)
+        return session.execute(stmt.order_by(self.model.id).limit(batch_size)).scalars().all()
+
+    def remaining(self, session, after_id: int) -> int:
+        stmt = select(func.count()).select_from(self.model).where(self.model.id > after_id)
+        if self.where is not None:
+            stmt = stmt.where(self.where)
+        return session.scalar(stmt)
+
+
+BACKFILLS: Dict[str, Backfill] = {}
+
+
+def register(backfill: Backfill):
+    BACKFILLS[backfill.name] = backfill
+
+
+def matching(pattern: str) -> List[str]:
+    """
+    Backfill names equal to the pattern or under it ("phones" -> "phones.clients", ...)
+    """
+    return [name for name in BACKFILLS if name == pattern or name.startswith(pattern + ".")]
+
+
+def checkpoint_dict(checkpoint: Optional[BackfillCheckpoint], name: str) -> Dict:
+    if checkpoint is None:
+        return {"name": name, "status": "pending", "last_id": 0, "processed": 0, "changed": 0}
+    return {
+        "name": checkpoint.name,
+        "status": checkpoint.status,
+        "last_id": checkpoint.last_id,
+        "processed": checkpoint.processed,
+        "changed": checkpoint.changed,
+        "error": checkpoint.error,
+        "started_at": checkpoint.started_at.isoformat() if checkpoint.started_at else None,
+        "updated_at": checkpoint.updated_at.isoformat() if checkpoint.updated_at else None,
+        "finished_at": checkpoint.finished_at.isoformat() if checkpoint.finished_at else None,
+    }
+
+
+def backfill_status() -> List[Dict]:
+    session = SessionLocal()
+    try:
+        checkpoints = {c.name: c for c in session.query(BackfillCheckpoint).all()}
+        return [checkpoint_dict(checkpoints.get(name), name) for name in BACKFILLS]
+    finally:
+        session.close()
+
+
+def _start(name: str, restart: bool) -> BackfillCheckpoint:
+    session = SessionLocal()
+    try:
+        checkpoint = session.query(BackfillCheckpoint).filter_by(name=name).with_for_update().first()
+        if checkpoint is None:
+            checkpoint = BackfillCheckpoint(name=name, last_id=0, processed=0, changed=0,
+                                            status="running", started_at=datetime.utcnow())
+            session.add(checkpoint)
+        elif restart:
+            checkpoint.last_id = 0
+            checkpoint.processed = 0
+            checkpoint.changed = 0
+            checkpoint.status = "running"
+            checkpoint.started_at = datetime.utcnow()
+        if checkpoint.status != "completed":
+            checkpoint.status = "running"
+            checkpoint.error = None
+            checkpoint.finished_at = None
+        checkpoint.updated_at = datetime.utcnow()
+        session.commit()
+        session.refresh(checkpoint)
+        session.expunge(checkpoint)
+        return checkpoint
+    finally:
+        session.close()
+
+
+def _finish(name: str, status: str, error: Optional[str] = None):
+    session = SessionLocal()
+    try:
+        session.query(BackfillCheckpoint).filter_by(name=name).update({
+            "status": status,
+            "error": error,
+            "updated_at": datetime.utcnow(),
+            "finished_at": datetime.utcnow() if status == "completed" else None,
+        })
+        session.commit()
+    finally:
+        session.close()
+
+
+def _run_batch(backfill: Backfill, batch_size: int):
+    """
+    One transaction: lock the checkpoint, apply the next batch, advance the
+    checkpoint. Returns (rows walked, rows changed); (0, 0) when done.
+    """
+    session = SessionLocal()
+    try:
+        if session.get_bind().dialect.name == "postgresql":
+            session.execute(text(f"SET LOCAL lock_timeout = {BACKFILL_LOCK_TIMEOUT_MS}"))
+        checkpoint = session.query(BackfillCheckpoint).filter_by(name=backfill.name).with_for_update().one()
+        ids = backfill.next_ids(session, checkpoint.last_id, batch_size)
+        if not ids:
+            session.rollback()
+            return 0, 0
+        changed = backfill.apply(session, ids) or 0
+        checkpoint.last_id = ids[-1]
+        checkpoint.processed += len(ids)
+        checkpoint.changed += changed
+        checkpoint.updated_at = datetime.utcnow()
+        session.commit()
+        return len(ids), changed
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def run_backfill(name: str, batch_size: Optional[int] = None, pause: Optional[float] = None,
+                 max_batches: Optional[int] = None, restart: bool = False) -> Dict:
+    """
+    Run (or resume) a backfill until the table is done or max_batches have
+    run; stopping early leaves it "paused" to pick up next time.
+    """
+    backfill = BACKFILLS.get(name)
+    if backfill is None:
+        raise BackfillError(f"Unknown backfill: {name}")
+    batch_size = batch_size or BACKFILL_BATCH_SIZE
+    pause = BACKFILL_PAUSE if pause is None else pause
+
+    checkpoint = _start(name, restart)
+    if checkpoint.status == "completed":
+        print(f"[Backfill] {name}: already completed (use restart to run again)")
+        return checkpoint_dict(checkpoint, name)
+
+    session = SessionLocal()
+    try:
+        total = checkpoint.processed + backfill.remaining(session, checkpoint.last_id)
+    finally:
+        session.close()
+    print(f"[Backfill] {name}: {'resuming at' if checkpoint.last_id else 'starting,'} "
+          f"{checkpoint.processed}/{total} rows")
+
+    processed, changed, batches = checkpoint.processed, checkpoint.changed, 0
+    started = time.perf_counter()
+    status = "paused"
+    try:
+        while max_batches is None or batches < max_batches:
+            walked, batch_changed = _run_batch(backfill, batch_size)
+            if not walked:
+                status = "completed"
+                break
+            batches += 1
+            processed += walked
+            changed += batch_changed
+            rate = (processed - checkpoint.processed) / (time.perf_counter() - started)
+            print(f"[Backfill] {name}: {processed}/{total} rows, {changed} changed ({rate:,.0f} rows/s)")
+            if pause:
+                time.sleep(pause)
+    except KeyboardInterrupt:
+        # Committed batches stay done
+        _finish(name, "paused")
+        print(f"[Backfill] {name}: interrupted after {processed} rows")
+        raise
+    except Exception as e:
+        _finish(name, "failed", error=repr(e))
+        print(f"[Backfill] {name}: failed after {processed} rows: {e!r}")
+        raise
+    _finish(name, status)
+    print(f"[Backfill] {name}: {status}, {processed} rows, {changed} changed")
+
+    session = SessionLocal()
+    try:
+        return checkpoint_dict(session.query(BackfillCheckpoint).filter_by(name=name).one(), name)
+    finally:
+        session.close()
+
+
+# --- Registered backfills ---
+
+def normalize_phones(entity_type: str, model, columns: List[str]) -> Callable[..., int]:
+    """
+    Rewrite phone columns to clean_phone_number's storage format. Values it
+    can't parse are left as they are.
+    """
+    table = model.__table__
+
+    def apply(session, ids: List[int]) -> int:
+        rows = session.execute(
+            select(model.id, model.tenant_id, *[getattr(model, column) for column in columns])
+            .where(model.id.in_(ids))
+        ).all()
+        frame = pd.DataFrame(rows, columns=["id", "tenant_id", *columns])
+        changed_rows = pd.Series(False, index=frame.index)
+        for column in columns:
+            original = frame[column].astype("string")
+            cleaned = clean_phone_numbers(original).astype("string")
+            changed = (cleaned != original).fillna(False).to_numpy(dtype=bool)
+            if not changed.any():
+                continue
+            session.execute(
+                update(table).where(table.c.id == bindparam("_id")).values({column: bindparam("_value")}),
+                [{"_id": int(row_id), "_value": value}
+                 for row_id, value in zip(frame["id"][changed], cleaned[changed])]
+            )
+            changed_rows |= changed
+
+        changed_ids = frame[changed_rows.to_numpy()]
+        if changed_ids.empty:
+            return 0
+        # Core updates bypass the ORM hooks that keep the indexes current
+        phone_index.reindex(session, entity_type, changed_ids["id"].tolist())
+        for tenant_id, group in changed_ids.groupby("tenant_id"):
+            search_index.refresh(session, entity_type, group["id"].tolist(), int(tenant_id))
+        return len(changed_ids)
+
+    return apply
+
+
+def rebuild_phone_index(entity_type: str) -> Callable[..., int]:
+    def apply(session, ids: List[int]) -> int:
+        phone_index.reindex(session, entity_type, ids)
+        return len(ids)
+    return apply
+
+
+def rebuild_search_documents(entity_type: str) -> Callable[..., int]:
+    def apply(session, ids: List[int]) -> int:
+        search_index.reindex(session, entity_type, ids)
+        return len(ids)
+    return apply
+
+
+PHONE_COLUMNS = [
+    ("clients", "client", Client, ["phone", "secondary_phone"]),
+    ("leads", "lead", Lead, ["phone", "secondary_phone"]),
+    ("contacts", "contact", Contact, ["phone", "secondary_phone"]),
+    ("projects", "project", Project, ["primary_contact_phone"]),
+    ("interactions", "interaction", Interaction, ["phone"]),
+]
+
+for table_name, entity_type, model, columns in PHONE_COLUMNS:
+    register(Backfill(
+        f"phones.{table_name}", model, normalize_phones(entity_type, model, columns),
+        description=f"Normalize {table_name} {', '.join(columns)} to +1XXXXXXXXXX"
+    ))
+    register(Backfill(
+        f"phone_index.{table_name}", model, rebuild_phone_index(entity_type),
+        description=f"Rebuild phone lookup entries for {table_name}"
+    ))
+
+SEARCH_TABLES = [
+    ("clients", "client", Client),
+    ("leads", "lead", Lead),
+    ("projects", "project", Project),
+    ("accounts", "account", Account),
+    ("users", "user", User),
+]
+
+for table_name, entity_type, model in SEARCH_TABLES:
+    register(Backfill(
+        f"search_index.{table_name}", model, rebuild_search_documents(entity_type),
+        description=f"Rebuild search documents for {table_name}"
+    ))
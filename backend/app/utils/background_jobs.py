@@ -0,0 +1,174 @@
+"""
+In-process background job registry.
+
+Long-running work (imports, exports, rebuilds) is submitted here instead of
+running inside the HTTP request. Each job runs as an asyncio task on the
+server's event loop; blocking work inside a job should be pushed to a thread
+with ``asyncio.to_thread`` so the loop keeps serving requests.
+"""
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# How many jobs may run at once; the rest wait in "queued"
+MAX_CONCURRENT_JOBS = int(os.environ.get("MAX_CONCURRENT_JOBS", 2))
+
+# Finished jobs are kept around this long so clients can read the final status
+FINISHED_JOB_TTL = int(os.environ.get("FINISHED_JOB_TTL", 3600))
+
+JOB_STATUSES = ["queued", "running", "completed", "failed", "cancelled"]
+FINISHED_STATUSES = {"completed", "failed", "cancelled"}
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation was requested."""
+
+
+class Job:
+    def __init__(self, kind: str, tenant_id: int, created_by: int):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.tenant_id = tenant_id
+        self.created_by = created_by
+        self.status = "queued"
+        self.total = None
+        self.processed = 0
+        self.failed = 0
+        self.failures: List[Dict[str, Any]] = []
+        self.message = None
+        self.result: Dict[str, Any] = {}
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = False
+        self._started_monotonic = None
+        self._finished_monotonic = None
+        self._task: Optional[asyncio.Task] = None
+
+    def check_cancelled(self):
+        """Call between units of work to stop early when cancel was requested."""
+        if self.cancel_requested:
+            raise JobCancelled()
+
+    def add_failure(self, failure: Dict[str, Any], keep: int = 100):
+        self.failed += 1
+        if len(self.failures) < keep:
+            self.failures.append(failure)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def eta_seconds(self) -> Optional[float]:
+        if self.status != "running" or not self.total or not self.processed:
+            return None
+        elapsed = time.monotonic() - self._started_monotonic
+        rate = self.processed / elapsed if elapsed > 0 else 0
+        if rate <= 0:
+            return None
+        return round((self.total - self.processed) / rate, 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "total_rows": self.total,
+            "processed_rows": self.processed,
+            "failed_rows": self.failed,
+            "progress": round(self.processed / self.total, 4) if self.total else None,
+            "eta_seconds": self.eta_seconds(),
+            "message": self.message,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() + "Z",
+            "started_at": self.started_at.isoformat() + "Z" if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() + "Z" if self.finished_at else None,
+        }
+        data.update(self.result)
+        return data
+
+
+class JobRegistry:
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_JOBS, ttl: int = FINISHED_JOB_TTL):
+        self._jobs: Dict[str, Job] = {}
+        self._ttl = ttl
+        self._max_concurrent = max_concurrent
+        self._semaphore = None
+
+    def submit(self, kind: str, tenant_id: int, created_by: int,
+               fn: Callable[..., Awaitable[None]], *args, **kwargs) -> Job:
+        """
+        Schedule ``fn(job, *args, **kwargs)`` on the running event loop and
+        return the job handle immediately.
+        """
+        self._prune()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrent)
+
+        job = Job(kind, tenant_id, created_by)
+        self._jobs[job.id] = job
+        job._task = asyncio.get_running_loop().create_task(self._run(job, fn, *args, **kwargs))
+        return job
+
+    async def _run(self, job: Job, fn, *args, **kwargs):
+        async with self._semaphore:
+            if job.cancel_requested:
+                self._finish(job, "cancelled")
+                return
+            job.status = "running"
+            job.started_at = datetime.utcnow()
+            job._started_monotonic = time.monotonic()
+            try:
+                await fn(job, *args, **kwargs)
+                self._finish(job, "cancelled" if job.cancel_requested else "completed")
+            except (JobCancelled, asyncio.CancelledError):
+                self._finish(job, "cancelled")
+            except Exception as e:
+                job.error = str(e)
+                self._finish(job, "failed")
+                print(f"[Jobs] {job.kind} job {job.id} failed: {e}")
+
+    def _finish(self, job: Job, status: str):
+        job.status = status
+        job.finished_at = datetime.utcnow()
+        job._finished_monotonic = time.monotonic()
+
+    def get(self, job_id: str, tenant_id: int) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if not job or job.tenant_id != tenant_id:
+            return None
+        return job
+
+    def list(self, tenant_id: int, kind: str = None) -> List[Job]:
+        self._prune()
+        jobs = [
+            j for j in self._jobs.values()
+            if j.tenant_id == tenant_id and (kind is None or j.kind == kind)
+        ]
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+    def cancel(self, job_id: str, tenant_id: int) -> Optional[Job]:
+        """
+        Request cancellation. Jobs stop at their next check point, so work
+        already committed by the job is kept.
+        """
+        job = self.get(job_id, tenant_id)
+        if job and not job.finished:
+            job.cancel_requested = True
+        return job
+
+    def _prune(self):
+        now = time.monotonic()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job._finished_monotonic is not None and now - job._finished_monotonic > self._ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+jobs = JobRegistry()
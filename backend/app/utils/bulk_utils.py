@@ -0,0 +1,212 @@
+"""
+Bulk mutations for leads and clients.
+
+POST /api/leads/bulk and /api/clients/bulk select records by an id list or
+a filter and apply one action to all of them: a single UPDATE ... RETURNING
+for the whole selection, plus one executemany insert of ActivityLog rows.
+Records the user can't touch, or that the action doesn't apply to (deleting
+an already deleted lead), are left out by the UPDATE's WHERE clause and
+reported back as skipped.
+"""
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import update, insert, func
+from app.models import Lead, Client, Interaction, User, ActivityLog, ActivityType
+from app.constants import TYPE_OPTIONS, LEAD_STATUS_OPTIONS, CLIENT_STATUS_OPTIONS
+from app.utils.access_utils import is_admin, owned_lead_filter, owned_client_filter, sync_interaction_owners
+from app.utils.notifications import assignment_event, publish_after_commit
+from app.utils import search_index, phone_index
+
+BULK_ACTIONS = ["assign", "status", "type", "delete", "restore"]
+# Largest id list accepted in one request
+BULK_MAX_IDS = int(os.environ.get("BULK_MAX_IDS", 5000))
+
+
+class BulkTarget:
+    def __init__(self, model, entity_type: str, status_column: str, status_options: List[str], owned_filter,
+                 interaction_column):
+        self.model = model
+        self.entity_type = entity_type
+        # Interaction column pointing at this model, for owner syncs
+        self.interaction_column = interaction_column
+        self.status_column = status_column
+        self.status_options = status_options
+        self.owned_filter = owned_filter
+
+    @property
+    def filter_columns(self):
+        # Filter keys accepted instead of an id list
+        model = self.model
+        return {
+            "status": getattr(model, self.status_column),
+            "type": model.type,
+            "assigned_to": model.assigned_to,
+            "created_by": model.created_by,
+            "city": model.city,
+            "state": model.state,
+        }
+
+
+LEAD_BULK = BulkTarget(Lead, "lead", "lead_status", LEAD_STATUS_OPTIONS, owned_lead_filter, Interaction.lead_id)
+CLIENT_BULK = BulkTarget(Client, "client", "status", CLIENT_STATUS_OPTIONS, owned_client_filter,
+                         Interaction.client_id)
+
+
+class BulkError(ValueError):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def selection(target: BulkTarget, user, ids: Optional[List[int]], filters: Optional[Dict[str, Any]]):
+    """
+    WHERE clauses for the records the request names and the user may change
+    """
+    model = target.model
+    conditions = [model.tenant_id == user.tenant_id]
+    if not is_admin(user):
+        conditions.append(target.owned_filter(user))
+
+    if ids:
+        if len(ids) > BULK_MAX_IDS:
+            raise BulkError(f"At most {BULK_MAX_IDS} ids per request")
+        conditions.append(model.id.in_(ids))
+    elif filters:
+        columns = target.filter_columns
+        unknown = [key for key in filters if key not in columns]
+        if unknown:
+            raise BulkError(f"Unknown filter fields {unknown}. Use {list(columns)}")
+        conditions.extend(columns[key] == value for key, value in filters.items())
+    else:
+        raise BulkError("Provide ids or a filter")
+    return conditions
+
+
+def action_values(target: BulkTarget, user, action: str, value, now: datetime):
+    """
+    (column values, extra WHERE clauses, activity type) for one action
+    """
+    model = target.model
+    values = {"updated_by": user.id, "updated_at": now}
+    live = [model.deleted_at == None]
+
+    if action == "assign":
+        values["assigned_to"] = value
+        return values, live, ActivityType.edited
+    if action == "status":
+        if value not in target.status_options:
+            raise BulkError(f"status must be one of {target.status_options}")
+        values[target.status_column] = value
+        if model is Lead and value == "converted":
+            values["converted_on"] = func.coalesce(Lead.converted_on, now)
+        return values, live, ActivityType.edited
+    if action == "type":
+        if value not in TYPE_OPTIONS:
+            raise BulkError(f"type must be one of {TYPE_OPTIONS}")
+        values["type"] = value
+        return values, live, ActivityType.edited
+    if action == "delete":
+        values.update(deleted_at=now, deleted_by=user.id)
+        return values, live, ActivityType.deleted
+    if action == "restore":
+        values.update(deleted_at=None, deleted_by=None)
+        return values, [model.deleted_at != None], ActivityType.edited
+    raise BulkError(f"action must be one of {BULK_ACTIONS}")
+
+
+def describe(target: BulkTarget, action: str, value, name: str) -> str:
+    if action == "assign":
+        return f"Bulk assigned {target.entity_type} '{name}' to user {value}" if value else \
+            f"Bulk unassigned {target.entity_type} '{name}'"
+    if action in ("status", "type"):
+        return f"Bulk set {action} of {target.entity_type} '{name}' to '{value}'"
+    return f"Bulk {action}d {target.entity_type} '{name}'"
+
+
+def apply_bulk(session, target: BulkTarget, user, action: str, value=None,
+               ids: Optional[List[int]] = None, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Run one bulk action; the caller commits. Returns the changed ids and,
+    for id-list requests, an outcome per requested id.
+    """
+    model = target.model
+    now = datetime.utcnow()
+    values, extra_conditions, activity = action_values(target, user, action, value, now)
+    conditions = selection(target, user, ids, filters) + extra_conditions
+
+    changed = session.execute(
+        update(model).where(*conditions).values(**values).returning(model.id, model.name)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    if changed:
+        session.execute(insert(ActivityLog), [{
+            "tenant_id": user.tenant_id,
+            "user_id": user.id,
+            "action": activity,
+            "entity_type": target.entity_type,
+            "entity_id": row.id,
+            "timestamp": now,
+            "description": describe(target, action, value, row.name),
+        } for row in changed])
+
+    changed_ids = [row.id for row in changed]
+    if action == "assign" and changed_ids:
+        sync_interaction_owners(session, target.interaction_column.in_(changed_ids), parent=model)
+    if action in ("assign", "delete", "restore") and changed_ids:
+        # Owners and liveness are part of the search documents and phone index
+        search_index.refresh(session, target.entity_type, changed_ids, user.tenant_id)
+        phone_index.refresh(session, target.entity_type, changed_ids, user.tenant_id)
+
+    result = {"action": action, "updated": len(changed_ids), "updated_ids": changed_ids}
+    if ids:
+        done = set(changed_ids)
+        # Not found, not the user's, or nothing to do (e.g. restoring a live record)
+        result["results"] = {str(i): "updated" if i in done else "skipped" for i in ids}
+    return result
+
+
+def run_bulk(session, target: BulkTarget, user, data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate a bulk request body and apply it. Assigning is admin-only, like
+    the single-record assign routes, and sends the assignee one notification
+    for the whole batch once the caller commits.
+    """
+    action = data.get("action")
+    value = data.get("value")
+    ids = data.get("ids")
+    filters = data.get("filter")
+
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            raise BulkError("ids must be a list of integers")
+    if filters is not None and not isinstance(filters, dict):
+        raise BulkError("filter must be an object")
+
+    assignee = None
+    if action == "assign":
+        if not is_admin(user):
+            raise BulkError("Only admins can assign", status=403)
+        if value is not None:
+            assignee = session.query(User).filter(
+                User.id == value,
+                User.tenant_id == user.tenant_id,
+                User.is_active == True
+            ).first()
+            if not assignee:
+                raise BulkError(f"User {value} not found or not active")
+
+    result = apply_bulk(session, target, user, action, value, ids=ids, filters=filters)
+
+    if assignee and result["updated_ids"]:
+        label = f"{target.entity_type}s"
+        publish_after_commit(session, assignment_event(
+            tenant_id=user.tenant_id,
+            recipient_email=assignee.email,
+            entity_type=label,
+            entity_name=f"{result['updated']} {label}",
+            assigned_by=user.email,
+            entity_ids=result["updated_ids"]
+        ))
+    return result
@@ -0,0 +1,220 @@
+"""
+Subscribable follow-up calendar feeds.
+
+A feed URL carries a signed token (itsdangerous, salt "calendar-feed") for
+either one user's follow-ups or, for admins, the whole team's. Calendar
+apps poll these URLs every few minutes, so:
+
+  - the feed is built from a single query (follow-ups with their client /
+    lead / project names joined in),
+  - the rendered calendar is cached per feed and served with ETag and
+    Last-Modified, answering unchanged polls with 304,
+  - interaction handlers call invalidate(tenant_id) when follow-ups change;
+    the next poll re-runs the query but only re-renders events whose row
+    changed, reusing the rest from the previous build.
+"""
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from icalendar import Calendar, Event
+from itsdangerous import URLSafeSerializer, BadSignature
+from sqlalchemy import select, func
+from app.models import Interaction, Client, Lead, Project, FollowUpStatus, User
+from app.utils.access_utils import owned_interaction_filter
+
+FEED_SALT = "calendar-feed"
+FEED_SCOPES = ["user", "team"]
+
+# Rolling window of follow-ups included in a feed
+FEED_PAST_DAYS = int(os.environ.get("CALENDAR_FEED_PAST_DAYS", 7))
+FEED_FUTURE_DAYS = int(os.environ.get("CALENDAR_FEED_FUTURE_DAYS", 90))
+# Rebuild at least this often even without changes, so the window rolls forward
+FEED_MAX_AGE = int(os.environ.get("CALENDAR_FEED_MAX_AGE", 900))
+
+
+def _password_fingerprint(user: User) -> str:
+    # Changing the password invalidates previously issued feed URLs
+    return hashlib.sha256(user.password_hash.encode("utf-8")).hexdigest()[:12]
+
+
+def generate_feed_token(secret_key: str, user: User, scope: str = "user") -> str:
+    serializer = URLSafeSerializer(secret_key, salt=FEED_SALT)
+    return serializer.dumps({"u": user.id, "s": scope, "k": _password_fingerprint(user)})
+
+
+def load_feed_token(secret_key: str, token: str) -> Optional[dict]:
+    serializer = URLSafeSerializer(secret_key, salt=FEED_SALT)
+    try:
+        data = serializer.loads(token)
+    except BadSignature:
+        return None
+    if not isinstance(data, dict) or data.get("s") not in FEED_SCOPES:
+        return None
+    return data
+
+
+def token_matches_user(data: dict, user: User) -> bool:
+    return data.get("k") == _password_fingerprint(user)
+
+
+def follow_up_query(tenant_id: Optional[int] = None):
+    """
+    Interactions with everything a follow-up event needs, in one statement
+    """
+    stmt = select(
+        Interaction.id,
+        Interaction.follow_up,
+        Interaction.contact_date,
+        Interaction.summary,
+        Interaction.outcome,
+        Interaction.notes,
+        func.coalesce(Client.name, Lead.name, Project.project_name, "CRM Entity").label("entity_name"),
+        func.coalesce(
+            Interaction.contact_person, Client.contact_person, Lead.contact_person,
+            Project.primary_contact_name, "Contact"
+        ).label("contact_name"),
+        func.coalesce(
+            Interaction.phone, Client.phone, Lead.phone, Project.primary_contact_phone
+        ).label("phone"),
+        func.coalesce(
+            Interaction.email, Client.email, Lead.email, Project.primary_contact_email
+        ).label("email"),
+    ).select_from(Interaction).outerjoin(
+        Client, Interaction.client_id == Client.id
+    ).outerjoin(
+        Lead, Interaction.lead_id == Lead.id
+    ).outerjoin(
+        Project, Interaction.project_id == Project.id
+    )
+    if tenant_id is not None:
+        stmt = stmt.where(Interaction.tenant_id == tenant_id)
+    return stmt
+
+
+def feed_query(user: User, scope: str, now: datetime):
+    stmt = follow_up_query(user.tenant_id).where(
+        Interaction.follow_up != None,
+        Interaction.followup_status != FollowUpStatus.completed,
+        Interaction.follow_up >= now - timedelta(days=FEED_PAST_DAYS),
+        Interaction.follow_up <= now + timedelta(days=FEED_FUTURE_DAYS),
+    )
+    if scope == "user":
+        stmt = stmt.where(owned_interaction_filter(user))
+    return stmt.order_by(Interaction.follow_up)
+
+
+def build_event(row) -> Event:
+    event = Event()
+    event.add("summary", f"Follow-up: {row.entity_name} - {row.contact_name}")
+    event.add("dtstart", row.follow_up)
+    event.add("dtend", row.follow_up)
+    event.add("dtstamp", row.contact_date or row.follow_up)
+    event.add("description", f"Outcome: {row.outcome or ''}\nNotes: {row.notes or ''}")
+
+    # Build location string with contact info
+    location_parts = []
+    if row.phone:
+        location_parts.append(f"Phone: {row.phone}")
+    if row.email:
+        location_parts.append(f"Email: {row.email}")
+    event.add("location", "\n".join(location_parts))
+    event["uid"] = f"interaction-{row.id}@pathsixcrm"
+    return event
+
+
+def new_calendar(name: Optional[str] = None) -> Calendar:
+    cal = Calendar()
+    cal.add("prodid", "-//PathSix CRM//EN")
+    cal.add("version", "2.0")
+    if name:
+        cal.add("x-wr-calname", name)
+    return cal
+
+
+class FeedEntry:
+    def __init__(self):
+        self.body = b""
+        self.etag = None
+        self.last_modified = None
+        self.built_at = 0.0
+        self.version = -1
+        # interaction id -> (row fingerprint, rendered VEVENT)
+        self.events: Dict[int, Tuple[tuple, bytes]] = {}
+
+
+class CalendarFeedCache:
+    def __init__(self, max_age: int = FEED_MAX_AGE):
+        self.max_age = max_age
+        self._entries: Dict[Tuple[int, str, int], FeedEntry] = {}
+        self._versions: Dict[int, int] = {}
+        self.builds = 0
+        self.events_rendered = 0
+
+    def invalidate(self, tenant_id: int):
+        """
+        Mark every feed of the tenant stale; call after follow-ups or
+        ownership change. Cheap: the next poll does the rebuild.
+        """
+        self._versions[tenant_id] = self._versions.get(tenant_id, 0) + 1
+
+    def get(self, session, user: User, scope: str) -> FeedEntry:
+        key = (user.tenant_id, scope, user.id if scope == "user" else 0)
+        entry = self._entries.setdefault(key, FeedEntry())
+        version = self._versions.get(user.tenant_id, 0)
+        if entry.version == version and time.monotonic() - entry.built_at < self.max_age:
+            return entry
+
+        now = datetime.utcnow()
+        rows = session.execute(feed_query(user, scope, now)).all()
+
+        events = {}
+        for row in rows:
+            fingerprint = tuple(row)
+            cached = entry.events.get(row.id)
+            if cached and cached[0] == fingerprint:
+                events[row.id] = cached
+            else:
+                events[row.id] = (fingerprint, build_event(row).to_ical())
+                self.events_rendered += 1
+
+        name = "PathSix CRM follow-ups" if scope == "user" else "PathSix CRM team follow-ups"
+        calendar = new_calendar(name).to_ical()
+        # Splice the cached VEVENTs in before END:VCALENDAR
+        head, tail = calendar.rsplit(b"END:VCALENDAR", 1)
+        body = head + b"".join(vevent for _, vevent in events.values()) + b"END:VCALENDAR" + tail
+
+        etag = hashlib.sha1(body).hexdigest()
+        if etag != entry.etag:
+            entry.body = body
+            entry.etag = etag
+            entry.last_modified = now.replace(microsecond=0)
+        entry.events = events
+        entry.version = version
+        entry.built_at = time.monotonic()
+        self.builds += 1
+        return entry
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def not_modified(entry: FeedEntry, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+    """
+    Conditional GET check; If-None-Match wins over If-Modified-Since
+    """
+    if if_none_match:
+        return entry.etag in [tag.strip().strip('"').removeprefix('W/"') for tag in if_none_match.split(",")]
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).astimezone(timezone.utc).replace(tzinfo=None)
+        except (TypeError, ValueError):
+            return False
+        return entry.last_modified <= since
+    return False
+
+
+calendar_feeds = CalendarFeedCache()
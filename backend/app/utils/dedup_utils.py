@@ -0,0 +1,140 @@
+"""
+Match keys for detecting duplicate leads/clients.
+
+A record gets up to three normalized keys: name+city, phone digits and email.
+Two records sharing any key are treated as the same company.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+from app.models import Client, Lead
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+_NON_DIGIT = re.compile(r'\D+')
+
+# (entity_type, entity_id); entity_id is None for rows added earlier in the same import
+EntityRef = Tuple[str, Optional[int]]
+
+
+def normalize_name(value: Optional[str]) -> str:
+    if not value:
+        return ""
+    return _NON_ALNUM.sub(' ', str(value).lower()).strip()
+
+
+def normalize_phone_digits(value: Optional[str]) -> Optional[str]:
+    """
+    Reduce a phone number to comparable digits (last 10 for US numbers)
+    """
+    if not value:
+        return None
+    digits = _NON_DIGIT.sub('', str(value))
+    if len(digits) < 7:
+        return None
+    return digits[-10:]
+
+
+def normalize_email(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    email = str(value).strip().lower()
+    return email or None
+
+
+def build_match_keys(name: Optional[str], city: Optional[str] = None, phone: Optional[str] = None,
+                     email: Optional[str] = None, secondary_phone: Optional[str] = None) -> List[str]:
+    keys = []
+    name_key = normalize_name(name)
+    if name_key:
+        keys.append(f"n:{name_key}|{normalize_name(city)}")
+    for number in (phone, secondary_phone):
+        digits = normalize_phone_digits(number)
+        if digits:
+            keys.append(f"p:{digits}")
+    email_key = normalize_email(email)
+    if email_key:
+        keys.append(f"e:{email_key}")
+    return keys
+
+
+def match_key_frame(name: pd.Series, city: pd.Series, phone: pd.Series, email: pd.Series) -> pd.DataFrame:
+    """
+    Vectorized build_match_keys for whole columns.
+    Returns one column per key kind ("n", "p", "e"), <NA> where a row has no such key.
+    """
+    name_key = name.astype("string").str.lower().str.replace(_NON_ALNUM.pattern, ' ', regex=True).str.strip()
+    city_key = city.astype("string").str.lower().str.replace(_NON_ALNUM.pattern, ' ', regex=True).str.strip()
+    name_key = name_key.mask(name_key == "")
+
+    digits = phone.astype("string").str.replace(_NON_DIGIT.pattern, '', regex=True)
+    digits = digits.where(digits.str.len() >= 7).str.slice(-10)
+
+    email_key = email.astype("string").str.strip().str.lower()
+    email_key = email_key.mask(email_key == "")
+
+    return pd.DataFrame({
+        "n": "n:" + name_key + "|" + city_key.fillna(""),
+        "p": "p:" + digits,
+        "e": "e:" + email_key,
+    }, index=name.index)
+
+
+def key_lists(keys: pd.DataFrame) -> List[List[str]]:
+    """
+    Per-row key lists from a match_key_frame, in index order
+    """
+    return [[k for k in row if not pd.isna(k)] for row in keys.itertuples(index=False)]
+
+
+class MatchKeyIndex:
+    """
+    In-memory hash index of match keys for one tenant's leads and clients.
+    Built with one query per table, then consulted per import row.
+    """
+
+    def __init__(self):
+        self._keys: Dict[str, EntityRef] = {}
+
+    @classmethod
+    def load(cls, session, tenant_id: int) -> "MatchKeyIndex":
+        index = cls()
+        for model, entity_type in ((Lead, "lead"), (Client, "client")):
+            rows = session.query(
+                model.id, model.name, model.city, model.phone, model.secondary_phone, model.email
+            ).filter(
+                model.tenant_id == tenant_id,
+                model.deleted_at == None
+            ).yield_per(5000)
+
+            for row in rows:
+                index.add(
+                    build_match_keys(row.name, row.city, row.phone, row.email, row.secondary_phone),
+                    (entity_type, row.id)
+                )
+        return index
+
+    def __len__(self):
+        return len(self._keys)
+
+    def find(self, keys: List[str]) -> Optional[Tuple[str, EntityRef]]:
+        """
+        Return (matched_key, entity_ref) for the first key already indexed
+        """
+        for key in keys:
+            ref = self._keys.get(key)
+            if ref is not None:
+                return key, ref
+        return None
+
+    def matches(self, keys: pd.DataFrame) -> pd.Series:
+        """
+        Vectorized lookup: True for rows with any key already indexed
+        """
+        found = pd.Series(False, index=keys.index)
+        for column in keys.columns:
+            found |= keys[column].map(self._keys).notna()
+        return found
+
+    def add(self, keys: List[str], ref: EntityRef):
+        for key in keys:
+            self._keys.setdefault(key, ref)
@@ -1,4 +1,23 @@
 # app/utils/email_utils.py
+"""
+Outbound email.
+
+While the app is serving, mail goes through `mailer`: an async queue drained
+by a small pool of long-lived SMTP connections, so a burst of notifications
+costs one connect/TLS handshake per connection instead of one per message.
+Queued messages are sent in batches over the same connection, retried with
+exponential backoff, and a circuit breaker stops hammering a server that is
+down. Outside the server (scripts, shells) send_email falls back to a
+one-off connection.
+
+To try it locally point MAIL_SERVER/MAIL_PORT at a stand-in such as
+`python -m aiosmtpd -n -l 127.0.0.1:8025` with MAIL_USE_TLS = False.
+"""
+import asyncio
+import os
+import random
+import time
+from typing import List, Optional
 import aiosmtplib
 from email.message import EmailMessage
 from app.config import (
@@ -11,13 +30,268 @@ from app.config import (
     MAIL_FROM_EMAIL,
 )
 
-async def send_email(subject: str, recipient: str, body: str):
+# Long-lived SMTP connections (one worker each)
+MAIL_POOL_SIZE = int(os.environ.get("MAIL_POOL_SIZE", 2))
+# Messages a worker takes off the queue per connection round
+MAIL_BATCH_SIZE = int(os.environ.get("MAIL_BATCH_SIZE", 20))
+MAIL_MAX_ATTEMPTS = int(os.environ.get("MAIL_MAX_ATTEMPTS", 5))
+MAIL_RETRY_BASE_DELAY = float(os.environ.get("MAIL_RETRY_BASE_DELAY", 2))
+MAIL_RETRY_MAX_DELAY = float(os.environ.get("MAIL_RETRY_MAX_DELAY", 300))
+# Consecutive connection failures that open the breaker, and how long it stays open
+MAIL_BREAKER_THRESHOLD = int(os.environ.get("MAIL_BREAKER_THRESHOLD", 5))
+MAIL_BREAKER_COOLDOWN = float(os.environ.get("MAIL_BREAKER_COOLDOWN", 60))
+# Idle connections are closed after this many seconds without mail
+MAIL_IDLE_TIMEOUT = float(os.environ.get("MAIL_IDLE_TIMEOUT", 60))
+MAIL_QUEUE_MAXSIZE = int(os.environ.get("MAIL_QUEUE_MAXSIZE", 10000))
+MAIL_TIMEOUT = float(os.environ.get("MAIL_TIMEOUT", 30))
+
+
+def build_message(subject: str, recipient: str, body: str) -> EmailMessage:
     message = EmailMessage()
     message["From"] = f"{MAIL_FROM_NAME} <{MAIL_FROM_EMAIL}>"
     message["To"] = recipient
     message["Subject"] = subject
     message.set_content(body)
+    return message
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `threshold` consecutive failures; after `cooldown`
+    seconds one attempt is let through (half-open) and a success closes it.
+    """
+
+    def __init__(self, threshold: int = MAIL_BREAKER_THRESHOLD, cooldown: float = MAIL_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def wait_time(self) -> float:
+        """Seconds until the next attempt is allowed (0 when closed or half-open)"""
+        if self.opened_at is None:
+            return 0
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        if self.opened_at is not None:
+            print("[Mail] SMTP server reachable again, circuit closed.")
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            if self.state != "open":
+                print(f"[Mail] {self.failures} consecutive SMTP failures, pausing sends for {self.cooldown}s.")
+            self.opened_at = time.monotonic()
+
+
+class OutboundMail:
+    __slots__ = ("message", "attempts", "future")
+
+    def __init__(self, message: EmailMessage, future: asyncio.Future):
+        self.message = message
+        self.attempts = 0
+        self.future = future
+
+
+def _is_permanent(error: Exception) -> bool:
+    """5xx replies (including refused recipients) won't succeed on retry; 4xx and network errors might"""
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all(500 <= refused.code < 600 for refused in error.recipients)
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        return 500 <= error.code < 600
+    return False
+
+
+class SMTPMailer:
+    def __init__(self, pool_size: int = MAIL_POOL_SIZE, batch_size: int = MAIL_BATCH_SIZE,
+                 max_attempts: int = MAIL_MAX_ATTEMPTS, hostname: str = MAIL_SERVER, port: int = MAIL_PORT):
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.hostname = hostname
+        self.port = port
+        self.breaker = CircuitBreaker()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._retry_handles = set()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.connections_opened = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=MAIL_QUEUE_MAXSIZE)
+        self._workers = [asyncio.create_task(self._worker(n)) for n in range(self.pool_size)]
+
+    async def stop(self, timeout: float = 10):
+        """
+        Give queued mail `timeout` seconds to go out, then close the pool.
+        Messages still waiting for a retry are dropped.
+        """
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"[Mail] Shutting down with {self._queue.qsize()} unsent messages.")
+        for handle in self._retry_handles:
+            handle.cancel()
+        if self._retry_handles:
+            print(f"[Mail] Dropping {len(self._retry_handles)} messages waiting for retry.")
+        self._retry_handles.clear()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, message: EmailMessage) -> asyncio.Future:
+        """
+        Queue a message. The returned future resolves when it has been
+        accepted by the server, or fails after the last attempt.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(OutboundMail(message, future))
+        return future
 
+    def stats(self):
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "waiting_retry": len(self._retry_handles),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "connections_opened": self.connections_opened,
+            "circuit": self.breaker.state,
+        }
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            username=MAIL_USERNAME,
+            password=MAIL_PASSWORD,
+            start_tls=MAIL_USE_TLS,
+            timeout=MAIL_TIMEOUT,
+        )
+        await smtp.connect()
+        self.connections_opened += 1
+        return smtp
+
+    async def _close(self, smtp: Optional[aiosmtplib.SMTP]):
+        if smtp is None:
+            return
+        try:
+            if smtp.is_connected:
+                await smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def _retry(self, item: OutboundMail, error: Exception):
+        item.attempts += 1
+        if _is_permanent(error) or item.attempts >= self.max_attempts:
+            self.failed += 1
+            print(f"[Mail] Giving up on message to {item.message['To']} after {item.attempts} attempts: {error}")
+            if not item.future.done():
+                item.future.set_exception(error)
+            return
+
+        self.retried += 1
+        delay = min(MAIL_RETRY_MAX_DELAY, MAIL_RETRY_BASE_DELAY * 2 ** (item.attempts - 1))
+        delay += random.uniform(0, delay / 10)
+
+        def requeue():
+            self._retry_handles.discard(handle)
+            self._queue.put_nowait(item)
+
+        handle = asyncio.get_running_loop().call_later(delay, requeue)
+        self._retry_handles.add(handle)
+
+    async def _next_batch(self) -> List[OutboundMail]:
+        batch = [await asyncio.wait_for(self._queue.get(), MAIL_IDLE_TIMEOUT)]
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _worker(self, number: int):
+        smtp = None
+        try:
+            while True:
+                try:
+                    batch = await self._next_batch()
+                except asyncio.TimeoutError:
+                    # Nothing to send for a while; don't hold the connection open
+                    await self._close(smtp)
+                    smtp = None
+                    continue
+
+                try:
+                    smtp = await self._send_batch(smtp, batch)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+        finally:
+            await self._close(smtp)
+
+    async def _send_batch(self, smtp, batch: List[OutboundMail]):
+        """
+        Send a batch over one connection. Returns the connection to reuse
+        (None when it has to be re-established).
+        """
+        wait = self.breaker.wait_time()
+        if wait:
+            await asyncio.sleep(wait)
+
+        if smtp is None or not smtp.is_connected:
+            try:
+                smtp = await self._connect()
+            except Exception as e:
+                self.breaker.record_failure()
+                for item in batch:
+                    self._retry(item, e)
+                return None
+
+        for position, item in enumerate(batch):
+            try:
+                await smtp.send_message(item.message)
+            except (ConnectionError, TimeoutError) as e:
+                # Connection dropped mid-batch: everything not yet sent goes back
+                self.breaker.record_failure()
+                for rest in batch[position:]:
+                    self._retry(rest, e)
+                smtp.close()
+                return None
+            except Exception as e:
+                self._retry(item, e)
+                continue
+
+            self.sent += 1
+            self.breaker.record_success()
+            if not item.future.done():
+                item.future.set_result(True)
+        return smtp
+
+
+mailer = SMTPMailer()
+
+
+async def _send_direct(message: EmailMessage):
     await aiosmtplib.send(
         message,
         hostname=MAIL_SERVER,
@@ -27,15 +301,22 @@ async def send_email(subject: str, recipient: str, body: str):
         start_tls=MAIL_USE_TLS,
     )
 
-async def send_assignment_notification(to_email: str, entity_type: str, entity_name: str, assigned_by: str):
-    subject = f"New {entity_type.capitalize()} Assigned to You"
-    body = (
-        f"You've been assigned to the {entity_type} '{entity_name}' by {assigned_by}.\n"
-        f"Please log in to the CRM to view the details.\n\n"
-        f"— {MAIL_FROM_NAME}"
-    )
-    try:
-        await send_email(subject, to_email, body)
-    except Exception as e:
-        # Optional: log the error so it's not silent
-        print(f"Failed to send assignment notification: {e}")
\ No newline at end of file
+
+async def send_email(subject: str, recipient: str, body: str, wait: bool = False):
+    """
+    Queue an email on the pooled mailer. With wait=True, return only once
+    it was delivered (raising if every attempt failed). Without a running
+    mailer the message is sent directly.
+    """
+    message = build_message(subject, recipient, body)
+
+    if not mailer.running:
+        await _send_direct(message)
+        return
+
+    future = mailer.submit(message)
+    if wait:
+        await future
+    else:
+        # Failures are reported by the mailer; don't warn about an unread exception
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
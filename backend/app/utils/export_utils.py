@@ -0,0 +1,387 @@
+"""
+Streaming exports.
+
+Each ExportSpec is a flat column list (with joined names instead of bare
+foreign keys) plus the same visibility rule the entity's list endpoint uses.
+Rows are read from a server-side cursor in batches and written out as they
+arrive, so a full-tenant export never sits in memory at once.
+
+Columnar (Parquet / Arrow IPC) exports keep the database types: the Arrow
+schema is derived from the SQLAlchemy column types.
+"""
+import asyncio
+import csv
+import enum
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+import tempfile
+from datetime import datetime
+from typing import AsyncIterator, Callable, List, Optional, Sequence, Tuple
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import select, types
+from sqlalchemy.orm import aliased
+from app.database import engine
+from app.models import Client, Lead, Project, Interaction, Account, Contact, User, ActivityLog
+from app.utils import access_utils
+
+# Rows fetched from the cursor per round trip
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 1000))
+
+# Columnar formats: name -> (file extension, mimetype)
+COLUMNAR_FORMATS = {
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "arrow": (".arrow", "application/vnd.apache.arrow.file"),
+}
+
+AssignedUser = aliased(User)
+CreatedByUser = aliased(User)
+
+
+class ExportSpec:
+    def __init__(self, model, columns: List[Tuple[str, object]], access: Callable,
+                 joins: List[Tuple[object, object]] = None, soft_delete: bool = False,
+                 date_column=None, columnar: bool = False):
+        self.model = model
+        self.columns = columns      # (header, column expression)
+        self.access = access        # access_utils rule: user -> predicate or None
+        self.joins = joins or []    # outer joins needed by the columns
+        self.soft_delete = soft_delete
+        self.date_column = date_column  # what start/end filter on
+        self.columnar = columnar    # offered as Parquet/Arrow for analytics
+
+    @property
+    def headers(self) -> List[str]:
+        return [header for header, _ in self.columns]
+
+    def query(self, user, start: Optional[datetime] = None, end: Optional[datetime] = None):
+        stmt = select(*[expression for _, expression in self.columns]).select_from(self.model)
+        for target, onclause in self.joins:
+            stmt = stmt.outerjoin(target, onclause)
+        stmt = stmt.where(self.model.tenant_id == user.tenant_id)
+        if start is not None:
+            stmt = stmt.where(self.date_column >= start)
+        if end is not None:
+            stmt = stmt.where(self.date_column < end)
+        if self.soft_delete:
+            stmt = stmt.where(self.model.deleted_at == None)
+        predicate = self.access(user)
+        if predicate is not None:
+            stmt = stmt.where(predicate)
+        return stmt.order_by(self.model.id)
+
+
+def _company_columns(model) -> List[Tuple[str, object]]:
+    return [
+        ("id", model.id),
+        ("name", model.name),
+        ("contact_person", model.contact_person),
+        ("contact_title", model.contact_title),
+        ("email", model.email),
+        ("phone", model.phone),
+        ("phone_label", model.phone_label),
+        ("secondary_phone", model.secondary_phone),
+        ("secondary_phone_label", model.secondary_phone_label),
+        ("address", model.address),
+        ("city", model.city),
+        ("state", model.state),
+        ("zip", model.zip),
+        ("type", model.type),
+    ]
+
+
+EXPORTS = {
+    "leads": ExportSpec(
+        Lead,
+        _company_columns(Lead) + [
+            ("lead_status", Lead.lead_status),
+            ("notes", Lead.notes),
+            ("created_at", Lead.created_at),
+            ("converted_on", Lead.converted_on),
+            ("assigned_to", AssignedUser.email),
+            ("created_by", CreatedByUser.email),
+        ],
+        access_utils.listed_lead_filter,
+        joins=[
+            (AssignedUser, Lead.assigned_to == AssignedUser.id),
+            (CreatedByUser, Lead.created_by == CreatedByUser.id),
+        ],
+        soft_delete=True,
+        date_column=Lead.created_at,
+        columnar=True,
+    ),
+    "clients": ExportSpec(
+        Client,
+        _company_columns(Client) + [
+            ("status", Client.status),
+            ("notes", Client.notes),
+            ("created_at", Client.created_at),
+            ("assigned_to", AssignedUser.email),
+            ("created_by", CreatedByUser.email),
+        ],
+        access_utils.listed_client_filter,
+        joins=[
+            (AssignedUser, Client.assigned_to == AssignedUser.id),
+            (CreatedByUser, Client.created_by == CreatedByUser.id),
+        ],
+        soft_delete=True,
+        date_column=Client.created_at,
+    ),
+    "projects": ExportSpec(
+        Project,
+        [
+            ("id", Project.id),
+            ("project_name", Project.project_name),
+            ("project_description", Project.project_description),
+            ("type", Project.type),
+            ("project_status", Project.project_status),
+            ("project_start", Project.project_start),
+            ("project_end", Project.project_end),
+            ("project_worth", Project.project_worth),
+            ("client_id", Project.client_id),
+            ("client_name", Client.name),
+            ("lead_id", Project.lead_id),
+            ("lead_name", Lead.name),
+            ("primary_contact_name", Project.primary_contact_name),
+            ("primary_contact_title", Project.primary_contact_title),
+            ("primary_contact_email", Project.primary_contact_email),
+            ("primary_contact_phone", Project.primary_contact_phone),
+            ("primary_contact_phone_label", Project.primary_contact_phone_label),
+            ("notes", Project.notes),
+            ("created_at", Project.created_at),
+            ("created_by", CreatedByUser.email),
+        ],
+        access_utils.project_filter,
+        joins=[
+            (Client, Project.client_id == Client.id),
+            (Lead, Project.lead_id == Lead.id),
+            (CreatedByUser, Project.created_by == CreatedByUser.id),
+        ],
+        date_column=Project.created_at,
+        columnar=True,
+    ),
+    "interactions": ExportSpec(
+        Interaction,
+        [
+            ("id", Interaction.id),
+            ("contact_date", Interaction.contact_date),
+            ("summary", Interaction.summary),
+            ("outcome", Interaction.outcome),
+            ("notes", Interaction.notes),
+            ("contact_person", Interaction.contact_person),
+            ("email", Interaction.email),
+            ("phone", Interaction.phone),
+            ("follow_up", Interaction.follow_up),
+            ("followup_status", Interaction.followup_status),
+            ("client_id", Interaction.client_id),
+            ("client_name", Client.name),
+            ("lead_id", Interaction.lead_id),
+            ("lead_name", Lead.name),
+            ("project_id", Interaction.project_id),
+            ("project_name", Project.project_name),
+        ],
+        access_utils.interaction_filter,
+        joins=[
+            (Client, Interaction.client_id == Client.id),
+            (Lead, Interaction.lead_id == Lead.id),
+            (Project, Interaction.project_id == Project.id),
+        ],
+        date_column=Interaction.contact_date,
+        columnar=True,
+    ),
+    "accounts": ExportSpec(
+        Account,
+        [
+            ("id", Account.id),
+            ("account_number", Account.account_number),
+            ("account_name", Account.account_name),
+            ("status", Account.status),
+            ("opened_on", Account.opened_on),
+            ("client_id", Account.client_id),
+            ("client_name", Client.name),
+            ("notes", Account.notes),
+        ],
+        access_utils.account_filter,
+        joins=[(Client, Account.client_id == Client.id)],
+        date_column=Account.opened_on,
+    ),
+    "contacts": ExportSpec(
+        Contact,
+        [
+            ("id", Contact.id),
+            ("first_name", Contact.first_name),
+            ("last_name", Contact.last_name),
+            ("title", Contact.title),
+            ("email", Contact.email),
+            ("phone", Contact.phone),
+            ("phone_label", Contact.phone_label),
+            ("secondary_phone", Contact.secondary_phone),
+            ("secondary_phone_label", Contact.secondary_phone_label),
+            ("client_id", Contact.client_id),
+            ("client_name", Client.name),
+            ("lead_id", Contact.lead_id),
+            ("lead_name", Lead.name),
+            ("notes", Contact.notes),
+            ("created_at", Contact.created_at),
+        ],
+        access_utils.contact_filter,
+        joins=[
+            (Client, Contact.client_id == Client.id),
+            (Lead, Contact.lead_id == Lead.id),
+        ],
+        date_column=Contact.created_at,
+    ),
+    "activity": ExportSpec(
+        ActivityLog,
+        [
+            ("id", ActivityLog.id),
+            ("timestamp", ActivityLog.timestamp),
+            ("user_id", ActivityLog.user_id),
+            ("user_email", User.email),
+            ("action", ActivityLog.action),
+            ("entity_type", ActivityLog.entity_type),
+            ("entity_id", ActivityLog.entity_id),
+            ("description", ActivityLog.description),
+        ],
+        access_utils.activity_filter,
+        joins=[(User, ActivityLog.user_id == User.id)],
+        date_column=ActivityLog.timestamp,
+        columnar=True,
+    ),
+}
+
+
+async def stream_partitions(stmt, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[Sequence]:
+    """
+    Yield batches of rows from a server-side cursor without blocking the event loop.
+    All cursor work runs on one dedicated thread, since DB-API connections
+    aren't meant to hop between threads.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
+
+    def open_cursor():
+        connection = engine.connect()
+        try:
+            result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(stmt)
+        except Exception:
+            connection.close()
+            raise
+        return connection, result.partitions()
+
+    try:
+        connection, partitions = await loop.run_in_executor(executor, open_cursor)
+        try:
+            while True:
+                rows = await loop.run_in_executor(executor, next, partitions, None)
+                if rows is None:
+                    break
+                yield rows
+        finally:
+            await loop.run_in_executor(executor, connection.close)
+    finally:
+        executor.shutdown(wait=False)
+
+
+def format_value(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+async def stream_csv(headers: List[str], stmt) -> AsyncIterator[bytes]:
+    """
+    CSV export body: the header line, then one chunk per cursor batch
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    yield buffer.getvalue().encode("utf-8")
+
+    async for rows in stream_partitions(stmt):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([format_value(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def arrow_type(sql_type):
+    """
+    Arrow type for a SQLAlchemy column type. Enums become dictionary-encoded strings.
+    """
+    # Enum and Text are String subclasses, so check them first
+    if isinstance(sql_type, types.Enum):
+        return pa.dictionary(pa.int32(), pa.string())
+    if isinstance(sql_type, types.Boolean):
+        return pa.bool_()
+    if isinstance(sql_type, types.Integer):
+        return pa.int64()
+    if isinstance(sql_type, (types.Float, types.Numeric)):
+        return pa.float64()
+    if isinstance(sql_type, types.DateTime):
+        return pa.timestamp("us")
+    if isinstance(sql_type, types.Date):
+        return pa.date32()
+    return pa.string()
+
+
+def arrow_schema(spec: ExportSpec):
+    return pa.schema([(header, arrow_type(expression.type)) for header, expression in spec.columns])
+
+
+def write_columnar(spec: ExportSpec, stmt, file_format: str, batch_size: int = EXPORT_BATCH_SIZE) -> str:
+    """
+    Write a query result to a temporary Parquet/Arrow file one cursor batch
+    (one row group / record batch) at a time. Returns the file path; the
+    caller deletes it.
+    """
+    schema = arrow_schema(spec)
+    enum_columns = {i for i, field in enumerate(schema) if pa.types.is_dictionary(field.type)}
+    extension, _ = COLUMNAR_FORMATS[file_format]
+    handle, path = tempfile.mkstemp(suffix=extension, prefix="export_")
+    os.close(handle)
+
+    try:
+        if file_format == "parquet":
+            writer = pq.ParquetWriter(path, schema, compression="zstd")
+        else:
+            writer = pa.ipc.new_file(path, schema)
+        try:
+            with engine.connect() as connection:
+                result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(stmt)
+                for rows in result.partitions():
+                    columns = list(zip(*rows))
+                    arrays = [
+                        pa.array(
+                            [format_value(v) for v in values] if i in enum_columns else values,
+                            type=field.type
+                        )
+                        for i, (field, values) in enumerate(zip(schema, columns))
+                    ]
+                    writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+        finally:
+            writer.close()
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+async def stream_file(path: str, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+    """
+    Stream a temporary export file and delete it afterwards
+    """
+    try:
+        with open(path, "rb") as f:
+            while True:
+                chunk = await asyncio.to_thread(f.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
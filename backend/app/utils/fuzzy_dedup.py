@@ -0,0 +1,331 @@
+"""
+Fuzzy duplicate detection across leads, clients and contacts.
+
+Exact match keys (dedup_utils) catch re-imports of the same row, but not
+"Acme Milling, Inc." vs "ACME MILLING INC" at a reformatted address. This
+engine finds those without comparing every record with every other one:
+
+  1. Each record's normalized name becomes a set of character trigrams.
+  2. A MinHash signature (NUM_PERM hash minimums, vectorized with numpy)
+     summarizes each set so that equal signature positions estimate the
+     Jaccard similarity of the sets.
+  3. Locality-sensitive hashing splits signatures into bands; records
+     sharing any band land in the same bucket and become candidates.
+     Records sharing a phone number or email are candidates as well.
+  4. Only candidate pairs are scored (exact trigram Jaccard of name and
+     address, plus shared phone/email) and kept above DEDUP_MIN_SCORE.
+
+Scans run as background jobs; the latest result per tenant is kept in
+memory for the duplicate-pairs endpoint.
+"""
+import asyncio
+import os
+import zlib
+from collections import defaultdict
+from datetime import datetime
+from itertools import combinations
+from typing import Any, Dict, List, Optional
+import numpy as np
+from sqlalchemy import select, func
+from app.database import SessionLocal
+from app.models import Client, Lead, Contact
+from app.utils.dedup_utils import normalize_name, normalize_phone_digits, normalize_email
+
+NUM_PERM = 64
+LSH_BANDS = 16                              # 16 bands x 4 rows: pairs above ~0.5 Jaccard collide
+LSH_ROWS = NUM_PERM // LSH_BANDS
+# Buckets larger than this (very common names, shared switchboard numbers)
+# are skipped instead of producing n^2 candidates
+DEDUP_MAX_BUCKET = int(os.environ.get("DEDUP_MAX_BUCKET", 50))
+DEDUP_MIN_SCORE = float(os.environ.get("DEDUP_MIN_SCORE", 0.4))
+# Estimated name similarity a band collision needs to be scored
+DEDUP_MIN_SIMILARITY = float(os.environ.get("DEDUP_MIN_SIMILARITY", 0.5))
+# Trigrams hashed per numpy batch, and permutations computed at a time: the
+# working array is their product in uint64s (32 MB), whatever the names
+DEDUP_BATCH_HASHES = int(os.environ.get("DEDUP_BATCH_HASHES", 250_000))
+DEDUP_PERM_BLOCK = 16
+# Candidate pairs compared per numpy batch
+DEDUP_PAIR_BATCH = int(os.environ.get("DEDUP_PAIR_BATCH", 200_000))
+
+# Score weights: name similarity, address similarity, shared phone or email.
+# A shared phone/email or a near-identical name alone reaches the default threshold.
+NAME_WEIGHT = 0.45
+ADDRESS_WEIGHT = 0.15
+CONTACT_WEIGHT = 0.4
+
+_rng = np.random.default_rng(20260419)
+_PERM_A = _rng.integers(1, 1 << 63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)   # odd multipliers
+_PERM_B = _rng.integers(0, 1 << 63, size=NUM_PERM, dtype=np.uint64)
+
+LINKS = {"client": "/clients/{}", "lead": "/leads/{}"}
+
+
+def trigrams(text: str) -> frozenset:
+    if not text:
+        return frozenset()
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class DedupRecord:
+    __slots__ = ("entity_type", "entity_id", "name", "parent", "name_grams", "address_grams", "contact_keys")
+
+    def __init__(self, entity_type: str, entity_id: int, name: str, address: str,
+                 phones, email, parent=None):
+        self.entity_type = entity_type
+        self.entity_id = entity_id
+        self.name = name
+        # For contacts, the lead/client they belong to (never reported as their duplicate)
+        self.parent = parent
+        self.name_grams = trigrams(normalize_name(name))
+        self.address_grams = trigrams(normalize_name(address))
+        keys = {f"p:{digits}" for digits in map(normalize_phone_digits, phones) if digits}
+        email = normalize_email(email)
+        if email:
+            keys.add(f"e:{email}")
+        self.contact_keys = keys
+
+    @property
+    def ref(self):
+        return (self.entity_type, self.entity_id)
+
+
+def load_records(session, tenant_id: int) -> List[DedupRecord]:
+    """
+    Live leads (not yet converted), clients and contacts of the tenant
+    """
+    records = []
+    companies = [
+        (Client, "client", Client.deleted_at == None),
+        (Lead, "lead", (Lead.deleted_at == None) & (func.coalesce(Lead.lead_status, "open") != "converted")),
+    ]
+    for model, entity_type, live in companies:
+        rows = session.execute(select(
+            model.id, model.name, model.address, model.city, model.state, model.zip,
+            model.phone, model.secondary_phone, model.email
+        ).where(model.tenant_id == tenant_id, live).execution_options(yield_per=5000))
+        for row in rows:
+            address = " ".join(part for part in (row.address, row.city, row.state, row.zip) if part)
+            records.append(DedupRecord(
+                entity_type, row.id, row.name, address, (row.phone, row.secondary_phone), row.email
+            ))
+
+    rows = session.execute(select(
+        Contact.id, Contact.first_name, Contact.last_name, Contact.phone, Contact.secondary_phone,
+        Contact.email, Contact.client_id, Contact.lead_id
+    ).where(Contact.tenant_id == tenant_id).execution_options(yield_per=5000))
+    for row in rows:
+        name = " ".join(part for part in (row.first_name, row.last_name) if part)
+        parent = ("client", row.client_id) if row.client_id else ("lead", row.lead_id)
+        records.append(DedupRecord(
+            "contact", row.id, name, "", (row.phone, row.secondary_phone), row.email, parent=parent
+        ))
+    return records
+
+
+def minhash_signatures(shingle_sets: List[frozenset], job=None) -> np.ndarray:
+    """
+    (len(shingle_sets), NUM_PERM) uint32 MinHash signatures. Empty sets get
+    all-max signatures, which collide with nothing.
+    """
+    signatures = np.full((len(shingle_sets), NUM_PERM), np.iinfo(np.uint32).max, dtype=np.uint32)
+    all_sizes = np.fromiter((len(s) for s in shingle_sets), dtype=np.int64, count=len(shingle_sets))
+    ends = np.cumsum(all_sizes)
+    start = 0
+    while start < len(shingle_sets):
+        if job:
+            job.check_cancelled()
+        # As many records as fit in DEDUP_BATCH_HASHES trigrams (at least one)
+        done = int(ends[start - 1]) if start else 0
+        stop = max(int(np.searchsorted(ends, done + DEDUP_BATCH_HASHES, side="right")), start + 1)
+        batch = shingle_sets[start:stop]
+        sizes = all_sizes[start:stop]
+        hashes = np.fromiter(
+            (zlib.crc32(gram.encode()) for s in batch for gram in s), dtype=np.uint64, count=int(sizes.sum())
+        )
+        if len(hashes):
+            present = np.flatnonzero(sizes)
+            offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))[present]
+            # Multiply-shift hashing ((a*x + b) mod 2^64) >> 32, a block of
+            # permutations at a time, in place in one working array
+            permuted = np.empty((len(hashes), DEDUP_PERM_BLOCK), dtype=np.uint64)
+            for first in range(0, NUM_PERM, DEDUP_PERM_BLOCK):
+                block = slice(first, first + DEDUP_PERM_BLOCK)
+                np.multiply(hashes[:, None], _PERM_A[None, block], out=permuted)
+                np.add(permuted, _PERM_B[None, block], out=permuted)
+                np.right_shift(permuted, np.uint64(32), out=permuted)
+                signatures[start + present, block] = np.minimum.reduceat(permuted, offsets, axis=0)
+        start = stop
+        if job:
+            job.processed = start
+    return signatures
+
+
+def _bucket_pairs(keys: np.ndarray, valid: np.ndarray):
+    """
+    (pair codes i * n + j with i < j, oversized buckets) for rows sharing a key.
+    Buckets are expanded per size, all buckets of one size at once.
+    """
+    n = len(keys)
+    rows = np.flatnonzero(valid)
+    if not len(rows):
+        return np.empty(0, dtype=np.int64), 0
+    order = rows[np.argsort(keys[rows], kind="stable")]
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(keys[order])) + 1))
+    sizes = np.diff(np.concatenate((starts, [len(order)])))
+
+    codes = []
+    for size in np.unique(sizes[(sizes > 1) & (sizes <= DEDUP_MAX_BUCKET)]).tolist():
+        members = np.sort(order[starts[sizes == size][:, None] + np.arange(size)], axis=1)
+        first, second = np.triu_indices(size, 1)
+        codes.append((members[:, first] * n + members[:, second]).ravel())
+    skipped = int((sizes > DEDUP_MAX_BUCKET).sum())
+    return (np.concatenate(codes) if codes else np.empty(0, dtype=np.int64)), skipped
+
+
+def candidate_pairs(records: List[DedupRecord], job=None):
+    """
+    Index pairs worth scoring: those sharing an LSH band of their name
+    signature whose signatures agree on at least DEDUP_MIN_SIMILARITY of
+    their positions, plus those sharing a phone number or email.
+    Returns (set of (i, j), oversized buckets skipped).
+    """
+    n = len(records)
+    # Names drive candidate selection; addresses only refine the score, as
+    # "12 Main St, Wichita" alone is shared by too many unrelated records
+    shingles = [r.name_grams for r in records]
+    signatures = minhash_signatures(shingles, job)
+    valid = np.fromiter((bool(s) for s in shingles), dtype=bool, count=n)
+
+    codes = []
+    skipped = 0
+    multipliers = np.array([1_000_003 ** i for i in range(LSH_ROWS)], dtype=np.uint64)
+    for band in range(LSH_BANDS):
+        if job:
+            job.check_cancelled()
+        columns = signatures[:, band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        band_keys = (columns.astype(np.uint64) * multipliers).sum(axis=1, dtype=np.uint64)
+        band_codes, band_skipped = _bucket_pairs(band_keys, valid)
+        codes.append(band_codes)
+        skipped += band_skipped
+    codes = np.unique(np.concatenate(codes)) if codes else np.empty(0, dtype=np.int64)
+
+    # Signature agreement estimates Jaccard similarity; drop weak band collisions
+    pairs = set()
+    for start in range(0, len(codes), DEDUP_PAIR_BATCH):
+        chunk = codes[start:start + DEDUP_PAIR_BATCH]
+        first, second = chunk // n, chunk % n
+        agreement = (signatures[first] == signatures[second]).mean(axis=1)
+        keep = agreement >= DEDUP_MIN_SIMILARITY
+        pairs.update(zip(first[keep].tolist(), second[keep].tolist()))
+
+    by_contact_key = defaultdict(list)
+    for index, record in enumerate(records):
+        for key in record.contact_keys:
+            by_contact_key[key].append(index)
+    for indexes in by_contact_key.values():
+        if len(indexes) > DEDUP_MAX_BUCKET:
+            skipped += 1
+        elif len(indexes) > 1:
+            pairs.update(combinations(indexes, 2))
+    return pairs, skipped
+
+
+def score_pair(a: DedupRecord, b: DedupRecord):
+    """
+    (score 0..1, reasons) for one candidate pair
+    """
+    name = jaccard(a.name_grams, b.name_grams)
+    address = jaccard(a.address_grams, b.address_grams)
+    shared = a.contact_keys & b.contact_keys
+    score = NAME_WEIGHT * name + ADDRESS_WEIGHT * address + (CONTACT_WEIGHT if shared else 0)
+
+    reasons = []
+    if name:
+        reasons.append(f"name {name:.2f}")
+    if address:
+        reasons.append(f"address {address:.2f}")
+    reasons.extend("phone" if key.startswith("p:") else "email" for key in sorted(shared))
+    return round(score, 3), reasons
+
+
+def _describe(record: DedupRecord) -> Dict[str, Any]:
+    # Contacts are shown on their lead/client page
+    entity_type, entity_id = record.parent or record.ref
+    link = LINKS[entity_type].format(entity_id) if entity_id else None
+    return {"type": record.entity_type, "id": record.entity_id, "name": record.name, "link": link}
+
+
+def find_duplicates(records: List[DedupRecord], min_score: float = DEDUP_MIN_SCORE, job=None):
+    pairs, skipped = candidate_pairs(records, job)
+    results = []
+    for i, j in pairs:
+        a, b = records[i], records[j]
+        if a.parent == b.ref or b.parent == a.ref:
+            # A contact and its own company share details by design
+            continue
+        score, reasons = score_pair(a, b)
+        if score >= min_score:
+            results.append({"score": score, "reasons": reasons, "a": _describe(a), "b": _describe(b)})
+    results.sort(key=lambda pair: pair["score"], reverse=True)
+    return results, len(pairs), skipped
+
+
+class DedupResults:
+    """
+    Latest finished scan per tenant
+    """
+
+    def __init__(self):
+        self._by_tenant: Dict[int, Dict[str, Any]] = {}
+
+    def get(self, tenant_id: int) -> Optional[Dict[str, Any]]:
+        return self._by_tenant.get(tenant_id)
+
+    def set(self, tenant_id: int, result: Dict[str, Any]):
+        self._by_tenant[tenant_id] = result
+
+
+dedup_results = DedupResults()
+
+
+def _scan(job, tenant_id: int, min_score: float):
+    session = SessionLocal()
+    try:
+        records = load_records(session, tenant_id)
+    finally:
+        session.close()
+    job.total = len(records)
+    pairs, candidates, skipped = find_duplicates(records, min_score, job)
+    return {
+        "pairs": pairs,
+        "records": len(records),
+        "candidates": candidates,
+        "skipped_buckets": skipped,
+        "min_score": min_score,
+        "scanned_at": datetime.utcnow().isoformat() + "Z",
+    }
+
+
+async def run_dedup_scan(job, min_score: float = DEDUP_MIN_SCORE):
+    """
+    Background job: scan the job's tenant and publish the ranked pairs
+    """
+    tenant_id = job.tenant_id
+    result = await asyncio.to_thread(_scan, job, tenant_id, min_score)
+    dedup_results.set(tenant_id, result)
+    job.processed = job.total
+    job.result = {
+        "records": result["records"],
+        "candidates": result["candidates"],
+        "duplicate_pairs": len(result["pairs"]),
+        "skipped_buckets": result["skipped_buckets"],
+    }
+    job.message = f"Found {len(result['pairs'])} likely duplicate pairs among {result['records']} records"
+    print(f"[Dedup] Tenant {tenant_id}: {job.message} ({result['candidates']} candidates)")
@@ -0,0 +1,606 @@
+"""
+Generic bulk import engine.
+
+Each importable entity is described by a declarative ImportSpec (see
+import_specs.py): which file columns feed which model fields, how each field
+is validated, which rows reference other records, and who owns the new rows.
+The engine does the rest the same way for every entity:
+
+  parse -> vectorized map/validate per chunk -> de-duplicate -> bulk write,
+
+one transaction per chunk, driven either by a background job (run_import)
+or by a read-only dry run (dry_run_import).
+"""
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+import pandas as pd
+from sqlalchemy import insert, update
+from app.database import SessionLocal
+from app.utils.dedup_utils import MatchKeyIndex, key_lists, match_key_frame, normalize_name
+from app.utils.notifications import assignment_event, notifications
+from app.utils.calendar_feed import calendar_feeds
+from app.utils.reminders import reminders
+from app.utils import search_index, phone_index
+from app.utils.import_utils import (
+    clean_email_series,
+    clean_phone_series,
+    clean_text_series,
+    column,
+    frame_records,
+    parse_import_file,
+)
+
+# Rows written per transaction by background imports
+IMPORT_CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", 500))
+
+# Wall-clock budget for a dry run, in seconds; rows beyond it are not checked
+DRY_RUN_TIME_BUDGET = float(os.environ.get("DRY_RUN_TIME_BUDGET", 5))
+DRY_RUN_CHUNK_SIZE = 5000
+
+# Validation findings reported per row; blocking ones stop the row from importing
+ISSUE_CATEGORIES = [
+    'missing_required', 'missing_reference', 'unknown_reference', 'already_exists',
+    'invalid_email', 'invalid_phone', 'invalid_date', 'invalid_number', 'invalid_choice',
+    'duplicate',
+]
+BLOCKING_ISSUES = ['missing_required', 'missing_reference', 'unknown_reference', 'already_exists']
+
+DUPLICATE_KEY_LABELS = {"n": "name_city", "p": "phone", "e": "email"}
+
+FIELD_KINDS = ["text", "email", "phone", "date", "number", "choice"]
+
+
+class Field:
+    """
+    One model field fed from the first of `sources` present in the file.
+    Non-blocking problems (bad email, unknown choice...) leave the value
+    empty, or at `default`.
+    """
+
+    def __init__(self, sources: List[str], kind: str = "text", max_length: int = None,
+                 required: bool = False, default: Any = None, choices: List[str] = None):
+        assert kind in FIELD_KINDS, kind
+        self.sources = sources
+        self.kind = kind
+        self.max_length = max_length
+        self.required = required
+        self.default = default
+        self.choices = choices
+
+
+class Reference:
+    """
+    A foreign key given either as an id column or as the referenced record's
+    name. Both are resolved against the tenant's records loaded once per import.
+    """
+
+    def __init__(self, entity_type: str, model, name_attr: str,
+                 id_sources: List[str], name_sources: List[str] = None):
+        self.entity_type = entity_type
+        self.model = model
+        self.name_attr = name_attr
+        self.id_sources = id_sources
+        self.name_sources = name_sources or []
+
+
+class ImportSpec:
+    def __init__(self, entity_type: str, label: str, model, fields: Dict[str, Field],
+                 display_field: str, references: Dict[str, Reference] = None,
+                 one_of: List[str] = None, exactly_one: bool = False,
+                 owner_columns: Dict[str, str] = None, timestamp_fields: List[str] = None,
+                 unique_fields: List[str] = None, dedup: bool = False,
+                 update_fields: List[str] = None, assignable: bool = False,
+                 derive: Callable[[pd.DataFrame, Dict[str, pd.Series]], None] = None,
+                 after_write: Callable[[Any, int], None] = None,
+                 template_example: Dict[str, List[str]] = None):
+        self.entity_type = entity_type          # "lead"
+        self.label = label                      # "leads"
+        self.model = model
+        self.fields = fields
+        self.display_field = display_field
+        self.references = references or {}
+        self.one_of = one_of or []              # reference fields of which one (or exactly one) is needed
+        self.exactly_one = exactly_one
+        self.owner_columns = owner_columns or {}  # column -> "importer" | "assignee" | "assignee_or_importer"
+        self.timestamp_fields = timestamp_fields or []  # filled with the import time when empty
+        self.unique_fields = unique_fields or []  # globally unique columns, checked per chunk
+        self.dedup = dedup                      # lead/client match-key de-duplication
+        self.update_fields = update_fields or []  # fields duplicate_policy="update" may overwrite
+        self.assignable = assignable            # notify the assignee after import
+        self.derive = derive                    # extra column-wise mapping after the fields
+        self.after_write = after_write          # (session, tenant_id) hook run before each chunk commits
+        self.template_example = template_example
+
+    def required_columns(self, columns) -> List[str]:
+        """
+        Describe the required inputs missing from a file's columns
+        """
+        missing = []
+        for name, field in self.fields.items():
+            if field.required and field.default is None and not any(s in columns for s in field.sources):
+                missing.append(" or ".join(field.sources))
+        if self.one_of:
+            sources = [
+                s for name in self.one_of
+                for s in self.references[name].id_sources + self.references[name].name_sources
+            ]
+            if not any(s in columns for s in sources):
+                missing.append(" or ".join(sources))
+        return missing
+
+    def template_columns(self) -> Dict[str, List[str]]:
+        if self.template_example:
+            return self.template_example
+        columns = {field.sources[0]: [""] for field in self.fields.values()}
+        for reference in self.references.values():
+            columns[(reference.name_sources or reference.id_sources)[0]] = [""]
+        return columns
+
+
+class ImportContext:
+    """
+    Per-import state loaded once up front: reference lookups, the match-key
+    index and values already seen for unique fields.
+    """
+
+    def __init__(self, spec: ImportSpec, tenant_id: int, imported_by_id: int, assigned_to_id: Optional[int]):
+        self.spec = spec
+        self.tenant_id = tenant_id
+        self.imported_by_id = imported_by_id
+        self.assigned_to_id = assigned_to_id
+        self.dedup_index: Optional[MatchKeyIndex] = None
+        self.reference_ids: Dict[str, set] = {}
+        self.reference_names: Dict[str, Dict[str, int]] = {}
+        self.seen_unique: Dict[str, set] = {name: set() for name in spec.unique_fields}
+
+    def owner_value(self, source: str) -> Optional[int]:
+        if source == "importer":
+            return self.imported_by_id
+        if source == "assignee":
+            return self.assigned_to_id
+        return self.assigned_to_id or self.imported_by_id
+
+
+def load_import_context(session, spec: ImportSpec, tenant_id: int, imported_by_id: int,
+                        assigned_to_id: Optional[int], columns) -> ImportContext:
+    """
+    One query per referenced table (only those the file actually refers to)
+    plus the match-key load for de-duplicated entities.
+    """
+    context = ImportContext(spec, tenant_id, imported_by_id, assigned_to_id)
+
+    for name, reference in spec.references.items():
+        if not any(s in columns for s in reference.id_sources + reference.name_sources):
+            continue
+        model = reference.model
+        query = session.query(model.id, getattr(model, reference.name_attr)).filter(model.tenant_id == tenant_id)
+        if hasattr(model, "deleted_at"):
+            query = query.filter(model.deleted_at == None)
+
+        ids = set()
+        names = {}
+        for entity_id, entity_name in query.yield_per(5000):
+            ids.add(entity_id)
+            names.setdefault(normalize_name(entity_name), entity_id)
+        context.reference_ids[name] = ids
+        context.reference_names[name] = names
+
+    if spec.dedup:
+        context.dedup_index = MatchKeyIndex.load(session, tenant_id)
+
+    return context
+
+
+def _first_source(df: pd.DataFrame, sources: List[str]) -> Optional[str]:
+    return next((s for s in sources if s in df.columns), None)
+
+
+def map_frame(spec: ImportSpec, df: pd.DataFrame, context: ImportContext):
+    """
+    Map and validate a chunk column by column.
+
+    Returns (mapped, issues, details):
+      mapped  - model field columns, <NA> for empty
+      issues  - one boolean column per ISSUE_CATEGORIES entry
+      details - per category, the first message explaining each flagged row
+    """
+    index = df.index
+    issues = {category: pd.Series(False, index=index) for category in ISSUE_CATEGORIES}
+    details = {category: pd.Series(None, index=index, dtype=object) for category in ISSUE_CATEGORIES}
+
+    def flag(category, mask, message):
+        issues[category] = issues[category] | mask
+        details[category] = details[category].mask(mask & details[category].isna(), message)
+
+    mapped = {}
+    for name, field in spec.fields.items():
+        source = _first_source(df, field.sources)
+        # Columns the file doesn't have are all-<NA>; no need to clean them
+        text = clean_text_series(df[source]) if source else column(df, field.sources[0])
+
+        if field.kind == "email":
+            value, invalid = clean_email_series(text)
+            flag("invalid_email", invalid, f"Invalid email in {source} (left empty)")
+        elif field.kind == "phone":
+            value, invalid = clean_phone_series(text)
+            flag("invalid_phone", invalid, f"Invalid phone number in {source} (left empty)")
+        elif field.kind == "date":
+            value = pd.to_datetime(text, errors="coerce", format="mixed")
+            flag("invalid_date", text.notna() & value.isna(), f"Unreadable date in {source} (left empty)")
+        elif field.kind == "number":
+            value = pd.to_numeric(text.str.replace(r'[$,\s]', '', regex=True), errors="coerce")
+            flag("invalid_number", text.notna() & value.isna(), f"Not a number in {source} (left empty)")
+        elif field.kind == "choice":
+            lookup = {choice.lower(): choice for choice in field.choices}
+            value = text.str.lower().map(lookup).astype("string")
+            flag("invalid_choice", text.notna() & value.isna(),
+                 f"Unknown value in {source}, expected one of {field.choices}")
+        else:
+            value = text
+
+        if field.max_length:
+            value = value.str.slice(0, field.max_length)
+        if field.default is not None:
+            value = value.fillna(field.default)
+        mapped[name] = value
+
+    if spec.derive:
+        spec.derive(df, mapped)
+
+    for name, field in spec.fields.items():
+        if field.required:
+            flag("missing_required", mapped[name].isna(), f"Missing required field: {name}")
+
+    for name, reference in spec.references.items():
+        id_source = _first_source(df, reference.id_sources)
+        name_source = _first_source(df, reference.name_sources)
+        given_id = pd.to_numeric(clean_text_series(column(df, id_source)), errors="coerce") if id_source else None
+        given_name = clean_text_series(column(df, name_source)) if name_source else None
+
+        resolved = pd.Series(pd.NA, index=index, dtype="Int64")
+        given = pd.Series(False, index=index)
+        if given_id is not None:
+            known = given_id.where(given_id.isin(context.reference_ids.get(name, ())))
+            resolved = resolved.fillna(known.astype("Int64"))
+            given |= given_id.notna()
+        if given_name is not None:
+            names = context.reference_names.get(name, {})
+            by_name = given_name.map(lambda value: names.get(normalize_name(value)), na_action='ignore')
+            resolved = resolved.fillna(pd.to_numeric(by_name, errors="coerce").astype("Int64"))
+            given |= given_name.notna()
+
+        flag("unknown_reference", given & resolved.isna(), f"No matching {reference.entity_type} found for {name}")
+        mapped[name] = resolved
+
+    if spec.one_of:
+        present = sum(mapped[name].notna().astype(int) for name in spec.one_of)
+        unresolved = issues["unknown_reference"]
+        if spec.exactly_one:
+            flag("missing_reference", (present != 1) & ~unresolved,
+                 f"Row must reference exactly one of {spec.one_of}")
+        else:
+            flag("missing_reference", (present == 0) & ~unresolved,
+                 f"Row must reference one of {spec.one_of}")
+
+    return pd.DataFrame(mapped, index=index), pd.DataFrame(issues, index=index), details
+
+
+def validate_chunk(spec: ImportSpec, chunk: pd.DataFrame, context: ImportContext, session):
+    """
+    map_frame plus the checks that need the database or earlier rows:
+    unique fields (one query per field per chunk) and match-key duplicates.
+    Returns (mapped, issues, details, keys); keys is None unless spec.dedup.
+    """
+    mapped, issues, details = map_frame(spec, chunk, context)
+
+    for name in spec.unique_fields:
+        values = mapped[name]
+        present = values.dropna().unique().tolist()
+        existing = set()
+        if present:
+            model_column = getattr(spec.model, name)
+            existing = {row[0] for row in session.query(model_column).filter(model_column.in_(present))}
+        taken = values.isin(existing | context.seen_unique[name]) | (values.notna() & values.duplicated())
+        taken &= values.notna()
+        issues['already_exists'] |= taken
+        details['already_exists'] = details['already_exists'].mask(
+            taken & details['already_exists'].isna(), f"{name} already exists"
+        )
+        context.seen_unique[name].update(present)
+
+    keys = None
+    if spec.dedup and context.dedup_index is not None:
+        keys = match_key_frame(mapped['name'], mapped['city'], mapped['phone'], mapped['email'])
+        # Blocked rows are never written, so like write_chunk they can't be
+        # the "earlier row" a later one duplicates
+        blocked = issues[BLOCKING_ISSUES].any(axis=1)
+        in_file = pd.Series(False, index=keys.index)
+        for key_column in keys.columns:
+            row_keys = keys[key_column].where(~blocked)
+            in_file |= row_keys.notna() & row_keys.duplicated()
+        issues['duplicate'] = (context.dedup_index.matches(keys) | in_file) & ~blocked
+        details['duplicate'] = details['duplicate'].mask(
+            issues['duplicate'], "Matches an existing lead/client or an earlier row"
+        )
+
+    return mapped, issues, details, keys
+
+
+def _row_error(details, position: int) -> str:
+    for category in BLOCKING_ISSUES:
+        message = details[category].iat[position]
+        if isinstance(message, str):
+            return message
+    return "Invalid row"
+
+
+def write_chunk(spec: ImportSpec, chunk: pd.DataFrame, context: ImportContext,
+                duplicate_policy: str = "skip") -> Dict[str, Any]:
+    """
+    Validate, de-duplicate and bulk write one chunk in a single transaction.
+
+    Rows matching an existing lead/client (or an earlier row of the same file)
+    are handled by duplicate_policy:
+      skip   - leave the existing record alone and drop the row
+      update - fill the matched record with the row's non-empty values
+               (only when it is the same kind of record)
+      flag   - import the row anyway with a note pointing at the match
+
+    Returns counts plus the failures and duplicates seen in the chunk.
+    """
+    rows = []
+    updates = []
+    failures = []
+    duplicates = []
+    now = datetime.utcnow()
+
+    session = SessionLocal()
+    try:
+        mapped, issues, details, keys = validate_chunk(spec, chunk, context, session)
+        blocked = issues[BLOCKING_ISSUES].any(axis=1)
+        row_keys = key_lists(keys) if keys is not None else None
+
+        for position, (index, record) in enumerate(zip(mapped.index, frame_records(mapped))):
+            display_name = record.get(spec.display_field)
+            if blocked.iat[position]:
+                failures.append({
+                    "row": index + 1,
+                    "name": display_name or "Unknown",
+                    "error": _row_error(details, position)
+                })
+                continue
+
+            if row_keys is not None:
+                match = context.dedup_index.find(row_keys[position])
+                if match:
+                    matched_key, (entity_type, entity_id) = match
+                    action = duplicate_policy
+                    if action == "update" and (entity_type != spec.entity_type or entity_id is None):
+                        action = "skip"
+
+                    duplicates.append({
+                        "row": index + 1,
+                        "name": display_name,
+                        "matched_entity_type": entity_type,
+                        "matched_entity_id": entity_id,
+                        "matched_on": DUPLICATE_KEY_LABELS[matched_key[0]],
+                        "action": action
+                    })
+
+                    if action == "skip":
+                        continue
+                    if action == "update":
+                        values = {
+                            field: record[field] for field in spec.update_fields
+                            if record[field] is not None
+                        }
+                        values.update(id=entity_id, updated_by=context.imported_by_id, updated_at=now)
+                        updates.append(values)
+                        continue
+
+                    # flag
+                    flag_note = (
+                        f"Possible duplicate of {entity_type} #{entity_id}" if entity_id
+                        else "Possible duplicate within import file"
+                    )
+                    record['notes'] = f"{record['notes']}\n{flag_note}" if record['notes'] else flag_note
+                else:
+                    context.dedup_index.add(row_keys[position], (spec.entity_type, None))
+
+            record['tenant_id'] = context.tenant_id
+            for owner_column, source in spec.owner_columns.items():
+                record[owner_column] = context.owner_value(source)
+            for timestamp_field in spec.timestamp_fields:
+                if record.get(timestamp_field) is None:
+                    record[timestamp_field] = now
+            rows.append(record)
+
+        inserted_ids = []
+        if rows:
+            # The ids feed the indexes below and the assignee's notification
+            inserted_ids = session.execute(insert(spec.model).returning(spec.model.id), rows).scalars().all()
+        if updates:
+            # Bulk UPDATE by primary key, one executemany for the chunk
+            session.execute(update(spec.model), updates)
+        if spec.after_write and rows:
+            spec.after_write(session, context.tenant_id)
+        # Core statements bypass the ORM hooks that keep search documents current
+        if inserted_ids:
+            search_index.refresh(session, spec.entity_type, inserted_ids, context.tenant_id)
+            phone_index.refresh(session, spec.entity_type, inserted_ids, context.tenant_id, children=False)
+        if updates:
+            updated_ids = [values["id"] for values in updates]
+            search_index.refresh(session, spec.entity_type, updated_ids, context.tenant_id)
+            phone_index.refresh(session, spec.entity_type, updated_ids, context.tenant_id)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+    return {
+        "inserted": len(rows),
+        "inserted_ids": inserted_ids,
+        "updated": len(updates),
+        "failures": failures,
+        "duplicates": duplicates
+    }
+
+
+def _prepare(spec: ImportSpec, filename: str, content: bytes) -> pd.DataFrame:
+    df = parse_import_file(filename, content)
+    missing_columns = spec.required_columns(df.columns)
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {missing_columns}")
+    return df
+
+
+def _load_context(spec, tenant_id, imported_by_id, assigned_to_id, columns) -> ImportContext:
+    session = SessionLocal()
+    try:
+        return load_import_context(session, spec, tenant_id, imported_by_id, assigned_to_id, columns)
+    finally:
+        session.close()
+
+
+async def run_import(job, spec: ImportSpec, filename: str, content: bytes, imported_by_email: str,
+                     assigned_user_id: Optional[int] = None, assigned_user_email: Optional[str] = None,
+                     duplicate_policy: str = "skip"):
+    """
+    Background job body for /api/import/<entity>. The job's tenant and creator
+    are the importing admin's.
+    Parses the file, writes it chunk by chunk (one commit per chunk) and
+    reports progress on the job. Cancelling keeps the chunks already committed.
+    """
+    df = await asyncio.to_thread(_prepare, spec, filename, content)
+    job.total = len(df)
+    context = await asyncio.to_thread(
+        _load_context, spec, job.tenant_id, job.created_by, assigned_user_id, df.columns
+    )
+    stats = {"inserted": 0, "inserted_ids": [], "updated": 0, "duplicates": []}
+
+    try:
+        for start in range(0, len(df), IMPORT_CHUNK_SIZE):
+            if job.cancel_requested:
+                break
+            chunk = df.iloc[start:start + IMPORT_CHUNK_SIZE]
+            chunk_result = await asyncio.to_thread(write_chunk, spec, chunk, context, duplicate_policy)
+            stats["inserted"] += chunk_result["inserted"]
+            stats["inserted_ids"].extend(chunk_result["inserted_ids"])
+            stats["updated"] += chunk_result["updated"]
+            stats["duplicates"].extend(chunk_result["duplicates"])
+            for failure in chunk_result["failures"]:
+                job.add_failure(failure)
+            job.processed += len(chunk)
+            job.result = _import_result(spec, job, stats)
+    finally:
+        job.result = _import_result(spec, job, stats)
+        job.message = job.result["message"]
+        if spec.entity_type == "interaction":
+            calendar_feeds.invalidate(job.tenant_id)
+            reminders.reload()
+
+    # Notify the assigned user (also after a cancel, for the rows that made it in)
+    if spec.assignable and assigned_user_email and stats["inserted"] > 0:
+        notifications.publish(assignment_event(
+            tenant_id=job.tenant_id,
+            recipient_email=assigned_user_email,
+            entity_type=spec.label,
+            entity_name=f"{stats['inserted']} imported {spec.label}",
+            assigned_by=imported_by_email,
+            entity_ids=stats["inserted_ids"]
+        ))
+
+
+def _import_result(spec: ImportSpec, job, stats: Dict[str, Any]) -> Dict[str, Any]:
+    successful_imports = stats["inserted"]
+    duplicates = stats["duplicates"]
+
+    message = f"Import completed. {successful_imports} {spec.label} imported successfully."
+    if job.cancel_requested:
+        message = f"Import cancelled. {successful_imports} {spec.label} were imported before cancelling."
+    if stats["updated"]:
+        message += f" {stats['updated']} existing {spec.label} updated."
+    skipped = sum(1 for d in duplicates if d["action"] == "skip")
+    if skipped:
+        message += f" {skipped} duplicates skipped."
+    flagged = sum(1 for d in duplicates if d["action"] == "flag")
+    if flagged:
+        message += f" {flagged} possible duplicates flagged."
+    if job.failed:
+        message += f" {job.failed} imports failed."
+
+    return {
+        "entity": spec.label,
+        "message": message,
+        "successful_imports": successful_imports,
+        "updated_records": stats["updated"],
+        "duplicate_count": len(duplicates),
+        "duplicates": duplicates[:10],
+        "failed_imports": job.failed,
+        "failures": job.failures[:10]  # Limit to first 10 failures
+    }
+
+
+def dry_run_import(spec: ImportSpec, filename: str, content: bytes, tenant_id: int, imported_by_id: int,
+                   time_budget: float = DRY_RUN_TIME_BUDGET, sample_size: int = 5) -> Dict[str, Any]:
+    """
+    Validate an import file the way the real import would, without writing.
+    Returns aggregate issue counts by category plus a few sample rows each.
+    Stops checking new chunks once time_budget seconds have passed.
+    """
+    started = time.monotonic()
+    df = _prepare(spec, filename, content)
+
+    counts = {category: 0 for category in ISSUE_CATEGORIES}
+    samples = {category: [] for category in ISSUE_CATEGORIES}
+    rows_checked = 0
+    valid_rows = 0
+
+    session = SessionLocal()
+    try:
+        context = load_import_context(session, spec, tenant_id, imported_by_id, None, df.columns)
+
+        for start in range(0, len(df), DRY_RUN_CHUNK_SIZE):
+            if time.monotonic() - started > time_budget:
+                break
+            chunk = df.iloc[start:start + DRY_RUN_CHUNK_SIZE]
+            mapped, issues, details, keys = validate_chunk(spec, chunk, context, session)
+
+            # Later chunks must see this chunk's written rows as "earlier rows of the file"
+            valid = ~issues[BLOCKING_ISSUES].any(axis=1)
+            if keys is not None:
+                for row_keys in key_lists(keys[valid & ~issues['duplicate']]):
+                    context.dedup_index.add(row_keys, (spec.entity_type, None))
+
+            rows_checked += len(chunk)
+            valid_rows += int(valid.sum())
+
+            for category in ISSUE_CATEGORIES:
+                flagged = issues.index[issues[category]]
+                counts[category] += len(flagged)
+                for index in flagged[:sample_size - len(samples[category])]:
+                    name = mapped.at[index, spec.display_field]
+                    samples[category].append({
+                        "row": int(index) + 1,
+                        "name": None if pd.isna(name) else str(name),
+                        "error": details[category].at[index]
+                    })
+    finally:
+        session.close()
+
+    return {
+        "dry_run": True,
+        "entity": spec.label,
+        "total_rows": len(df),
+        "rows_checked": rows_checked,
+        "complete": rows_checked == len(df),
+        "valid_rows": valid_rows,
+        "error_counts": counts,
+        "samples": {category: rows for category, rows in samples.items() if rows},
+        "elapsed_ms": round((time.monotonic() - started) * 1000, 1)
+    }
@@ -0,0 +1,236 @@
+"""
+Declarative column maps for bulk imports.
+
+Each ImportSpec lists, per model field, the file columns it may come from
+(column names are normalized to UPPER_UNDERSCORE, so "Contact Email" and
+"CONTACT_EMAIL" both match "CONTACT_EMAIL") and how the value is validated.
+Adding an importable entity means adding a spec here; the engine in
+import_engine.py handles parsing, validation, de-duplication and writes.
+"""
+import pandas as pd
+from app.models import Account, Client, Contact, Interaction, Lead, Project
+from app.constants import (
+    TYPE_OPTIONS, LEAD_STATUS_OPTIONS, CLIENT_STATUS_OPTIONS, PHONE_LABELS,
+    FOLLOW_UP_STATUS_OPTIONS, PROJECT_STATUS_OPTIONS, ACCOUNT_STATUS_OPTIONS,
+)
+from app.utils.import_engine import Field, Reference, ImportSpec
+from app.utils.import_utils import clean_text_series, column
+from app.utils.access_utils import sync_interaction_owners
+
+
+def join_lines(*parts: pd.Series) -> pd.Series:
+    """
+    Join text columns row-wise with newlines, skipping empty parts
+    """
+    result = None
+    for part in parts:
+        if result is None:
+            result = part
+            continue
+        result = (result + "\n" + part).fillna(result).fillna(part)
+    return result
+
+
+def _derive_contact_person(df: pd.DataFrame, mapped):
+    """
+    Fall back to CONTACT FIRST NAME + CONTACT LAST NAME when no full name column is given
+    """
+    first_name = clean_text_series(column(df, 'CONTACT_FIRST_NAME'))
+    last_name = clean_text_series(column(df, 'CONTACT_LAST_NAME'))
+    full_name = clean_text_series(first_name.fillna("") + " " + last_name.fillna(""), 100)
+    mapped['contact_person'] = mapped['contact_person'].fillna(full_name)
+
+
+def _derive_lead_fields(df: pd.DataFrame, mapped):
+    _derive_contact_person(df, mapped)
+    industry = "Industry: " + clean_text_series(column(df, 'SIC_DESC'))
+    owner = "Owner: " + clean_text_series(column(df, 'OWNER_NAME'))
+    mapped['notes'] = join_lines(mapped['notes'], industry, owner)
+
+
+def _sync_interaction_owners(session, tenant_id: int):
+    """
+    Copy parent owners onto the interactions a chunk just inserted
+    """
+    sync_interaction_owners(session, Interaction.tenant_id == tenant_id, Interaction.owner_created_by == None)
+
+
+# Fields shared by leads and clients (company records)
+def _company_fields():
+    return {
+        'name': Field(['PLANT_NAME', 'NAME', 'COMPANY', 'COMPANY_NAME'], max_length=100, required=True),
+        'contact_person': Field(['CONTACT_PERSON', 'CONTACT_NAME'], max_length=100),
+        'contact_title': Field(['CONTACT_TITLE'], max_length=100),
+        'email': Field(['CONTACT_EMAIL', 'EMAIL'], kind="email"),
+        'phone': Field(['PHONE'], kind="phone"),
+        'phone_label': Field(['PHONE_LABEL'], kind="choice", choices=PHONE_LABELS, default="work"),
+        'secondary_phone': Field(['SECONDARY_PHONE'], kind="phone"),
+        'address': Field(['ADDRESS'], max_length=255),
+        'city': Field(['CITY'], max_length=100),
+        'state': Field(['STATE'], max_length=100),
+        'zip': Field(['ZIP', 'ZIP_CODE'], max_length=20),
+        'notes': Field(['NOTES']),
+    }
+
+
+# Company fields an import may overwrite when duplicate_policy is "update"
+COMPANY_UPDATE_FIELDS = [
+    'contact_person', 'contact_title', 'email', 'phone', 'address', 'city', 'state', 'zip', 'notes'
+]
+
+LEAD_IMPORT = ImportSpec(
+    entity_type="lead",
+    label="leads",
+    model=Lead,
+    fields={
+        **_company_fields(),
+        'type': Field(['TYPE'], kind="choice", choices=TYPE_OPTIONS, default="Food and Beverage"),
+        'lead_status': Field(['LEAD_STATUS', 'STATUS'], kind="choice", choices=LEAD_STATUS_OPTIONS, default="open"),
+    },
+    display_field='name',
+    owner_columns={'created_by': 'importer', 'assigned_to': 'assignee'},
+    timestamp_fields=['created_at'],
+    dedup=True,
+    update_fields=COMPANY_UPDATE_FIELDS,
+    assignable=True,
+    derive=_derive_lead_fields,
+    # The vendor lead list format the import was originally built for
+    template_example={
+        "OWNER_NAME": ["Example Company LLC"],
+        "PLANT_NAME": ["Example Plant Name"],
+        "ADDRESS": ["123 Main Street"],
+        "CITY": ["Anytown"],
+        "STATE": ["Kansas"],
+        "PHONE": ["316-555-1234"],
+        "SIC_DESC": ["Food Processing"],
+        "CONTACT TITLE": ["Plant Manager"],
+        "CONTACT FIRST NAME": ["John"],
+        "CONTACT LAST NAME": ["Doe"],
+        "CONTACT EMAIL": ["john.doe@example.com"]
+    },
+)
+
+CLIENT_IMPORT = ImportSpec(
+    entity_type="client",
+    label="clients",
+    model=Client,
+    fields={
+        **_company_fields(),
+        'type': Field(['TYPE'], kind="choice", choices=TYPE_OPTIONS, default="None"),
+        'status': Field(['STATUS'], kind="choice", choices=CLIENT_STATUS_OPTIONS, default="new"),
+    },
+    display_field='name',
+    owner_columns={'created_by': 'importer', 'assigned_to': 'assignee'},
+    timestamp_fields=['created_at'],
+    dedup=True,
+    update_fields=COMPANY_UPDATE_FIELDS,
+    assignable=True,
+    derive=_derive_contact_person,
+)
+
+CONTACT_IMPORT = ImportSpec(
+    entity_type="contact",
+    label="contacts",
+    model=Contact,
+    fields={
+        'first_name': Field(['FIRST_NAME', 'CONTACT_FIRST_NAME'], max_length=100, required=True),
+        'last_name': Field(['LAST_NAME', 'CONTACT_LAST_NAME'], max_length=100),
+        'title': Field(['TITLE', 'CONTACT_TITLE'], max_length=100),
+        'email': Field(['EMAIL', 'CONTACT_EMAIL'], kind="email"),
+        'phone': Field(['PHONE'], kind="phone"),
+        'phone_label': Field(['PHONE_LABEL'], kind="choice", choices=PHONE_LABELS, default="work"),
+        'secondary_phone': Field(['SECONDARY_PHONE'], kind="phone"),
+        'notes': Field(['NOTES']),
+    },
+    references={
+        'client_id': Reference("client", Client, 'name', ['CLIENT_ID'], ['CLIENT', 'CLIENT_NAME']),
+        'lead_id': Reference("lead", Lead, 'name', ['LEAD_ID'], ['LEAD', 'LEAD_NAME']),
+    },
+    one_of=['client_id', 'lead_id'],
+    exactly_one=True,
+    display_field='first_name',
+    timestamp_fields=['created_at'],
+)
+
+PROJECT_IMPORT = ImportSpec(
+    entity_type="project",
+    label="projects",
+    model=Project,
+    fields={
+        'project_name': Field(['PROJECT_NAME', 'NAME'], max_length=255, required=True),
+        'project_description': Field(['PROJECT_DESCRIPTION', 'DESCRIPTION']),
+        'type': Field(['TYPE'], kind="choice", choices=TYPE_OPTIONS, default="None"),
+        'project_status': Field(['PROJECT_STATUS', 'STATUS'], kind="choice",
+                                choices=PROJECT_STATUS_OPTIONS, default="pending"),
+        'project_start': Field(['PROJECT_START', 'START_DATE'], kind="date"),
+        'project_end': Field(['PROJECT_END', 'END_DATE'], kind="date"),
+        'project_worth': Field(['PROJECT_WORTH', 'WORTH', 'VALUE'], kind="number"),
+        'primary_contact_name': Field(['PRIMARY_CONTACT_NAME', 'CONTACT_NAME'], max_length=100),
+        'primary_contact_title': Field(['PRIMARY_CONTACT_TITLE', 'CONTACT_TITLE'], max_length=100),
+        'primary_contact_email': Field(['PRIMARY_CONTACT_EMAIL', 'CONTACT_EMAIL'], kind="email"),
+        'primary_contact_phone': Field(['PRIMARY_CONTACT_PHONE', 'CONTACT_PHONE'], kind="phone"),
+        'notes': Field(['NOTES']),
+    },
+    references={
+        'client_id': Reference("client", Client, 'name', ['CLIENT_ID'], ['CLIENT', 'CLIENT_NAME']),
+        'lead_id': Reference("lead", Lead, 'name', ['LEAD_ID'], ['LEAD', 'LEAD_NAME']),
+    },
+    display_field='project_name',
+    # Projects are only visible to their creator, so they belong to the assignee when one is given
+    owner_columns={'created_by': 'assignee_or_importer'},
+    timestamp_fields=['created_at'],
+)
+
+ACCOUNT_IMPORT = ImportSpec(
+    entity_type="account",
+    label="accounts",
+    model=Account,
+    fields={
+        'account_number': Field(['ACCOUNT_NUMBER', 'ACCOUNT'], max_length=100, required=True),
+        'account_name': Field(['ACCOUNT_NAME'], max_length=255),
+        'status': Field(['STATUS'], kind="choice", choices=ACCOUNT_STATUS_OPTIONS, default="active"),
+        'opened_on': Field(['OPENED_ON', 'OPENED'], kind="date"),
+        'notes': Field(['NOTES']),
+    },
+    references={
+        'client_id': Reference("client", Client, 'name', ['CLIENT_ID'], ['CLIENT', 'CLIENT_NAME']),
+    },
+    one_of=['client_id'],
+    display_field='account_number',
+    timestamp_fields=['opened_on'],
+    unique_fields=['account_number'],
+)
+
+INTERACTION_IMPORT = ImportSpec(
+    entity_type="interaction",
+    label="interactions",
+    model=Interaction,
+    fields={
+        'contact_date': Field(['CONTACT_DATE', 'DATE'], kind="date"),
+        'summary': Field(['SUMMARY', 'SUBJECT'], max_length=255),
+        'outcome': Field(['OUTCOME'], max_length=255),
+        'notes': Field(['NOTES']),
+        'contact_person': Field(['CONTACT_PERSON', 'CONTACT_NAME']),
+        'email': Field(['EMAIL', 'CONTACT_EMAIL'], kind="email"),
+        'phone': Field(['PHONE', 'CONTACT_PHONE'], kind="phone"),
+        'follow_up': Field(['FOLLOW_UP', 'FOLLOW_UP_DATE'], kind="date"),
+        'followup_status': Field(['FOLLOWUP_STATUS', 'FOLLOW_UP_STATUS'], kind="choice",
+                                 choices=FOLLOW_UP_STATUS_OPTIONS, default="pending"),
+    },
+    references={
+        'client_id': Reference("client", Client, 'name', ['CLIENT_ID'], ['CLIENT', 'CLIENT_NAME']),
+        'lead_id': Reference("lead", Lead, 'name', ['LEAD_ID'], ['LEAD', 'LEAD_NAME']),
+        'project_id': Reference("project", Project, 'project_name', ['PROJECT_ID'], ['PROJECT', 'PROJECT_NAME']),
+    },
+    one_of=['client_id', 'lead_id', 'project_id'],
+    exactly_one=True,
+    display_field='summary',
+    timestamp_fields=['contact_date'],
+    after_write=_sync_interaction_owners,
+)
+
+IMPORT_SPECS = {
+    spec.label: spec for spec in (
+        LEAD_IMPORT, CLIENT_IMPORT, CONTACT_IMPORT, PROJECT_IMPORT, ACCOUNT_IMPORT, INTERACTION_IMPORT
+    )
+}
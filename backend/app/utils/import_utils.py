@@ -1,10 +1,17 @@
 """
 Utility functions for data import operations
 """
+import io
 import re
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import pandas as pd
-from app.utils.phone_utils import clean_phone_number
+from app.utils.phone_utils import clean_phone_numbers
+
+SUPPORTED_IMPORT_EXTENSIONS = (".csv", ".xlsx")
+
+EMAIL_PATTERN = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
+
+_NON_ALNUM_UPPER = re.compile(r'[^A-Z0-9]+')
 
 
 def validate_email(email: str) -> Optional[str]:
@@ -13,16 +20,15 @@ def validate_email(email: str) -> Optional[str]:
     """
     if not email or pd.isna(email):
         return None
-    
+
     email_str = str(email).strip().lower()
     if not email_str:
         return None
-    
+
     # Basic email regex
-    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    if re.match(email_pattern, email_str):
+    if re.fullmatch(EMAIL_PATTERN, email_str):
         return email_str
-    
+
     return None
 
 def safe_string_convert(value: Any, max_length: Optional[int] = None) -> Optional[str]:
@@ -31,14 +37,14 @@ def safe_string_convert(value: Any, max_length: Optional[int] = None) -> Optiona
     """
     if value is None or pd.isna(value):
         return None
-    
+
     result = str(value).strip()
     if not result:
         return None
-    
+
     if max_length and len(result) > max_length:
         result = result[:max_length]
-    
+
     return result
 
 def validate_required_fields(row: pd.Series, required_fields: list) -> list:
@@ -52,50 +58,70 @@ def validate_required_fields(row: pd.Series, required_fields: list) -> list:
             missing.append(field)
     return missing
 
-def map_lead_data(row: pd.Series) -> Dict[str, Any]:
-    """
-    Map CSV row data to Lead model fields with validation
-    """
-    # Validate required fields
-    required_fields = ['PLANT_NAME']
-    missing_fields = validate_required_fields(row, required_fields)
-    if missing_fields:
-        raise ValueError(f"Missing required fields: {', '.join(missing_fields)}")
-    
-    # Build contact person name
-    contact_person = None
-    first_name = safe_string_convert(row.get('CONTACT FIRST NAME'))
-    last_name = safe_string_convert(row.get('CONTACT LAST NAME'))
-    if first_name or last_name:
-        contact_person = f"{first_name or ''} {last_name or ''}".strip()
-        if not contact_person:
-            contact_person = None
-    
-    # Build notes field
-    notes_parts = []
-    sic_desc = safe_string_convert(row.get('SIC_DESC'))
-    owner_name = safe_string_convert(row.get('OWNER_NAME'))
-    
-    if sic_desc:
-        notes_parts.append(f"Industry: {sic_desc}")
-    if owner_name:
-        notes_parts.append(f"Owner: {owner_name}")
-    
-    notes = "\n".join(notes_parts) if notes_parts else None
-    
-    # Clean and validate data
-    return {
-        'name': safe_string_convert(row['PLANT_NAME'], 100),
-        'contact_person': safe_string_convert(contact_person, 100),
-        'contact_title': safe_string_convert(row.get('CONTACT TITLE'), 100),
-        'email': validate_email(row.get('CONTACT EMAIL')),
-        'phone': clean_phone_number(safe_string_convert(row.get('PHONE'))),
-        'phone_label': 'work',
-        'address': safe_string_convert(row.get('ADDRESS'), 255),
-        'city': safe_string_convert(row.get('CITY'), 100),
-        'state': safe_string_convert(row.get('STATE'), 100),
-        'zip': safe_string_convert(row.get('ZIP')),  # Add ZIP if available
-        'notes': notes,
-        'type': 'Food and Beverage',
-        'lead_status': 'open'
-    }
\ No newline at end of file
+def normalize_column_name(name: Any) -> str:
+    """
+    'Contact First Name' / 'CONTACT_FIRST_NAME' -> 'CONTACT_FIRST_NAME'
+    """
+    return _NON_ALNUM_UPPER.sub('_', str(name).strip().upper()).strip('_')
+
+def column(df: pd.DataFrame, name: str) -> pd.Series:
+    """
+    The named column, or an all-<NA> column when the file doesn't have it
+    """
+    if name in df.columns:
+        return df[name]
+    return pd.Series(pd.NA, index=df.index, dtype="string")
+
+def clean_text_series(series: pd.Series, max_length: Optional[int] = None) -> pd.Series:
+    """
+    Vectorized safe_string_convert: strip, blank -> <NA>, optional truncation
+    """
+    result = series.astype("string").str.strip()
+    result = result.mask(result == "")
+    if max_length:
+        result = result.str.slice(0, max_length)
+    return result
+
+def clean_email_series(series: pd.Series):
+    """
+    Vectorized validate_email. Returns (emails, invalid) where invalid marks
+    non-empty values that were dropped.
+    """
+    raw = clean_text_series(series).str.lower()
+    valid = raw.str.fullmatch(EMAIL_PATTERN).fillna(False).astype(bool)
+    return raw.where(valid), raw.notna() & ~valid
+
+def clean_phone_series(series: pd.Series):
+    """
+    Vectorized clean_phone_number over a column. Returns (phones, invalid).
+    """
+    raw = clean_text_series(series)
+    phones = clean_phone_numbers(raw).astype("string")
+    return phones, raw.notna() & phones.isna()
+
+def frame_records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    DataFrame rows as dicts with <NA>/NaN/NaT turned into None
+    """
+    records = frame.astype(object).where(frame.notna(), None).to_dict("records")
+    for record in records:
+        for key, value in record.items():
+            if isinstance(value, pd.Timestamp):
+                record[key] = value.to_pydatetime()
+    return records
+
+def parse_import_file(filename: str, content: bytes) -> pd.DataFrame:
+    """
+    Parse an uploaded CSV/Excel file into a DataFrame with normalized column
+    names (upper case, underscores). Cells are read as text so ZIPs and phone
+    numbers keep their digits.
+    """
+    if filename.endswith('.xlsx'):
+        df = pd.read_excel(io.BytesIO(content), dtype=str)
+    elif filename.endswith('.csv'):
+        df = pd.read_csv(io.StringIO(content.decode('utf-8')), dtype=str)
+    else:
+        raise ValueError("Unsupported file format. Please upload CSV or Excel file.")
+
+    df.columns = [normalize_column_name(c) for c in df.columns]
+    return df
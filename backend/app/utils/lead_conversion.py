@@ -0,0 +1,88 @@
+"""
+Lead -> client conversion.
+
+Everything hanging off a lead (interactions, projects, contacts, chat
+messages) is moved to the new client with one UPDATE per table inside the
+caller's transaction, so converting a lead with years of history costs the
+same handful of statements as converting a new one. The lead_id columns are
+indexed, which keeps each UPDATE to the rows it moves.
+"""
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import select, update
+from app.models import Lead, Client, Interaction, Project, Contact, ChatMessage
+from app.utils.access_utils import sync_interaction_owners
+from app.utils import search_index, phone_index
+
+# Tables whose rows follow a lead to its client, keyed by the name used in responses
+LEAD_CHILD_MODELS = {
+    "interactions": Interaction,
+    "projects": Project,
+    "contacts": Contact,
+    "chat_messages": ChatMessage,
+}
+
+# Lead fields copied onto the new client
+CLIENT_FIELDS_FROM_LEAD = [
+    "name", "contact_person", "contact_title", "email", "phone", "phone_label",
+    "secondary_phone", "secondary_phone_label", "address", "city", "state", "zip",
+    "type", "notes",
+]
+
+
+def move_lead_records(session, tenant_id: int, lead_id: int, client_id: int, models=None) -> Dict[str, int]:
+    """
+    Re-point rows from the lead to the client; returns rows moved per table.
+    Does not commit.
+    """
+    moved = {}
+    for name, model in (models or LEAD_CHILD_MODELS).items():
+        result = session.execute(
+            update(model).where(
+                model.tenant_id == tenant_id,
+                model.lead_id == lead_id
+            ).values(
+                lead_id=None,
+                client_id=client_id
+            ).execution_options(synchronize_session=False)
+        )
+        moved[name] = result.rowcount
+    if Interaction in (models or LEAD_CHILD_MODELS).values():
+        # Moved interactions now answer to the client's owners
+        sync_interaction_owners(session, Interaction.client_id == client_id, parent=Client)
+    if Project in (models or LEAD_CHILD_MODELS).values():
+        # Project search results link to their parent
+        search_index.refresh(session, "project", select(Project.id).where(Project.client_id == client_id), tenant_id)
+    # Moved records' phone entries now link to and answer to the client
+    phone_index.refresh(session, "client", [client_id], tenant_id)
+    return moved
+
+
+def convert_lead(session, lead: Lead, user, overrides: Optional[dict] = None):
+    """
+    Create a client from the lead, move the lead's records to it and mark
+    the lead converted. Returns (client, moved counts); the caller commits.
+    """
+    now = datetime.utcnow()
+    values = {field: getattr(lead, field) for field in CLIENT_FIELDS_FROM_LEAD}
+    values.update({k: v for k, v in (overrides or {}).items() if k in CLIENT_FIELDS_FROM_LEAD})
+
+    # Same owners as the lead, so nobody loses access to the moved history
+    client = Client(
+        tenant_id=lead.tenant_id,
+        created_by=lead.created_by,
+        assigned_to=lead.assigned_to,
+        updated_by=user.id,
+        created_at=now,
+        **values
+    )
+    session.add(client)
+    session.flush()
+
+    moved = move_lead_records(session, lead.tenant_id, lead.id, client.id)
+
+    lead.lead_status = "converted"
+    lead.converted_on = now
+    lead.updated_by = user.id
+    lead.updated_at = now
+    return client, moved
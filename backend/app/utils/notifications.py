@@ -0,0 +1,403 @@
+"""
+Notification events.
+
+Request handlers don't send mail. They record an event with
+publish_after_commit(session, event); once the session commits, the event
+is handed to the dispatcher and the response goes out without waiting on
+SMTP. A rolled-back transaction drops its events. The dispatcher's worker
+renders and delivers events in the background. Sending is retried by the
+pooled mailer (email_utils), which gives up at once on permanent SMTP
+errors; the dispatcher only retries rendering and direct sends.
+
+Assignment and follow-up events are not mailed one by one: they are held
+per recipient for NOTIFY_DIGEST_WINDOW seconds and then rendered as one
+digest, loaded with a single query per recipient. A window holding a
+single assignment still gets the plain assignment email.
+"""
+import asyncio
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event as sa_event, select, literal, cast, null, union_all, func, DateTime, String
+from sqlalchemy.orm import Session
+from app.config import MAIL_FROM_NAME
+from app.database import SessionLocal
+from app.models import Lead, Client, Interaction, Project, FollowUpStatus
+from app.utils.email_utils import send_email, mailer, _is_permanent
+
+# Deliveries in flight at once
+NOTIFY_CONCURRENCY = int(os.environ.get("NOTIFY_CONCURRENCY", 20))
+NOTIFY_MAX_ATTEMPTS = int(os.environ.get("NOTIFY_MAX_ATTEMPTS", 3))
+NOTIFY_RETRY_DELAY = float(os.environ.get("NOTIFY_RETRY_DELAY", 60))
+# Seconds to collect digestible events per recipient; 0 sends each event on its own
+NOTIFY_DIGEST_WINDOW = float(os.environ.get("NOTIFY_DIGEST_WINDOW", 60))
+# Items listed per digest section before "...and N more"
+DIGEST_MAX_ITEMS = 25
+
+DIGEST_KINDS = {"assignment", "follow_up_due"}
+
+PENDING_KEY = "pending_notifications"
+
+
+class NotificationEvent:
+    def __init__(self, kind: str, tenant_id: int, recipient_email: str, entity_type: str,
+                 entity_name: str, entity_id: Optional[int] = None, actor_email: Optional[str] = None,
+                 entity_ids: Optional[List[int]] = None):
+        self.kind = kind                  # "assignment" | "follow_up_due"
+        self.tenant_id = tenant_id
+        self.recipient_email = recipient_email
+        self.entity_type = entity_type    # "lead", "client", "interaction" (or a plural label for bulk events)
+        self.entity_id = entity_id
+        self.entity_name = entity_name
+        self.actor_email = actor_email
+        # Bulk events (imports, mass reassignment) carry every affected id
+        self.entity_ids = entity_ids if entity_ids is not None else ([entity_id] if entity_id else [])
+        self.created_at = datetime.utcnow()
+        self.attempts = 0
+
+    def __repr__(self):
+        return f"<NotificationEvent {self.kind} {self.entity_type} {self.entity_id} -> {self.recipient_email}>"
+
+
+def assignment_event(tenant_id: int, recipient_email: str, entity_type: str, entity_name: str,
+                     entity_id: Optional[int] = None, assigned_by: Optional[str] = None,
+                     entity_ids: Optional[List[int]] = None) -> NotificationEvent:
+    return NotificationEvent("assignment", tenant_id, recipient_email, entity_type, entity_name,
+                             entity_id=entity_id, actor_email=assigned_by, entity_ids=entity_ids)
+
+
+def follow_up_event(tenant_id: int, recipient_email: str, interaction_id: int, summary: str) -> NotificationEvent:
+    return NotificationEvent("follow_up_due", tenant_id, recipient_email, "interaction", summary,
+                             entity_id=interaction_id)
+
+
+def render_assignment(event: NotificationEvent):
+    subject = f"New {event.entity_type.capitalize()} Assigned to You"
+    body = (
+        f"You've been assigned to the {event.entity_type} '{event.entity_name}' by {event.actor_email}.\n"
+        f"Please log in to the CRM to view the details.\n\n"
+        f"— {MAIL_FROM_NAME}"
+    )
+    return subject, body
+
+
+def render_follow_up(event: NotificationEvent):
+    subject = "Follow-up Due"
+    body = (
+        f"Your follow-up '{event.entity_name}' is due.\n"
+        f"Please log in to the CRM to view the details.\n\n"
+        f"— {MAIL_FROM_NAME}"
+    )
+    return subject, body
+
+
+RENDERERS = {
+    "assignment": render_assignment,
+    "follow_up_due": render_follow_up,
+}
+
+# Event entity types (singular, or an import's plural label) -> digest section
+DIGEST_ENTITY_TYPES = {"lead": "leads", "leads": "leads", "client": "clients", "clients": "clients"}
+
+
+def digest_ids(events: List[NotificationEvent]) -> Dict[str, set]:
+    """
+    Merge a window's events into ids per digest section
+    """
+    ids = {"leads": set(), "clients": set(), "follow_ups": set()}
+    for event in events:
+        if event.kind == "follow_up_due":
+            ids["follow_ups"].update(event.entity_ids)
+        elif event.entity_type in DIGEST_ENTITY_TYPES:
+            ids[DIGEST_ENTITY_TYPES[event.entity_type]].update(event.entity_ids)
+    return ids
+
+
+def load_digest(tenant_id: int, ids: Dict[str, set]) -> List[Tuple]:
+    """
+    Current details for everything in one recipient's digest, in a single
+    UNION ALL query: (section, id, name, detail, due)
+    """
+    no_date = cast(null(), DateTime)
+    parts = []
+    if ids["leads"]:
+        parts.append(select(
+            literal("leads").label("section"), Lead.id, Lead.name.label("name"),
+            Lead.city.label("detail"), no_date.label("due")
+        ).where(Lead.tenant_id == tenant_id, Lead.id.in_(ids["leads"]), Lead.deleted_at == None))
+    if ids["clients"]:
+        parts.append(select(
+            literal("clients"), Client.id, Client.name, Client.city, no_date
+        ).where(Client.tenant_id == tenant_id, Client.id.in_(ids["clients"]), Client.deleted_at == None))
+    if ids["follow_ups"]:
+        parts.append(select(
+            literal("follow_ups"), Interaction.id, func.coalesce(Interaction.summary, "Follow-up"),
+            cast(func.coalesce(Client.name, Lead.name, Project.project_name), String), Interaction.follow_up
+        ).select_from(Interaction)
+         .outerjoin(Client, Interaction.client_id == Client.id)
+         .outerjoin(Lead, Interaction.lead_id == Lead.id)
+         .outerjoin(Project, Interaction.project_id == Project.id)
+         .where(
+            Interaction.tenant_id == tenant_id,
+            Interaction.id.in_(ids["follow_ups"]),
+            Interaction.followup_status != FollowUpStatus.completed
+        ))
+    if not parts:
+        return []
+
+    session = SessionLocal()
+    try:
+        return session.execute(union_all(*parts)).all()
+    finally:
+        session.close()
+
+
+def render_digest(rows: List[Tuple], events: List[NotificationEvent]):
+    sections = defaultdict(list)
+    for section, entity_id, name, detail, due in rows:
+        sections[section].append((name, detail, due))
+
+    counts = []
+    for section, noun in (("leads", "lead"), ("clients", "client"), ("follow_ups", "follow-up")):
+        count = len(sections[section])
+        if count:
+            counts.append(f"{count} {noun}{'' if count == 1 else 's'}" + (" due" if section == "follow_ups" else ""))
+    subject = f"Your CRM updates: {', '.join(counts)}"
+
+    lines = []
+    headings = {
+        "leads": "Leads assigned to you",
+        "clients": "Clients assigned to you",
+        "follow_ups": "Follow-ups due",
+    }
+    for section, heading in headings.items():
+        items = sorted(sections[section], key=lambda item: (item[2] or datetime.max, item[0] or ""))
+        if not items:
+            continue
+        lines.append(f"{heading}:")
+        for name, detail, due in items[:DIGEST_MAX_ITEMS]:
+            line = f"  - {name}"
+            if detail:
+                line += f" ({detail})"
+            if due:
+                line += f", due {due.strftime('%b %d %I:%M %p')}"
+            lines.append(line)
+        if len(items) > DIGEST_MAX_ITEMS:
+            lines.append(f"  ...and {len(items) - DIGEST_MAX_ITEMS} more")
+        lines.append("")
+
+    assigners = sorted({e.actor_email for e in events if e.kind == "assignment" and e.actor_email})
+    if assigners:
+        lines.append(f"Assigned by {', '.join(assigners)}.")
+    lines.append("Please log in to the CRM to view the details.\n")
+    lines.append(f"— {MAIL_FROM_NAME}")
+    return subject, "\n".join(lines)
+
+
+def render_events(events: List[NotificationEvent]):
+    """
+    (subject, body) for one recipient's window of events, or None when
+    nothing in it is still relevant (e.g. the lead was deleted meanwhile)
+    """
+    if len(events) == 1 and len(events[0].entity_ids) <= 1:
+        return RENDERERS[events[0].kind](events[0])
+
+    ids = digest_ids(events)
+    if not any(ids.values()):
+        # Bulk events without ids: fall back to one plain email per event
+        return None
+    rows = load_digest(events[0].tenant_id, ids)
+    if not rows:
+        return None
+    return render_digest(rows, events)
+
+
+class NotificationDispatcher:
+    def __init__(self, concurrency: int = NOTIFY_CONCURRENCY, max_attempts: int = NOTIFY_MAX_ATTEMPTS):
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._in_flight = set()
+        self._retry_handles = set()
+        self._pending: Dict[Tuple[int, str], List[NotificationEvent]] = {}
+        self._flush_handles = {}
+        self.delivered = 0
+        self.failed = 0
+        self.digested_events = 0
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None
+
+    async def start(self):
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10):
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+            # Don't sit out the digest windows; send what was collected
+            for key, handle in list(self._flush_handles.items()):
+                handle.cancel()
+                self._flush(key)
+            # Deliveries waiting for a slot start others as they finish
+            deadline = self._loop.time() + timeout
+            while self._in_flight:
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                await asyncio.wait(set(self._in_flight), timeout=remaining)
+        except asyncio.TimeoutError:
+            print(f"[Notify] Shutting down with {self._queue.qsize()} undelivered notifications.")
+        for handle in self._retry_handles:
+            handle.cancel()
+        self._retry_handles.clear()
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+
+    def publish(self, event: NotificationEvent):
+        """
+        Hand an event to the worker. Safe to call from any thread (imports
+        commit from worker threads); never blocks.
+        """
+        if self.running:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+            return
+        # Not serving (scripts/shell): deliver on the current loop if there is one
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            print(f"[Notify] No event loop, dropping {event}")
+            return
+        task = loop.create_task(self._deliver([event]))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _run(self):
+        while True:
+            event = await self._queue.get()
+            try:
+                if NOTIFY_DIGEST_WINDOW > 0 and event.kind in DIGEST_KINDS:
+                    self._collect(event)
+                else:
+                    await self._dispatch([event])
+            finally:
+                self._queue.task_done()
+
+    def _collect(self, event: NotificationEvent):
+        """
+        Hold the event in its recipient's digest window, opening one if needed
+        """
+        key = (event.tenant_id, event.recipient_email)
+        self._pending.setdefault(key, []).append(event)
+        if key not in self._flush_handles:
+            self._flush_handles[key] = self._loop.call_later(NOTIFY_DIGEST_WINDOW, self._flush, key)
+
+    def _flush(self, key):
+        self._flush_handles.pop(key, None)
+        events = self._pending.pop(key, [])
+        if events:
+            self.digested_events += len(events)
+            self._dispatch_soon(events)
+
+    async def _dispatch(self, events: List[NotificationEvent]):
+        await self._semaphore.acquire()
+        self._start(events, release=True)
+
+    def _dispatch_soon(self, events: List[NotificationEvent]):
+        """
+        _dispatch from a callback or a delivery: wait for a slot in a task of its own
+        """
+        if self._semaphore is None:
+            self._start(events)
+            return
+        task = asyncio.create_task(self._dispatch(events))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    def _start(self, events: List[NotificationEvent], release: bool = False):
+        task = asyncio.create_task(self._deliver(events))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+        if release:
+            task.add_done_callback(lambda _: self._semaphore.release())
+
+    async def _deliver(self, events: List[NotificationEvent]):
+        """
+        Render and send one email for the events of one recipient
+        """
+        try:
+            rendered = await asyncio.to_thread(render_events, events)
+        except Exception as e:
+            self._retry(events, e)
+            return
+        if rendered is None:
+            if len(events) > 1 and not any(digest_ids(events).values()):
+                for event in events:
+                    self._dispatch_soon([event])
+            return
+
+        subject, body = rendered
+        # The pooled mailer retries transient failures itself; only direct
+        # sends (no mailer running) are retried here
+        retried_by_mailer = mailer.running
+        try:
+            await send_email(subject, events[0].recipient_email, body, wait=True)
+            self.delivered += 1
+        except Exception as e:
+            self._retry(events, e, final=retried_by_mailer or _is_permanent(e))
+
+    def _retry(self, events: List[NotificationEvent], error: Exception, final: bool = False):
+        attempts = max(event.attempts for event in events) + 1
+        for event in events:
+            event.attempts = attempts
+        description = events[0] if len(events) == 1 else f"digest of {len(events)} events to {events[0].recipient_email}"
+        if final or attempts >= self.max_attempts or not self.running:
+            self.failed += 1
+            print(f"[Notify] Giving up on {description} after {attempts} attempts: {error}")
+            return
+
+        delay = NOTIFY_RETRY_DELAY * 2 ** (attempts - 1)
+        print(f"[Notify] Delivery of {description} failed ({error}), retrying in {delay:.0f}s")
+
+        def redeliver():
+            self._retry_handles.discard(handle)
+            self._dispatch_soon(events)
+
+        handle = self._loop.call_later(delay, redeliver)
+        self._retry_handles.add(handle)
+
+
+notifications = NotificationDispatcher()
+
+
+def publish_after_commit(session: Session, event: NotificationEvent):
+    """
+    Queue an event to be published when `session` commits its current transaction
+    """
+    session.info.setdefault(PENDING_KEY, []).append(event)
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _publish_pending(session):
+    for pending in session.info.pop(PENDING_KEY, []):
+        notifications.publish(pending)
+
+
+@sa_event.listens_for(Session, "after_transaction_end")
+def _drop_uncommitted(session, transaction):
+    # after_commit already took the events of a committed transaction;
+    # anything left on the outermost transaction was rolled back
+    if transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,276 @@
+"""
+Reverse phone lookup index.
+
+Every phone number on a client, lead, contact, project or interaction has
+a phone_index row keyed by (tenant_id, digits), where digits are the
+normalized comparable digits (dedup_utils.normalize_phone_digits: the last
+10 for US numbers), so "who is calling" is one indexed query whatever
+format the number was stored or typed in. Rows carry the record's display
+name, link and owners, so the lookup needs no joins.
+
+Maintenance mirrors search_index: ORM writes are picked up before commit;
+Core bulk statements call refresh() themselves. Refreshing a client or lead
+also refreshes its contacts, projects and interactions, whose links, owners
+or visibility derive from it; ORM writes only do so when one of those
+parent columns changed, so editing a record's notes doesn't rewrite its
+whole history. The "phone_index" backfill
+(app.utils.backfill) rebuilds it in primary-key batches on a live database.
+"""
+from itertools import chain
+from typing import Dict, List
+from sqlalchemy import (
+    event as sa_event, inspect, select, delete, insert, func, case, cast, literal, and_, or_, Integer, String
+)
+from sqlalchemy.orm import Session, aliased
+from app.models import PhoneIndexEntry, Client, Lead, Contact, Project, Interaction
+from app.utils.access_utils import is_admin
+from app.utils.dedup_utils import normalize_phone_digits
+
+STALE_KEY = "stale_phone_index"
+
+# Matches returned by one lookup
+PHONE_LOOKUP_LIMIT = 50
+
+
+def _link(prefix: str, id_column):
+    return literal(prefix) + cast(id_column, String)
+
+
+class PhoneSource:
+    def __init__(self, entity_type: str, model, phone_columns: List[str], name, link,
+                 owner_created_by=None, owner_assigned_to=None, live=None, joins=(), children=(),
+                 cascade_on=()):
+        self.entity_type = entity_type
+        self.model = model
+        self.phone_columns = phone_columns
+        self.name = name
+        self.link = link
+        self.owner_created_by = owner_created_by
+        self.owner_assigned_to = owner_assigned_to
+        self.live = live                    # rows that get entries (e.g. not soft-deleted)
+        self.joins = joins                  # (target, onclause) outer joins the expressions need
+        self.children = children            # (entity_type, foreign key column) refreshed with this one
+        self.cascade_on = cascade_on        # columns the children's entries depend on
+
+    def select_rows(self, *conditions):
+        model = self.model
+        stmt = select(
+            model.id, model.tenant_id,
+            self.name.label("name"), self.link.label("link"),
+            (self.owner_created_by if self.owner_created_by is not None else literal(None, Integer)).label("created_by"),
+            (self.owner_assigned_to if self.owner_assigned_to is not None else literal(None, Integer)).label("assigned_to"),
+            *[getattr(model, column) for column in self.phone_columns]
+        ).select_from(model)
+        for target, onclause in self.joins:
+            stmt = stmt.outerjoin(target, onclause)
+        if self.live is not None:
+            stmt = stmt.where(self.live)
+        has_phone = or_(*[getattr(model, column) != None for column in self.phone_columns])
+        return stmt.where(has_phone, *conditions).order_by(model.id)
+
+    def entries(self, rows) -> List[Dict]:
+        """
+        phone_index rows for source rows: one per distinct normalized number
+        """
+        entries = []
+        for row in rows:
+            seen = set()
+            for phone in row[6:]:
+                digits = normalize_phone_digits(phone)
+                if not digits or digits in seen:
+                    continue
+                seen.add(digits)
+                entries.append({
+                    "tenant_id": row.tenant_id,
+                    "digits": digits,
+                    "phone": phone[:32],
+                    "entity_type": self.entity_type,
+                    "entity_id": row.id,
+                    "name": (row.name or "")[:255],
+                    "link": row.link,
+                    "owner_created_by": row.created_by,
+                    "owner_assigned_to": row.assigned_to,
+                })
+        return entries
+
+
+_ProjectParent = aliased(Project)
+
+PHONE_SOURCES: Dict[str, PhoneSource] = {
+    "client": PhoneSource(
+        "client", Client, ["phone", "secondary_phone"],
+        name=Client.name,
+        link=_link("/clients/", Client.id),
+        owner_created_by=Client.created_by,
+        owner_assigned_to=Client.assigned_to,
+        live=Client.deleted_at == None,
+        children=[("contact", Contact.client_id), ("project", Project.client_id),
+                  ("interaction", Interaction.client_id)],
+        cascade_on=["created_by", "assigned_to", "deleted_at"],
+    ),
+    "lead": PhoneSource(
+        "lead", Lead, ["phone", "secondary_phone"],
+        name=Lead.name,
+        link=_link("/leads/", Lead.id),
+        owner_created_by=Lead.created_by,
+        owner_assigned_to=Lead.assigned_to,
+        live=Lead.deleted_at == None,
+        children=[("contact", Contact.lead_id), ("project", Project.lead_id),
+                  ("interaction", Interaction.lead_id)],
+        cascade_on=["created_by", "assigned_to", "deleted_at"],
+    ),
+    "contact": PhoneSource(
+        "contact", Contact, ["phone", "secondary_phone"],
+        name=func.trim(func.coalesce(Contact.first_name, "") + " " + func.coalesce(Contact.last_name, "")),
+        link=case(
+            (Contact.client_id != None, _link("/clients/", Contact.client_id)),
+            else_=_link("/leads/", Contact.lead_id)
+        ),
+        # Contacts are visible to whoever owns their lead/client
+        owner_created_by=func.coalesce(Client.created_by, Lead.created_by),
+        owner_assigned_to=func.coalesce(Client.assigned_to, Lead.assigned_to),
+        live=and_(Client.deleted_at == None, Lead.deleted_at == None),
+        joins=[(Client, Contact.client_id == Client.id), (Lead, Contact.lead_id == Lead.id)],
+    ),
+    "project": PhoneSource(
+        "project", Project, ["primary_contact_phone"],
+        name=Project.project_name,
+        link=case(
+            (Project.client_id != None, _link("/clients/", Project.client_id)),
+            else_=_link("/leads/", Project.lead_id)
+        ),
+        owner_created_by=Project.created_by,
+        children=[("interaction", Interaction.project_id)],
+        cascade_on=["client_id", "lead_id"],
+    ),
+    "interaction": PhoneSource(
+        "interaction", Interaction, ["phone"],
+        name=func.coalesce(Interaction.contact_person, Interaction.summary, "Interaction"),
+        link=case(
+            (Interaction.client_id != None, _link("/clients/", Interaction.client_id)),
+            (Interaction.lead_id != None, _link("/leads/", Interaction.lead_id)),
+            (_ProjectParent.client_id != None, _link("/clients/", _ProjectParent.client_id)),
+            else_=_link("/leads/", _ProjectParent.lead_id)
+        ),
+        owner_created_by=Interaction.owner_created_by,
+        owner_assigned_to=Interaction.owner_assigned_to,
+        joins=[(_ProjectParent, Interaction.project_id == _ProjectParent.id)],
+    ),
+}
+
+PHONE_MODELS = {source.model: entity_type for entity_type, source in PHONE_SOURCES.items()}
+# Lookup results: companies first, then people, then activity
+TYPE_ORDER = {entity_type: position for position, entity_type in enumerate(PHONE_SOURCES)}
+
+
+def refresh(session, entity_type: str, ids, tenant_id: int, children: bool = True):
+    """
+    Rewrite the entries of `ids` (a list or a SELECT of ids, all of
+    tenant_id) and, unless children is False, of the records derived from
+    them. Does not commit.
+    """
+    source = PHONE_SOURCES.get(entity_type)
+    if source is None:
+        return
+    session.flush()
+    model = source.model
+    session.execute(delete(PhoneIndexEntry).where(
+        PhoneIndexEntry.tenant_id == tenant_id,
+        PhoneIndexEntry.entity_type == entity_type,
+        PhoneIndexEntry.entity_id.in_(ids)
+    ))
+    entries = source.entries(session.execute(source.select_rows(model.tenant_id == tenant_id, model.id.in_(ids))))
+    if entries:
+        session.execute(insert(PhoneIndexEntry), entries)
+
+    if not children:
+        return
+    for child_type, parent_column in source.children:
+        child_model = PHONE_SOURCES[child_type].model
+        refresh(session, child_type, select(child_model.id).where(parent_column.in_(ids)), tenant_id)
+
+
+def reindex(session, entity_type: str, ids: List[int]):
+    """
+    Rewrite the entries of `ids`, whatever their tenant, without touching
+    derived records. Used by batched backfills. Does not commit.
+    """
+    source = PHONE_SOURCES[entity_type]
+    session.execute(delete(PhoneIndexEntry).where(
+        PhoneIndexEntry.entity_type == entity_type,
+        PhoneIndexEntry.entity_id.in_(ids)
+    ))
+    entries = source.entries(session.execute(source.select_rows(source.model.id.in_(ids))))
+    if entries:
+        session.execute(insert(PhoneIndexEntry), entries)
+
+
+def lookup(session, user, number: str, limit: int = PHONE_LOOKUP_LIMIT) -> List[Dict]:
+    """
+    Records the user may see that carry the number
+    """
+    digits = normalize_phone_digits(number)
+    if not digits:
+        return []
+    query = select(PhoneIndexEntry).where(
+        PhoneIndexEntry.tenant_id == user.tenant_id,
+        PhoneIndexEntry.digits == digits
+    )
+    if not is_admin(user):
+        query = query.where(or_(
+            PhoneIndexEntry.owner_created_by == user.id,
+            PhoneIndexEntry.owner_assigned_to == user.id
+        ))
+    entries = session.execute(query.limit(limit)).scalars().all()
+    entries.sort(key=lambda entry: (TYPE_ORDER[entry.entity_type], -entry.entity_id))
+    return [{
+        "type": entry.entity_type,
+        "id": entry.entity_id,
+        "name": entry.name,
+        "link": entry.link,
+        "phone": entry.phone,
+    } for entry in entries]
+
+
+def _changes_children(session, source: PhoneSource, instance) -> bool:
+    """
+    Whether the write to instance affects its children's entries (new
+    records have none yet; children added with them are indexed themselves)
+    """
+    if not source.children or instance in session.new:
+        return False
+    if instance in session.deleted:
+        return True
+    attrs = inspect(instance).attrs
+    return any(attrs[column].history.has_changes() for column in source.cascade_on)
+
+
+@sa_event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    # Pre-flush attribute history is still available here.
+    # stale: (entity_type, tenant_id) -> {id: refresh its children too}
+    stale = session.info.setdefault(STALE_KEY, {})
+    for instance in chain(session.new, session.dirty, session.deleted):
+        entity_type = PHONE_MODELS.get(type(instance))
+        if entity_type and instance.id is not None:
+            ids = stale.setdefault((entity_type, instance.tenant_id), {})
+            cascade = _changes_children(session, PHONE_SOURCES[entity_type], instance)
+            ids[instance.id] = ids.get(instance.id, False) or cascade
+
+
+@sa_event.listens_for(Session, "before_commit")
+def _refresh_changed(session):
+    if not session.info.get(STALE_KEY) and not (session.new or session.dirty or session.deleted):
+        return
+    session.flush()
+    stale = session.info.pop(STALE_KEY, None) or {}
+    for (entity_type, tenant_id), ids in stale.items():
+        for cascade in (False, True):
+            selected = sorted(row_id for row_id, flag in ids.items() if flag == cascade)
+            if selected:
+                refresh(session, entity_type, selected, tenant_id, children=cascade)
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _drop_changes(session):
+    session.info.pop(STALE_KEY, None)
@@ -1,94 +1,203 @@
 import re
-from typing import Optional
+from typing import Iterable, Optional, Union
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+_NON_DIGIT = re.compile(r'\D')
+
+# Arrow-backed strings: the batch functions strip digits with numpy over
+# the arrow buffers and build results with pyarrow compute kernels instead
+# of once per value in Python
+PHONE_DTYPE = "string[pyarrow]"
+_ARROW_TEXT = pa.large_string()
+
+PhoneValues = Union[pd.Series, Iterable[Optional[str]]]
+
+# Phone rules, shared by the single-value and batch functions below.
+# Valid numbers have MIN_DIGITS to MAX_DIGITS digits.
+MIN_DIGITS = 7
+MAX_DIGITS = 15
+# Storage prefix by digit count: US 10-digit numbers get +1, 7-digit local
+# numbers are kept as-is for now; every other valid length gets a +
+STORAGE_PREFIXES = {10: "+1", 7: ""}
+DEFAULT_STORAGE_PREFIX = "+"
+# Display layouts: literal text and (start, stop) slices of the digits
+US_LAYOUT = ("(", (-10, -7), ") ", (-7, -4), "-", (-4, None))       # (XXX) XXX-XXXX
+LOCAL_LAYOUT = ((0, 3), "-", (3, None))                              # XXX-XXXX
+
+
+def _valid_length(length):
+    """Digit counts that make a valid number (ints or numpy arrays)"""
+    return (length >= MIN_DIGITS) & (length <= MAX_DIGITS)
+
+def _us_layout(length, leading_one):
+    """US numbers, with or without the country code"""
+    return (length == 10) | ((length == 11) & leading_one)
+
+def _local_layout(length):
+    return length == 7
+
 
 def clean_phone_number(phone: str) -> Optional[str]:
     """
     Clean and standardize phone number for storage.
     Stores in E.164 format: +1XXXXXXXXXX for US numbers
-    
+
     Args:
         phone: Raw phone input from user
-        
+
     Returns:
         Cleaned phone number or None if invalid
     """
     if not phone or not isinstance(phone, str):
         return None
-    
+
     # Remove all non-numeric characters
-    cleaned = re.sub(r'[^\d]', '', phone.strip())
-    
-    if not cleaned:
+    cleaned = _NON_DIGIT.sub('', phone)
+    if not _valid_length(len(cleaned)):
         return None
-    
-    # Handle different US phone number formats
-    if len(cleaned) == 10:
-        # Standard US 10-digit number
-        return f"+1{cleaned}"
-    elif len(cleaned) == 11 and cleaned.startswith('1'):
-        # 11-digit starting with 1
-        return f"+{cleaned}"
-    elif len(cleaned) == 7:
-        # 7-digit local number - return as-is for now
-        # You might want to add area code logic here
-        return cleaned
-    
-    # For international numbers or other formats, return as-is if reasonable length
-    if 7 <= len(cleaned) <= 15:
-        return f"+{cleaned}"
-    
-    return None
+    return STORAGE_PREFIXES.get(len(cleaned), DEFAULT_STORAGE_PREFIX) + cleaned
+
+def _render(layout, digits: str) -> str:
+    return "".join(part if isinstance(part, str) else digits[slice(*part)] for part in layout)
 
 def format_phone_display(phone: str) -> str:
     """
     Format phone number for display in UI.
-    
+
     Args:
         phone: Stored phone number (should be in +1XXXXXXXXXX format)
-        
+
     Returns:
         Formatted phone number for display
     """
     if not phone:
         return ""
-    
+
     # Remove + and any non-digits
-    cleaned = re.sub(r'[^\d]', '', phone)
-    
-    if len(cleaned) == 11 and cleaned.startswith('1'):
-        # US number: +1 (XXX) XXX-XXXX
-        return f"({cleaned[1:4]}) {cleaned[4:7]}-{cleaned[7:]}"
-    elif len(cleaned) == 10:
-        # US number without country code: (XXX) XXX-XXXX
-        return f"({cleaned[:3]}) {cleaned[3:6]}-{cleaned[6:]}"
-    elif len(cleaned) == 7:
-        # Local number: XXX-XXXX
-        return f"{cleaned[:3]}-{cleaned[3:]}"
-    
+    cleaned = _NON_DIGIT.sub('', phone)
+
+    if _us_layout(len(cleaned), cleaned.startswith('1')):
+        return _render(US_LAYOUT, cleaned)
+    elif _local_layout(len(cleaned)):
+        return _render(LOCAL_LAYOUT, cleaned)
+
     # For other formats, return the original
     return phone
 
 def validate_phone_number(phone: str) -> bool:
     """
     Validate if phone number is in acceptable format.
-    
+
     Args:
         phone: Phone number to validate
-        
+
     Returns:
         True if valid, False otherwise
     """
     if not phone:
         return False
-    
-    cleaned = re.sub(r'[^\d]', '', phone)
-    
+
     # Accept US phone numbers (10 or 11 digits) or international (7-15 digits)
-    if len(cleaned) == 10:
-        return True
-    elif len(cleaned) == 11 and cleaned.startswith('1'):
-        return True
-    elif 7 <= len(cleaned) <= 15:
-        return True
-    
-    return False
\ No newline at end of file
+    return bool(_valid_length(len(_NON_DIGIT.sub('', phone))))
+
+
+def _phone_text(phones: PhoneValues) -> pd.Series:
+    """
+    Values as an arrow string Series; non-strings (numbers, NaN) become <NA>
+    """
+    if not isinstance(phones, pd.Series):
+        phones = pd.Series(list(phones), dtype=object)
+    if phones.dtype == object:
+        phones = phones.where(phones.map(type) == str)
+    return phones.astype(PHONE_DTYPE)
+
+def _arrow_values(text: pd.Series) -> pa.LargeStringArray:
+    values = pa.array(text.array)
+    if isinstance(values, pa.ChunkedArray):
+        values = values.combine_chunks()
+    values = values.cast(_ARROW_TEXT)
+    if values.offset:
+        # Buffers below are read from position 0
+        values = pa.concat_arrays([values])
+    return values
+
+def _phone_digits(values: pa.LargeStringArray):
+    """
+    (digits, digit count) for each value, count 0 for null.
+    Works on the arrow buffers directly: one numpy mask over the UTF-8 bytes
+    keeps the ASCII digits (multi-byte characters never contain digit
+    bytes), and its running count gives the new offsets. An RE2 replace of
+    \\D took most of the batch functions' time.
+    """
+    validity, offsets_buffer, data_buffer = values.buffers()
+    offsets = np.frombuffer(offsets_buffer, dtype=np.int64)[:len(values) + 1]
+    data = np.frombuffer(data_buffer, dtype=np.uint8) if data_buffer is not None else np.empty(0, np.uint8)
+    data = data[offsets[0]:offsets[-1]]
+
+    keep = (data >= ord("0")) & (data <= ord("9"))
+    kept = np.concatenate(([0], np.cumsum(keep, dtype=np.int64)))
+    new_offsets = kept[offsets - offsets[0]]
+    digits = pa.LargeStringArray.from_buffers(
+        len(values), pa.py_buffer(new_offsets), pa.py_buffer(data[keep]), validity, values.null_count
+    )
+    return digits, np.diff(new_offsets)
+
+def _literal(text: Optional[str]):
+    return pa.scalar(text, _ARROW_TEXT)
+
+def _join(*parts):
+    """
+    Element-wise concatenation of arrow strings and literals
+    """
+    return pc.binary_join_element_wise(*parts, _literal(""))
+
+def _series(values: pa.Array, index) -> pd.Series:
+    return pd.Series(pd.arrays.ArrowStringArray(values), index=index)
+
+def _render_all(layout, digits):
+    """
+    _render for every value at once
+    """
+    return _join(*[
+        _literal(part) if isinstance(part, str) else pc.utf8_slice_codeunits(digits, *part)
+        for part in layout
+    ])
+
+def clean_phone_numbers(phones: PhoneValues) -> pd.Series:
+    """
+    Vectorized clean_phone_number: a string Series, <NA> where invalid
+    """
+    text = _phone_text(phones)
+    digits, length = _phone_digits(_arrow_values(text))
+    result = _join(_literal(DEFAULT_STORAGE_PREFIX), digits)
+    for digit_count, prefix in STORAGE_PREFIXES.items():
+        result = pc.if_else(pa.array(length == digit_count), _join(_literal(prefix), digits), result)
+    result = pc.if_else(pa.array(_valid_length(length)), result, _literal(None))
+    return _series(result, text.index)
+
+def format_phones_display(phones: PhoneValues) -> pd.Series:
+    """
+    Vectorized format_phone_display: a string Series, "" for empty values
+    """
+    text = _phone_text(phones)
+    values = _arrow_values(text)
+    digits, length = _phone_digits(values)
+
+    leading_one = pc.starts_with(digits, "1").fill_null(False).to_numpy(zero_copy_only=False)
+    result = pc.if_else(
+        pa.array(_us_layout(length, leading_one)), _render_all(US_LAYOUT, digits),
+        pc.if_else(pa.array(_local_layout(length)), _render_all(LOCAL_LAYOUT, digits), values)
+    )
+    result = pc.if_else(pc.equal(values.fill_null(""), ""), _literal(""), result)
+    return _series(result, text.index)
+
+def validate_phone_numbers(phones: PhoneValues) -> pd.Series:
+    """
+    Vectorized validate_phone_number: a bool Series
+    """
+    text = _phone_text(phones)
+    _, length = _phone_digits(_arrow_values(text))
+    return pd.Series(_valid_length(length), index=text.index)
@@ -0,0 +1,164 @@
+"""
+User preferences: defaults, validation, a per-user cache and bulk upsert.
+
+GET /api/preferences runs on every page load, so each user's preferences
+merged with DEFAULT_PREFERENCES are cached in memory after the first read.
+Every write path upserts through this module and drops the user's entry
+once committed.
+"""
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models import UserPreference
+
+# Default preferences - this is what users get if they haven't customized anything
+DEFAULT_PREFERENCES = {
+    "pagination": {
+        "clients": {"perPage": 10, "sort": "newest"},
+        "leads": {"perPage": 10, "sort": "newest"},
+        "projects": {"perPage": 10, "sort": "newest"},
+        "interactions": {"perPage": 10, "sort": "newest"},
+        "admin_clients": {"perPage": 20, "sort": "newest"},
+        "admin_leads": {"perPage": 20, "sort": "newest"},
+        "admin_projects": {"perPage": 20, "sort": "newest"},
+        "admin_interactions": {"perPage": 20, "sort": "newest"}
+    },
+    "display": {
+        "sidebar_collapsed": False,
+        "theme": "light"
+    }
+}
+
+PAGINATION_TABLES = list(DEFAULT_PREFERENCES["pagination"])
+SORT_ORDERS = ['newest', 'oldest', 'alphabetical', 'pending', 'completed']
+# Most category/key pairs accepted by one bulk update
+MAX_BULK_PREFERENCES = 50
+
+
+def merge_with_defaults(defaults, user_prefs):
+    """Deep merge user preferences with defaults"""
+    if not isinstance(user_prefs, dict):
+        return defaults.copy()
+
+    result = defaults.copy()
+
+    for key, value in user_prefs.items():
+        if key in result and isinstance(result[key], dict) and isinstance(value, dict):
+            result[key] = merge_with_defaults(result[key], value)
+        else:
+            result[key] = value
+
+    return result
+
+
+def validate_pagination(data) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    (value to store, error) for a pagination preference body
+    """
+    if not isinstance(data, dict):
+        return None, "Pagination preference must be an object"
+    per_page = data.get('perPage', 10)
+    sort_order = data.get('sort', 'newest')
+
+    if not isinstance(per_page, int) or isinstance(per_page, bool) or per_page < 1 or per_page > 100:
+        return None, "Invalid perPage value (1-100)"
+    if sort_order not in SORT_ORDERS:
+        return None, "Invalid sort order"
+    return {'perPage': per_page, 'sort': sort_order}, None
+
+
+def validate_preference(category: str, key: str, value) -> Tuple[Optional[Any], Optional[str]]:
+    """
+    (value to store, error) for one category/key pair of a bulk update
+    """
+    if category == "pagination":
+        if key not in PAGINATION_TABLES:
+            return None, f"Invalid table name: {key}"
+        return validate_pagination(value)
+
+    defaults = DEFAULT_PREFERENCES.get(category)
+    if defaults is None:
+        return None, f"Unknown preference category: {category}"
+    if key not in defaults:
+        return None, f"Unknown preference: {category}.{key}"
+    if type(value) is not type(defaults[key]):
+        return None, f"{category}.{key} must be a {type(defaults[key]).__name__}"
+    return value, None
+
+
+def upsert_preferences(session, user_id: int, values: List[Tuple[str, str, Any]]):
+    """
+    Insert or overwrite (category, key, value) triples for the user in one
+    statement. Does not commit.
+    """
+    if not values:
+        return
+    now = datetime.utcnow()
+    rows = [{
+        "user_id": user_id,
+        "category": category,
+        "preference_key": key,
+        "preference_value": value,
+        "created_at": now,
+        "updated_at": now,
+    } for category, key, value in values]
+
+    dialect = session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        stmt = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(UserPreference).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "category", "preference_key"],
+            set_={
+                "preference_value": stmt.excluded.preference_value,
+                "updated_at": stmt.excluded.updated_at,
+            }
+        )
+        session.execute(stmt)
+        return
+
+    # No portable upsert: replace the rows instead
+    for category, key, _ in values:
+        session.query(UserPreference).filter(
+            UserPreference.user_id == user_id,
+            UserPreference.category == category,
+            UserPreference.preference_key == key
+        ).delete(synchronize_session=False)
+    session.execute(insert(UserPreference), rows)
+
+
+class PreferenceCache:
+    def __init__(self):
+        self._by_user: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def get(self, session, user_id: int) -> Dict[str, Any]:
+        """
+        The user's preferences merged with the defaults
+        """
+        merged = self._by_user.get(user_id)
+        if merged is not None:
+            return merged
+
+        rows = session.query(
+            UserPreference.category, UserPreference.preference_key, UserPreference.preference_value
+        ).filter(UserPreference.user_id == user_id).all()
+        # Convert to nested structure
+        preferences = {}
+        for category, key, value in rows:
+            preferences.setdefault(category, {})[key] = value
+        # Merge with defaults (defaults take precedence for missing values)
+        merged = merge_with_defaults(DEFAULT_PREFERENCES, preferences)
+        with self._lock:
+            self._by_user[user_id] = merged
+            self.loads += 1
+        return merged
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._by_user.pop(user_id, None)
+
+
+preference_cache = PreferenceCache()
@@ -0,0 +1,232 @@
+"""
+Follow-up reminders.
+
+`reminders` keeps the pending follow-ups due in the next REMINDER_HORIZON
+seconds in a heap ordered by due time, and sleeps until the earliest one
+instead of polling the interactions table. The window is loaded with one
+range query on (followup_status, follow_up) and extended the same way when
+half of it has passed. Interaction handlers call schedule()/cancel() after
+committing so edits take effect without a reload.
+
+When a reminder comes due its interaction is re-read (status, due time and
+the owner of its client / lead / project) and a follow_up_due event goes to
+the notification dispatcher, which mails it, digested per recipient. A
+heap entry that no longer matches the row is simply dropped, so stale
+entries never need to be removed from the heap.
+
+Reminders that came due while the server was down are not sent.
+"""
+import asyncio
+import heapq
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, func
+from app.database import SessionLocal
+from app.models import Interaction, FollowUpStatus, User
+from app.utils.calendar_feed import follow_up_query
+from app.utils.notifications import follow_up_event, notifications
+
+# Follow-ups further out than this are loaded by a later window query
+REMINDER_HORIZON = int(os.environ.get("REMINDER_HORIZON", 6 * 3600))
+REMINDER_RETRY_DELAY = int(os.environ.get("REMINDER_RETRY_DELAY", 60))
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def window_query(start: datetime, end: datetime):
+    return select(Interaction.id, Interaction.follow_up).where(
+        Interaction.followup_status == FollowUpStatus.pending,
+        Interaction.follow_up >= start,
+        Interaction.follow_up < end
+    )
+
+
+def reminder_query(interaction_ids: List[int]):
+    """
+    Due interactions with their entity name and the email of whoever owns
+    the client / lead / project (assignee first, then creator)
+    """
+    owner_id = func.coalesce(Interaction.owner_assigned_to, Interaction.owner_created_by)
+    return follow_up_query().add_columns(
+        Interaction.tenant_id,
+        Interaction.followup_status,
+        User.email.label("owner_email"),
+    ).outerjoin(
+        User, (User.id == owner_id) & (User.is_active == True)
+    ).where(
+        Interaction.id.in_(interaction_ids)
+    )
+
+
+class FollowUpScheduler:
+    def __init__(self, horizon: int = REMINDER_HORIZON):
+        self.horizon = timedelta(seconds=horizon)
+        # (due, interaction id); entries are valid only while _due agrees
+        self._heap: List[Tuple[datetime, int]] = []
+        self._due: Dict[int, datetime] = {}
+        self._window_end: Optional[datetime] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._reload = False
+        self.fired = 0
+        self.window_loads = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        # The worker loads the first window before anything else
+        self._window_end = datetime.utcnow() + self.horizon
+        self._reload = True
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._heap.clear()
+        self._due.clear()
+
+    def schedule(self, interaction_id: int, follow_up: Optional[datetime], status: FollowUpStatus):
+        """
+        Bring one interaction's reminder in line with its committed row.
+        Safe to call from any thread.
+        """
+        if status != FollowUpStatus.pending:
+            follow_up = None
+        self._call(self._set, interaction_id, _utc(follow_up))
+
+    def cancel(self, interaction_id: int):
+        self._call(self._set, interaction_id, None)
+
+    def reload(self):
+        """
+        Re-read the current window, after bulk changes such as imports
+        """
+        self._call(self._request_reload)
+
+    def stats(self):
+        return {
+            "scheduled": len(self._due),
+            "next_due": min(self._due.values()).isoformat() if self._due else None,
+            "window_end": self._window_end.isoformat() if self._window_end else None,
+            "window_loads": self.window_loads,
+            "fired": self.fired,
+        }
+
+    def _call(self, callback, *args):
+        if not self.running:
+            return
+        self._loop.call_soon_threadsafe(callback, *args)
+
+    def _set(self, interaction_id: int, due: Optional[datetime]):
+        if due is None or due >= self._window_end:
+            # Out of the window: a later window query picks it up if still pending
+            self._due.pop(interaction_id, None)
+            return
+        if self._due.get(interaction_id) == due:
+            return
+        self._due[interaction_id] = due
+        heapq.heappush(self._heap, (due, interaction_id))
+        if self._heap[0] == (due, interaction_id):
+            self._wakeup.set()
+
+    def _request_reload(self):
+        self._reload = True
+        self._wakeup.set()
+
+    async def _load_window(self, start: datetime, end: datetime):
+        # Move the window edge first so schedule() calls made while the
+        # query runs are kept rather than left for the next window
+        self._window_end = end
+        rows = await asyncio.to_thread(self._fetch_window, start, end)
+        for interaction_id, follow_up in rows:
+            self._set(interaction_id, _utc(follow_up))
+        self.window_loads += 1
+
+    @staticmethod
+    def _fetch_window(start: datetime, end: datetime):
+        session = SessionLocal()
+        try:
+            return session.execute(window_query(start, end)).all()
+        finally:
+            session.close()
+
+    async def _run(self):
+        while True:
+            now = datetime.utcnow()
+            retry_at = None
+            try:
+                if self._reload:
+                    self._reload = False
+                    await self._load_window(now, self._window_end)
+                if now >= self._window_end - self.horizon / 2:
+                    await self._load_window(self._window_end, now + self.horizon)
+            except Exception as e:
+                print(f"[Reminders] Could not load follow-ups, retrying in {REMINDER_RETRY_DELAY}s: {e}")
+                self._reload = True
+                retry_at = now + timedelta(seconds=REMINDER_RETRY_DELAY)
+
+            due = {}
+            while self._heap and self._heap[0][0] <= now:
+                when, interaction_id = heapq.heappop(self._heap)
+                if self._due.get(interaction_id) == when:
+                    del self._due[interaction_id]
+                    due[interaction_id] = when
+            if due:
+                try:
+                    await self._fire(due)
+                except Exception as e:
+                    print(f"[Reminders] Failed to send {len(due)} reminders: {e}")
+
+            next_wake = retry_at or self._window_end - self.horizon / 2
+            if self._heap:
+                next_wake = min(next_wake, self._heap[0][0])
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(),
+                    max(0.0, (next_wake - datetime.utcnow()).total_seconds())
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, due: Dict[int, datetime]):
+        rows = await asyncio.to_thread(self._fetch_due, list(due))
+        for row in rows:
+            # The row changed after it was scheduled; its schedule() call has the current state
+            if row.followup_status != FollowUpStatus.pending or _utc(row.follow_up) != due[row.id]:
+                continue
+            if not row.owner_email:
+                continue
+            notifications.publish(follow_up_event(
+                tenant_id=row.tenant_id,
+                recipient_email=row.owner_email,
+                interaction_id=row.id,
+                summary=f"{row.summary or 'Follow-up'} ({row.entity_name})"
+            ))
+            self.fired += 1
+
+    @staticmethod
+    def _fetch_due(interaction_ids: List[int]):
+        session = SessionLocal()
+        try:
+            return session.execute(reminder_query(interaction_ids)).all()
+        finally:
+            session.close()
+
+
+reminders = FollowUpScheduler()
@@ -0,0 +1,91 @@
+"""
+LRU cache of /api/search results.
+
+Entries are keyed by (tenant, visibility scope, normalized terms) and
+stamped with the tenant's write generation. Every commit that changes a
+tenant's search documents bumps the generation (see search_index), so a
+cached result is only served while nothing searchable has changed since it
+was computed; stale entries are dropped when next looked up or evicted.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# A generation: (global epoch, tenant counter)
+Generation = Tuple[int, int]
+
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", 1000))
+
+
+class SearchResultCache:
+    def __init__(self, max_entries: int = SEARCH_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[Generation, Any]]" = OrderedDict()
+        self._generations: Dict[int, int] = {}
+        # Bumped for every tenant at once, including ones not seen yet
+        self._epoch = 0
+        # Commits run in worker threads too (imports)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def generation(self, tenant_id: int) -> Generation:
+        return (self._epoch, self._generations.get(tenant_id, 0))
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        tenant_id = key[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            generation, value = entry
+            if generation != self.generation(tenant_id):
+                del self._entries[key]
+                self.stale += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Tuple, generation: Generation, value: Any):
+        """
+        Store a result computed at `generation` (read before running the
+        query, so a write landing meanwhile makes the entry stale, not wrong)
+        """
+        with self._lock:
+            self._entries[key] = (generation, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def bump(self, tenant_id: Optional[int]):
+        """
+        Make the tenant's cached results stale (None: every tenant)
+        """
+        with self._lock:
+            if tenant_id is None:
+                self._entries.clear()
+                self._epoch += 1
+                return
+            self._generations[tenant_id] = self._generations.get(tenant_id, 0) + 1
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "stale": self.stale,
+            "evictions": self.evictions,
+        }
+
+
+search_cache = SearchResultCache()
@@ -0,0 +1,445 @@
+"""
+Full-text search over clients, leads, projects, accounts and users.
+
+Every searchable record has a row in search_documents holding its name
+(weighted highest), details and notes, its link and its owners. The rows
+are full-text indexed (tsvector + GIN on PostgreSQL, FTS5 on SQLite), so a
+search is one index lookup ranked by relevance instead of ILIKE scans over
+every column of every table.
+
+Keeping the documents current:
+  - ORM writes are picked up automatically: changed records are collected
+    after each flush and their documents rebuilt just before the commit,
+    in the same transaction.
+  - Core bulk statements (imports, bulk endpoints, conversions) call
+    refresh() themselves with the ids they wrote.
+  - Existing records are indexed by the "search_index" backfill
+    (app.utils.backfill), in primary-key batches on a live database.
+Documents are rebuilt with set-based DELETE + INSERT ... SELECT statements
+straight from the source tables, so refreshing 10 000 ids costs the same
+few statements as refreshing one.
+
+search_all() queries each entity type concurrently under a shared time
+budget and merges the results by score.
+"""
+import asyncio
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from typing import Dict, List, Optional
+from sqlalchemy import (
+    event as sa_event, select, insert, delete, func, case, cast, literal, literal_column,
+    or_, and_, String, Integer, table, column, text
+)
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, engine
+from app.models import SearchDocument, Client, Lead, Project, Account, User
+from app.utils.access_utils import is_admin
+from app.utils.search_cache import search_cache
+
+STALE_KEY = "stale_search_documents"
+# What this transaction rewrote, for in-memory copies (typeahead) to catch
+# up on after commit: (tenant_id, entity_type, ids) triples, and tenants
+# indexed in bulk (None: all tenants)
+CHANGED_KEY = "changed_search_documents"
+REINDEXED_KEY = "reindexed_search_tenants"
+# Tenants whose cached search results the commit makes stale
+TOUCHED_KEY = "touched_search_tenants"
+
+# Latency budget for one search request; entity types still running after
+# it are left out of the response and reported as incomplete
+SEARCH_TIMEOUT = float(os.environ.get("SEARCH_TIMEOUT", 0.5))
+# Connections searches may use at once (one per entity type per request)
+SEARCH_WORKERS = int(os.environ.get("SEARCH_WORKERS", 8))
+
+# Own pool, so searches that overrun the budget can't hold up imports or
+# exports waiting on the default executor
+_search_executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="search")
+
+
+def _text(*parts):
+    """
+    Space-joined, NULL-safe concatenation of text columns
+    """
+    result = None
+    for part in parts:
+        part = func.coalesce(part, "")
+        result = part if result is None else result + " " + part
+    return result
+
+
+def _strip_phone(phone):
+    for char in ["-", " ", "(", ")", ".", "+"]:
+        phone = func.replace(phone, char, "")
+    return phone
+
+
+def _digits(phone):
+    """
+    Digit tokens for a phone column. "+13165551212" is a single token, so
+    next to the raw digits also index the national number and the local
+    part (the last 10 and 7 digits, as dedup_utils.normalize_phone_digits
+    compares them): "3165551212", "316" and "5551212" all find it.
+    """
+    phone = _strip_phone(phone)
+    length = func.length(phone)
+    national = case((length > 10, func.substr(phone, length - 9)), else_=phone)
+    local = case((length >= 7, func.substr(phone, length - 6)), else_=literal(""))
+    return _text(phone, national, local)
+
+
+def _link(prefix: str, id_column):
+    return literal(prefix) + cast(id_column, String)
+
+
+class SearchSource:
+    def __init__(self, entity_type: str, model, name, body, notes, link, fields,
+                 owner_created_by=None, owner_assigned_to=None, live=None, join=None):
+        self.entity_type = entity_type
+        self.model = model
+        self.name = name
+        self.body = body
+        self.notes = notes
+        self.link = link
+        # Source fields reported as "matches": name -> expressions searched for it
+        self.fields = fields
+        self.owner_created_by = owner_created_by
+        self.owner_assigned_to = owner_assigned_to
+        self.live = live                    # rows that get a document (e.g. not soft-deleted)
+        self.join = join                    # (model, onclause) for owners held by a parent
+
+    def select_documents(self, *conditions):
+        """
+        SELECT producing search_documents rows for the matching source records
+        """
+        model = self.model
+        stmt = select(
+            model.tenant_id,
+            literal(self.entity_type),
+            model.id,
+            func.substr(self.name, 1, 255),
+            self.body,
+            self.notes,
+            self.link,
+            self.owner_created_by if self.owner_created_by is not None else literal(None, Integer),
+            self.owner_assigned_to if self.owner_assigned_to is not None else literal(None, Integer),
+        ).select_from(model)
+        if self.join is not None:
+            stmt = stmt.join(*self.join)
+        if self.live is not None:
+            stmt = stmt.where(self.live)
+        return stmt.where(*conditions)
+
+
+def _company_source(entity_type: str, model, prefix: str) -> SearchSource:
+    return SearchSource(
+        entity_type, model,
+        name=model.name,
+        body=_text(model.contact_person, model.email, model.phone, _digits(model.phone),
+                   model.address, model.city, model.state, model.zip),
+        notes=model.notes,
+        link=_link(prefix, model.id),
+        fields={
+            "name": [model.name],
+            "contact_person": [model.contact_person],
+            "email": [model.email],
+            "phone": [model.phone, _strip_phone(model.phone)],
+            "address": [model.address],
+            "city": [model.city],
+            "state": [model.state],
+            "zip": [model.zip],
+            "notes": [model.notes],
+        },
+        owner_created_by=model.created_by,
+        owner_assigned_to=model.assigned_to,
+        live=model.deleted_at == None,
+    )
+
+
+SEARCH_SOURCES: Dict[str, SearchSource] = {
+    "client": _company_source("client", Client, "/clients/"),
+    "lead": _company_source("lead", Lead, "/leads/"),
+    "project": SearchSource(
+        "project", Project,
+        name=Project.project_name,
+        body=_text(Project.project_description, Project.project_status),
+        notes=Project.notes,
+        link=case(
+            (Project.client_id != None, _link("/clients/", Project.client_id)),
+            else_=_link("/leads/", Project.lead_id)
+        ),
+        fields={
+            "project_name": [Project.project_name],
+            "project_description": [Project.project_description],
+            "project_status": [Project.project_status],
+            "notes": [Project.notes],
+        },
+        owner_created_by=Project.created_by,
+    ),
+    "account": SearchSource(
+        "account", Account,
+        name=func.coalesce(Account.account_name, Account.account_number),
+        body=_text(Account.account_name, Account.account_number),
+        notes=Account.notes,
+        link=_link("/clients/", Account.client_id),
+        fields={
+            "account_name": [Account.account_name],
+            "account_number": [Account.account_number],
+            "notes": [Account.notes],
+        },
+        # Accounts are visible to whoever owns their client
+        owner_created_by=Client.created_by,
+        owner_assigned_to=Client.assigned_to,
+        join=(Client, Account.client_id == Client.id),
+    ),
+    "user": SearchSource(
+        "user", User,
+        name=User.email,
+        body=literal(""),
+        notes=literal(None, String),
+        link=literal(None, String),
+        fields={"email": [User.email]},
+    ),
+}
+
+INDEXED_MODELS = {source.model: entity_type for entity_type, source in SEARCH_SOURCES.items()}
+
+DOCUMENT_COLUMNS = [
+    "tenant_id", "entity_type", "entity_id", "name", "body", "notes", "link",
+    "owner_created_by", "owner_assigned_to",
+]
+
+
+def refresh(session, entity_type: str, ids, tenant_id: int):
+    """
+    Rebuild the documents of `ids` (a list or a SELECT of ids, all of
+    tenant_id) from their source rows; records that no longer qualify lose
+    their document.
+    Refreshing clients also refreshes their accounts (owners are inherited).
+    Does not commit.
+    """
+    source = SEARCH_SOURCES.get(entity_type)
+    if source is None:
+        return
+    session.flush()
+    session.execute(delete(SearchDocument).where(
+        SearchDocument.entity_type == entity_type,
+        SearchDocument.entity_id.in_(ids)
+    ))
+    session.execute(insert(SearchDocument).from_select(
+        DOCUMENT_COLUMNS, source.select_documents(source.model.id.in_(ids))
+    ))
+    session.info.setdefault(CHANGED_KEY, []).append((tenant_id, entity_type, ids))
+    if entity_type == "client":
+        refresh(session, "account", select(Account.id).where(Account.client_id.in_(ids)), tenant_id)
+
+
+def reindex(session, entity_type: str, ids: List[int]):
+    """
+    Rebuild the documents of `ids`, whatever their tenant, without touching
+    derived records. Used by batched backfills. Does not commit.
+    """
+    source = SEARCH_SOURCES[entity_type]
+    model = source.model
+    session.execute(delete(SearchDocument).where(
+        SearchDocument.entity_type == entity_type,
+        SearchDocument.entity_id.in_(ids)
+    ))
+    session.execute(insert(SearchDocument).from_select(
+        DOCUMENT_COLUMNS, source.select_documents(model.id.in_(ids))
+    ))
+    by_tenant = {}
+    for row_id, tenant_id in session.execute(select(model.id, model.tenant_id).where(model.id.in_(ids))):
+        by_tenant.setdefault(tenant_id, []).append(row_id)
+    for tenant_id, tenant_ids in by_tenant.items():
+        session.info.setdefault(CHANGED_KEY, []).append((tenant_id, entity_type, tenant_ids))
+
+
+def rebuild(session, tenant_id: Optional[int] = None):
+    """
+    Recreate every document (of one tenant, or all); does not commit
+    """
+    for entity_type, source in SEARCH_SOURCES.items():
+        conditions = [SearchDocument.entity_type == entity_type]
+        source_conditions = []
+        if tenant_id is not None:
+            conditions.append(SearchDocument.tenant_id == tenant_id)
+            source_conditions.append(source.model.tenant_id == tenant_id)
+        session.execute(delete(SearchDocument).where(*conditions))
+        session.execute(insert(SearchDocument).from_select(
+            DOCUMENT_COLUMNS, source.select_documents(*source_conditions)
+        ))
+    session.info.setdefault(REINDEXED_KEY, set()).add(tenant_id)
+
+
+@sa_event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    stale = session.info.setdefault(STALE_KEY, {})
+    for instance in chain(session.new, session.dirty, session.deleted):
+        entity_type = INDEXED_MODELS.get(type(instance))
+        if entity_type and instance.id is not None:
+            stale.setdefault((entity_type, instance.tenant_id), set()).add(instance.id)
+
+
+@sa_event.listens_for(Session, "before_commit")
+def _refresh_changed(session):
+    if session.info.get(STALE_KEY) or session.new or session.dirty or session.deleted:
+        session.flush()
+        stale = session.info.pop(STALE_KEY, None) or {}
+        for (entity_type, tenant_id), ids in stale.items():
+            refresh(session, entity_type, sorted(ids), tenant_id)
+
+    touched = {tenant_id for tenant_id, _, _ in session.info.get(CHANGED_KEY, ())}
+    touched.update(session.info.get(REINDEXED_KEY, ()))
+    if touched:
+        session.info[TOUCHED_KEY] = touched
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _clear_changes(session):
+    # Consumers read these in before_commit
+    session.info.pop(CHANGED_KEY, None)
+    session.info.pop(REINDEXED_KEY, None)
+    for tenant_id in session.info.pop(TOUCHED_KEY, None) or ():
+        search_cache.bump(tenant_id)
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _drop_changes(session):
+    for key in (STALE_KEY, CHANGED_KEY, REINDEXED_KEY, TOUCHED_KEY):
+        session.info.pop(key, None)
+
+
+def query_terms(query: str) -> List[str]:
+    return re.findall(r"\w+", query.lower())
+
+
+def visibility_filter(user):
+    """
+    Documents the user may see: admins everything in the tenant, others the
+    records they own (never users)
+    """
+    if is_admin(user):
+        return None
+    return and_(
+        SearchDocument.entity_type != "user",
+        or_(SearchDocument.owner_created_by == user.id, SearchDocument.owner_assigned_to == user.id)
+    )
+
+
+FTS = table("search_documents_fts", column("rowid"))
+
+
+def field_flags(entity_type: str, terms: List[str]):
+    """
+    One boolean column per source field of the entity type: does it contain
+    any of the terms. Evaluated in the database on the hits' source rows
+    (joined by primary key), so their text never leaves it.
+    """
+    flags = []
+    for field, expressions in SEARCH_SOURCES[entity_type].fields.items():
+        flag = or_(*[
+            func.lower(expression).like(f"%{term}%") for expression in expressions for term in terms
+        ])
+        flags.append(func.coalesce(flag, False).label(f"match_{field}"))
+    return flags
+
+
+def matched_fields(row) -> List[str]:
+    return [field for field in SEARCH_SOURCES[row.entity_type].fields if getattr(row, f"match_{field}")]
+
+
+def search_statement(dialect: str, user, terms: List[str], limit: int, entity_type: str):
+    """
+    Ranked documents of one entity type for the terms (every term must
+    match, as a prefix: "acm" finds "Acme", "316" a phone number's area
+    code), with their matched fields. "score" is higher-is-better and
+    comparable across entity types, as every type shares one index.
+    """
+    model = SEARCH_SOURCES[entity_type].model
+    columns = [
+        SearchDocument.entity_type, SearchDocument.entity_id, SearchDocument.name,
+        SearchDocument.link, *field_flags(entity_type, terms),
+    ]
+    conditions = [SearchDocument.tenant_id == user.tenant_id, SearchDocument.entity_type == entity_type]
+    access = visibility_filter(user)
+    if access is not None:
+        conditions.append(access)
+
+    def query(*score):
+        # The source row is only read for the field flags
+        return select(*columns, *score).select_from(SearchDocument).join(
+            model, model.id == SearchDocument.entity_id
+        )
+
+    if dialect == "postgresql":
+        tsquery = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+        document = literal_column("search_documents.document")
+        score = func.ts_rank(document, tsquery)
+        return query(score.label("score")).where(
+            *conditions, document.op("@@")(tsquery)
+        ).order_by(score.desc()).limit(limit)
+
+    if dialect == "sqlite":
+        # bm25 is lower-is-better; weights follow name > body > notes
+        rank = literal_column("bm25(search_documents_fts, 10.0, 4.0, 1.0)")
+        match = " ".join(f'"{term}"*' for term in terms)
+        return query((-rank).label("score")).join(
+            FTS, FTS.c.rowid == SearchDocument.id
+        ).where(
+            *conditions, text("search_documents_fts MATCH :match").bindparams(match=match)
+        ).order_by(rank).limit(limit)
+
+    # Other databases: unindexed fallback
+    matches = [
+        or_(*[func.lower(col).like(f"%{term}%") for col in (SearchDocument.name, SearchDocument.body, SearchDocument.notes)])
+        for term in terms
+    ]
+    return query(literal(0).label("score")).where(*conditions, *matches).limit(limit)
+
+
+def _execute_search(statement):
+    session = SessionLocal()
+    try:
+        if engine.dialect.name == "postgresql":
+            # Don't leave abandoned queries running past the budget
+            session.execute(text(f"SET LOCAL statement_timeout = {int(SEARCH_TIMEOUT * 1000)}"))
+        return session.execute(statement).all()
+    finally:
+        session.close()
+
+
+async def search_all(user, terms: List[str], limit_per_type: int):
+    """
+    Search every entity type concurrently, each on its own connection and
+    limited to SEARCH_TIMEOUT seconds. Returns (rows best first, entity
+    types that timed out or failed); a slow type costs its own results,
+    not the whole response.
+    """
+    dialect = engine.dialect.name
+    loop = asyncio.get_running_loop()
+    tasks = {
+        asyncio.ensure_future(loop.run_in_executor(
+            _search_executor, _execute_search,
+            search_statement(dialect, user, terms, limit_per_type, entity_type)
+        )): entity_type
+        for entity_type in SEARCH_SOURCES
+        if entity_type != "user" or is_admin(user)
+    }
+    done, pending = await asyncio.wait(tasks, timeout=SEARCH_TIMEOUT)
+
+    rows = []
+    incomplete = []
+    for task in pending:
+        task.cancel()
+        incomplete.append(tasks[task])
+    for task in done:
+        try:
+            rows.extend(task.result())
+        except Exception as e:
+            print(f"[Search] {tasks[task]} search failed: {e}")
+            incomplete.append(tasks[task])
+
+    rows.sort(key=lambda row: row.score, reverse=True)
+    return rows, sorted(incomplete)
@@ -0,0 +1,243 @@
+"""
+In-memory name prefix index for the search box typeahead.
+
+Per tenant, every client, lead, project and account name is kept in a
+sorted list under one key per word ("acme milling", "milling"), so a
+prefix lookup is a bisect plus a short forward scan rather than a database
+query. A tenant's names are loaded from search_documents on its first
+lookup; afterwards the search document changes made by each committed
+transaction are applied in place. Visibility is checked per hit, after the
+prefix scan, with the same ownership rule as /api/search.
+"""
+import os
+import re
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event as sa_event, select
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import SearchDocument
+from app.utils.access_utils import is_admin
+from app.utils.search_index import CHANGED_KEY, REINDEXED_KEY
+
+TYPEAHEAD_TYPES = ["client", "lead", "project", "account"]
+# Words of a name that get their own key ("north", "star", "foods" ...)
+TYPEAHEAD_MAX_WORDS = int(os.environ.get("TYPEAHEAD_MAX_WORDS", 8))
+# Keys examined per lookup before giving up on filling the result list,
+# bounds the cost for users who can see few of the matching names
+TYPEAHEAD_SCAN_LIMIT = int(os.environ.get("TYPEAHEAD_SCAN_LIMIT", 2000))
+
+PENDING_KEY = "pending_typeahead"
+
+_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def normalize(name: str) -> str:
+    return _SEPARATORS.sub(" ", name.lower()).strip()
+
+
+def name_keys(name: Optional[str]) -> List[Tuple[str, int]]:
+    """
+    (key, word position) for each word start of the name
+    """
+    words = normalize(name or "").split(" ")
+    if words == [""]:
+        return []
+    return [(" ".join(words[i:]), i) for i in range(min(len(words), TYPEAHEAD_MAX_WORDS))]
+
+
+class TenantNames:
+    def __init__(self):
+        # Sorted (key, word position, entity_type, entity_id)
+        self.keys: List[Tuple[str, int, str, int]] = []
+        # (entity_type, entity_id) -> (name, link, owner_created_by, owner_assigned_to)
+        self.entries: Dict[Tuple[str, int], tuple] = {}
+
+    def put(self, entity_type: str, entity_id: int, name, link, created_by, assigned_to):
+        ref = (entity_type, entity_id)
+        old = self.entries.get(ref)
+        if old is not None and old[0] == name:
+            self.entries[ref] = (name, link, created_by, assigned_to)
+            return
+        self.remove(entity_type, entity_id)
+        self.entries[ref] = (name, link, created_by, assigned_to)
+        for key, position in name_keys(name):
+            insort(self.keys, (key, position, entity_type, entity_id))
+
+    def remove(self, entity_type: str, entity_id: int):
+        old = self.entries.pop((entity_type, entity_id), None)
+        if old is None:
+            return
+        for key, position in name_keys(old[0]):
+            index = bisect_left(self.keys, (key, position, entity_type, entity_id))
+            if index < len(self.keys) and self.keys[index] == (key, position, entity_type, entity_id):
+                del self.keys[index]
+
+    def apply(self, entity_type: str, entity_id: int, row):
+        if row is None:
+            self.remove(entity_type, entity_id)
+        else:
+            self.put(entity_type, entity_id, *row)
+
+    def lookup(self, prefix: str, visible, limit: int) -> List[dict]:
+        results = []
+        seen = set()
+        # Whole-name matches ahead of matches on a later word
+        later_words = []
+        index = bisect_left(self.keys, (prefix,))
+        end = min(len(self.keys), index + TYPEAHEAD_SCAN_LIMIT)
+        while index < end and len(results) < limit:
+            key, position, entity_type, entity_id = self.keys[index]
+            index += 1
+            if not key.startswith(prefix):
+                break
+            ref = (entity_type, entity_id)
+            if ref in seen:
+                continue
+            name, link, created_by, assigned_to = self.entries[ref]
+            if not visible(created_by, assigned_to):
+                continue
+            seen.add(ref)
+            hit = {"type": entity_type, "id": entity_id, "name": name, "link": link}
+            (results if position == 0 else later_words).append(hit)
+        return (results + later_words)[:limit]
+
+
+class TypeaheadIndex:
+    def __init__(self):
+        self._tenants: Dict[int, TenantNames] = {}
+        # Changes committed while a tenant is loading, replayed onto the loaded names
+        self._loading: Dict[int, list] = {}
+        # Imports run in worker threads, lookups on the event loop
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def loaded(self, tenant_id: int) -> bool:
+        return tenant_id in self._tenants
+
+    @property
+    def loaded_tenants(self):
+        with self._lock:
+            return list(self._tenants) + list(self._loading)
+
+    def load(self, tenant_id: int):
+        """
+        Read the tenant's names from search_documents (blocking; run in a thread)
+        """
+        with self._lock:
+            if tenant_id in self._tenants or tenant_id in self._loading:
+                return
+            self._loading[tenant_id] = []
+        session = SessionLocal()
+        try:
+            rows = session.execute(select(
+                SearchDocument.entity_type, SearchDocument.entity_id, SearchDocument.name,
+                SearchDocument.link, SearchDocument.owner_created_by, SearchDocument.owner_assigned_to
+            ).where(
+                SearchDocument.tenant_id == tenant_id,
+                SearchDocument.entity_type.in_(TYPEAHEAD_TYPES)
+            )).all()
+        except Exception:
+            with self._lock:
+                self._loading.pop(tenant_id, None)
+            raise
+        finally:
+            session.close()
+
+        names = TenantNames()
+        keys = []
+        for entity_type, entity_id, name, link, created_by, assigned_to in rows:
+            names.entries[(entity_type, entity_id)] = (name, link, created_by, assigned_to)
+            keys.extend((key, position, entity_type, entity_id) for key, position in name_keys(name))
+        keys.sort()
+        names.keys = keys
+        with self._lock:
+            journal = self._loading.pop(tenant_id, None)
+            if journal is None:
+                # Invalidated while loading; the next lookup loads again
+                return
+            for change in journal:
+                names.apply(*change)
+            self._tenants[tenant_id] = names
+            self.loads += 1
+
+    def lookup(self, user, query: str, limit: int = 10) -> List[dict]:
+        prefix = normalize(query)
+        names = self._tenants.get(user.tenant_id)
+        if not prefix or names is None:
+            return []
+        if is_admin(user):
+            visible = lambda created_by, assigned_to: True
+        else:
+            visible = lambda created_by, assigned_to: user.id in (created_by, assigned_to)
+        with self._lock:
+            return names.lookup(prefix, visible, limit)
+
+    def apply(self, changes):
+        """
+        changes: (tenant_id, entity_type, entity_id, row or None for removed)
+        """
+        with self._lock:
+            for tenant_id, entity_type, entity_id, row in changes:
+                if tenant_id in self._loading:
+                    self._loading[tenant_id].append((entity_type, entity_id, row))
+                elif tenant_id in self._tenants:
+                    self._tenants[tenant_id].apply(entity_type, entity_id, row)
+
+    def invalidate(self, tenant_id: Optional[int] = None):
+        with self._lock:
+            if tenant_id is None:
+                self._tenants.clear()
+                self._loading.clear()
+            else:
+                self._tenants.pop(tenant_id, None)
+                self._loading.pop(tenant_id, None)
+
+
+typeahead = TypeaheadIndex()
+
+
+@sa_event.listens_for(Session, "before_commit")
+def _read_changes(session):
+    # Runs after search_index's own before_commit, so the documents are current
+    changed = session.info.pop(CHANGED_KEY, None)
+    reindexed = session.info.pop(REINDEXED_KEY, None)
+    loaded = typeahead.loaded_tenants
+    if not loaded or not (changed or reindexed):
+        return
+    pending = session.info.setdefault(PENDING_KEY, {"changes": [], "invalidate": set()})
+    pending["invalidate"].update(reindexed or ())
+    for tenant_id, entity_type, ids in changed or ():
+        if entity_type not in TYPEAHEAD_TYPES or tenant_id not in loaded:
+            continue
+        rows = session.execute(select(
+            SearchDocument.entity_id, SearchDocument.name, SearchDocument.link,
+            SearchDocument.owner_created_by, SearchDocument.owner_assigned_to
+        ).where(
+            SearchDocument.entity_type == entity_type,
+            SearchDocument.entity_id.in_(ids)
+        )).all()
+        found = set()
+        for entity_id, *row in rows:
+            found.add(entity_id)
+            pending["changes"].append((tenant_id, entity_type, entity_id, tuple(row)))
+        if isinstance(ids, (list, tuple, set)):
+            # Deleted, or no longer searchable (soft-deleted)
+            for entity_id in set(ids) - found:
+                pending["changes"].append((tenant_id, entity_type, entity_id, None))
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _apply_changes(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending:
+        return
+    typeahead.apply(pending["changes"])
+    for tenant_id in pending["invalidate"]:
+        typeahead.invalidate(tenant_id)
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _drop_changes(session):
+    session.info.pop(PENDING_KEY, None)
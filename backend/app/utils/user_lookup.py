@@ -0,0 +1,41 @@
+"""
+email -> user id resolution for admin per-rep filters.
+
+The /all endpoints take a `user_email` to show one rep's records. Resolving
+it once, from a per-tenant map loaded with a single query, lets those
+endpoints filter on indexed created_by / assigned_to columns instead of
+correlated subqueries against users. The map is dropped when a user is
+created or changes email.
+"""
+from typing import Dict, Optional
+from app.models import User
+
+
+class UserIdCache:
+    def __init__(self):
+        self._by_tenant: Dict[int, Dict[str, int]] = {}
+        self.loads = 0
+
+    def resolve(self, session, tenant_id: int, email: str) -> Optional[int]:
+        ids = self._by_tenant.get(tenant_id)
+        if ids is None:
+            ids = dict(session.query(User.email, User.id).filter(User.tenant_id == tenant_id).all())
+            self._by_tenant[tenant_id] = ids
+            self.loads += 1
+        if email in ids:
+            return ids[email]
+
+        # Unknown emails aren't cached, so a user added elsewhere is still found
+        user_id = session.query(User.id).filter(
+            User.tenant_id == tenant_id,
+            User.email == email
+        ).scalar()
+        if user_id is not None:
+            ids[email] = user_id
+        return user_id
+
+    def invalidate(self, tenant_id: int):
+        self._by_tenant.pop(tenant_id, None)
+
+
+user_ids = UserIdCache()
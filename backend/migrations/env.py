@@ -46,7 +46,8 @@ from app.models import Base  # ensure Base is imported from correct place
 # Force import all model classes to ensure registration
 from app.models import (
     User, Role, Client, Account, Lead, Project,
-    Interaction, ActivityLog, ChatMessage, Message
+    Interaction, ActivityLog, ChatMessage, Message, SearchDocument, PhoneIndexEntry,
+    BackfillCheckpoint
 )
 
 print("LOADED MODELS:", Base.metadata.tables.keys())
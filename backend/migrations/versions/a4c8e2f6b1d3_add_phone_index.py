@@ -0,0 +1,47 @@
+"""add phone index
+
+Revision ID: a4c8e2f6b1d3
+Revises: f3a9c1d7e5b2
+Create Date: 2026-10-19 21:40:53.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c8e2f6b1d3'
+down_revision: Union[str, None] = 'f3a9c1d7e5b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('phone_index',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tenant_id', sa.Integer(), nullable=False),
+    sa.Column('digits', sa.String(length=15), nullable=False),
+    sa.Column('phone', sa.String(length=32), nullable=True),
+    sa.Column('entity_type', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=True),
+    sa.Column('link', sa.String(length=255), nullable=True),
+    sa.Column('owner_created_by', sa.Integer(), nullable=True),
+    sa.Column('owner_assigned_to', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_phone_index_tenant_digits', 'phone_index', ['tenant_id', 'digits'], unique=False)
+    op.create_index('ix_phone_index_entity', 'phone_index', ['entity_type', 'entity_id'], unique=False)
+
+    # Existing numbers are indexed afterwards, in short batches, while the
+    # app keeps serving: python run_backfill.py phone_index
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_phone_index_entity', table_name='phone_index')
+    op.drop_index('ix_phone_index_tenant_digits', table_name='phone_index')
+    op.drop_table('phone_index')
@@ -0,0 +1,28 @@
+"""index pending follow-ups
+
+Revision ID: b7e4c2a19f53
+Revises: 6667a76887ac
+Create Date: 2026-10-19 15:02:11.482913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4c2a19f53'
+down_revision: Union[str, None] = '6667a76887ac'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('idx_interactions_followup_due', 'interactions', ['followup_status', 'follow_up'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_interactions_followup_due', table_name='interactions')
@@ -0,0 +1,34 @@
+"""index lead foreign keys
+
+Revision ID: c4d81f0e6a27
+Revises: b7e4c2a19f53
+Create Date: 2026-10-19 15:40:52.207341
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d81f0e6a27'
+down_revision: Union[str, None] = 'b7e4c2a19f53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_contacts_lead_id'), 'contacts', ['lead_id'], unique=False)
+    op.create_index(op.f('ix_projects_lead_id'), 'projects', ['lead_id'], unique=False)
+    op.create_index(op.f('ix_interactions_lead_id'), 'interactions', ['lead_id'], unique=False)
+    op.create_index(op.f('ix_chat_messages_lead_id'), 'chat_messages', ['lead_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_chat_messages_lead_id'), table_name='chat_messages')
+    op.drop_index(op.f('ix_interactions_lead_id'), table_name='interactions')
+    op.drop_index(op.f('ix_projects_lead_id'), table_name='projects')
+    op.drop_index(op.f('ix_contacts_lead_id'), table_name='contacts')
@@ -0,0 +1,62 @@
+"""add interaction owner columns
+
+Revision ID: d9a0e3b5c812
+Revises: c4d81f0e6a27
+Create Date: 2026-10-19 16:21:07.530118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a0e3b5c812'
+down_revision: Union[str, None] = 'c4d81f0e6a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('interactions', sa.Column('owner_created_by', sa.Integer(), nullable=True))
+    op.add_column('interactions', sa.Column('owner_assigned_to', sa.Integer(), nullable=True))
+    op.create_foreign_key('interactions_owner_created_by_fkey', 'interactions', 'users', ['owner_created_by'], ['id'])
+    op.create_foreign_key('interactions_owner_assigned_to_fkey', 'interactions', 'users', ['owner_assigned_to'], ['id'])
+
+    # Copy the current owners of each interaction's client / lead / project
+    op.execute("""
+        UPDATE interactions SET
+            owner_created_by = (SELECT created_by FROM clients WHERE clients.id = interactions.client_id),
+            owner_assigned_to = (SELECT assigned_to FROM clients WHERE clients.id = interactions.client_id)
+        WHERE client_id IS NOT NULL
+    """)
+    op.execute("""
+        UPDATE interactions SET
+            owner_created_by = (SELECT created_by FROM leads WHERE leads.id = interactions.lead_id),
+            owner_assigned_to = (SELECT assigned_to FROM leads WHERE leads.id = interactions.lead_id)
+        WHERE lead_id IS NOT NULL
+    """)
+    op.execute("""
+        UPDATE interactions SET
+            owner_created_by = (SELECT created_by FROM projects WHERE projects.id = interactions.project_id)
+        WHERE project_id IS NOT NULL
+    """)
+
+    op.create_index(op.f('ix_interactions_owner_created_by'), 'interactions', ['owner_created_by'], unique=False)
+    op.create_index(op.f('ix_interactions_owner_assigned_to'), 'interactions', ['owner_assigned_to'], unique=False)
+    op.create_index(op.f('ix_interactions_client_id'), 'interactions', ['client_id'], unique=False)
+    op.create_index(op.f('ix_interactions_project_id'), 'interactions', ['project_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_interactions_project_id'), table_name='interactions')
+    op.drop_index(op.f('ix_interactions_client_id'), table_name='interactions')
+    op.drop_index(op.f('ix_interactions_owner_assigned_to'), table_name='interactions')
+    op.drop_index(op.f('ix_interactions_owner_created_by'), table_name='interactions')
+    op.drop_constraint('interactions_owner_assigned_to_fkey', 'interactions', type_='foreignkey')
+    op.drop_constraint('interactions_owner_created_by_fkey', 'interactions', type_='foreignkey')
+    op.drop_column('interactions', 'owner_assigned_to')
+    op.drop_column('interactions', 'owner_created_by')
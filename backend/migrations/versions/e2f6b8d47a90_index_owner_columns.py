@@ -0,0 +1,38 @@
+"""index owner columns
+
+Revision ID: e2f6b8d47a90
+Revises: d9a0e3b5c812
+Create Date: 2026-10-19 16:58:44.019273
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2f6b8d47a90'
+down_revision: Union[str, None] = 'd9a0e3b5c812'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_clients_created_by'), 'clients', ['created_by'], unique=False)
+    op.create_index(op.f('ix_clients_assigned_to'), 'clients', ['assigned_to'], unique=False)
+    op.create_index(op.f('ix_leads_created_by'), 'leads', ['created_by'], unique=False)
+    op.create_index(op.f('ix_leads_assigned_to'), 'leads', ['assigned_to'], unique=False)
+    op.create_index(op.f('ix_projects_client_id'), 'projects', ['client_id'], unique=False)
+    op.create_index(op.f('ix_projects_created_by'), 'projects', ['created_by'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_projects_created_by'), table_name='projects')
+    op.drop_index(op.f('ix_projects_client_id'), table_name='projects')
+    op.drop_index(op.f('ix_leads_assigned_to'), table_name='leads')
+    op.drop_index(op.f('ix_leads_created_by'), table_name='leads')
+    op.drop_index(op.f('ix_clients_assigned_to'), table_name='clients')
+    op.drop_index(op.f('ix_clients_created_by'), table_name='clients')
@@ -0,0 +1,58 @@
+"""add search documents
+
+Revision ID: f3a9c1d7e5b2
+Revises: e2f6b8d47a90
+Create Date: 2026-10-19 18:12:07.402915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models import SEARCH_DOCUMENT_TSVECTOR, SEARCH_DOCUMENT_GIN, SEARCH_DOCUMENT_FTS5
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9c1d7e5b2'
+down_revision: Union[str, None] = 'e2f6b8d47a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('search_documents',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tenant_id', sa.Integer(), nullable=False),
+    sa.Column('entity_type', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=True),
+    sa.Column('body', sa.Text(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('link', sa.String(length=255), nullable=True),
+    sa.Column('owner_created_by', sa.Integer(), nullable=True),
+    sa.Column('owner_assigned_to', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('entity_type', 'entity_id', name='uq_search_documents_entity')
+    )
+    op.create_index(op.f('ix_search_documents_tenant_id'), 'search_documents', ['tenant_id'], unique=False)
+
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute(SEARCH_DOCUMENT_TSVECTOR)
+        op.execute(SEARCH_DOCUMENT_GIN)
+    elif bind.dialect.name == "sqlite":
+        for statement in SEARCH_DOCUMENT_FTS5:
+            op.execute(statement)
+
+    # Existing records are indexed afterwards, in short batches, while the
+    # app keeps serving: python run_backfill.py search_index
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("DROP TABLE IF EXISTS search_documents_fts")
+    op.drop_index(op.f('ix_search_documents_tenant_id'), table_name='search_documents')
+    op.drop_table('search_documents')
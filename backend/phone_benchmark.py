@@ -0,0 +1,64 @@
+"""
+Microbenchmark: per-value phone cleaning vs the batch functions.
+
+    python phone_benchmark.py [rows]
+
+Generates numbers in the formats imports see, checks both paths agree, and
+prints rows/second for each.
+"""
+import random
+import sys
+import time
+import pandas as pd
+from app.utils.phone_utils import (
+    clean_phone_number, format_phone_display, validate_phone_number,
+    clean_phone_numbers, format_phones_display, validate_phone_numbers,
+)
+
+FORMATS = [
+    "({a}) {b}-{c}", "{a}-{b}-{c}", "{a}.{b}.{c}", "{a}{b}{c}", "+1 {a} {b} {c}",
+    "1-{a}-{b}-{c}", "{b}-{c}", "+44 20 {b} {c}", "{a} {b} {c} x12", "n/a", "",
+]
+
+
+def sample(rows: int):
+    random.seed(7)
+    values = []
+    for _ in range(rows):
+        pattern = random.choice(FORMATS)
+        values.append(pattern.format(
+            a=random.randint(200, 999), b=random.randint(200, 999), c=f"{random.randint(0, 9999):04d}"
+        ))
+    return values
+
+
+def timed(label: str, rows: int, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:9.1f} ms {rows / elapsed:14,.0f} rows/s")
+    return result
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    values = sample(rows)
+    series = pd.Series(values, dtype="string")
+    print(f"{rows:,} phone numbers\n")
+
+    for name, single, batch in [
+        ("clean", clean_phone_number, clean_phone_numbers),
+        ("format", format_phone_display, format_phones_display),
+        ("validate", validate_phone_number, validate_phone_numbers),
+    ]:
+        expected = timed(f"{name} (per value)", rows, lambda: [single(value) for value in values])
+        actual = timed(f"{name} (batch)", rows, lambda: batch(series))
+        actual = [None if pd.isna(value) else value for value in actual]
+        if actual != expected:
+            mismatches = sum(a != b for a, b in zip(actual, expected))
+            raise SystemExit(f"{name}: {mismatches} values differ between per-value and batch")
+        print()
+
+
+if __name__ == "__main__":
+    main()
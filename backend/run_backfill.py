@@ -0,0 +1,55 @@
+"""
+Run batched data backfills against the configured database.
+
+    python run_backfill.py --list
+    python run_backfill.py phones                    # every phones.* backfill
+    python run_backfill.py phone_index.contacts --batch-size 500 --pause 0.5
+    python run_backfill.py phones.leads --max-batches 10
+    python run_backfill.py phones.leads --restart    # from the first row again
+    python run_backfill.py search_index phone_index  # after adding those tables
+
+Migrations that add derived tables (search_documents, phone_index) only
+create them; run the matching backfill after upgrading to fill them on a
+live database.
+
+Progress is checkpointed per batch; rerunning a stopped or failed backfill
+resumes where it left off.
+"""
+import argparse
+import sys
+from app.utils.backfill import BACKFILLS, BackfillError, backfill_status, matching, run_backfill
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run batched data backfills")
+    parser.add_argument("names", nargs="*", help="backfill names or prefixes (e.g. phones)")
+    parser.add_argument("--list", action="store_true", help="show every backfill and its progress")
+    parser.add_argument("--batch-size", type=int, help="rows per transaction")
+    parser.add_argument("--pause", type=float, help="seconds to sleep between batches")
+    parser.add_argument("--max-batches", type=int, help="stop after this many batches")
+    parser.add_argument("--restart", action="store_true", help="discard the checkpoint and start over")
+    args = parser.parse_args()
+
+    if args.list or not args.names:
+        for status in backfill_status():
+            print(f"{status['name']:<28} {status['status']:<10} {status['processed']:>10} rows "
+                  f"{status['changed']:>10} changed  {BACKFILLS[status['name']].description}")
+        return
+
+    names = []
+    for pattern in args.names:
+        found = matching(pattern)
+        if not found:
+            sys.exit(f"Unknown backfill: {pattern}")
+        names.extend(name for name in found if name not in names)
+
+    for name in names:
+        try:
+            run_backfill(name, batch_size=args.batch_size, pause=args.pause,
+                         max_batches=args.max_batches, restart=args.restart)
+        except BackfillError as e:
+            sys.exit(str(e))
+
+
+if __name__ == "__main__":
+    main()
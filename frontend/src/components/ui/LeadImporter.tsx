@@ -10,25 +10,57 @@ interface User {
 }
 
 interface ImportResult {
+  status?: string;
   message: string;
   successful_imports: number;
   failed_imports: number;
+  updated_records?: number;
+  duplicate_count?: number;
   failures: Array<{
     row: number;
-    plant_name: string;
+    name: string;
     error: string;
   }>;
 }
 
+interface ImportJob extends Partial<ImportResult> {
+  job_id: string;
+  status: 'queued' | 'running' | 'completed' | 'failed' | 'cancelled';
+  total_rows: number | null;
+  processed_rows: number;
+  eta_seconds: number | null;
+  error: string | null;
+}
+
+interface DryRunReport {
+  total_rows: number;
+  rows_checked: number;
+  complete: boolean;
+  valid_rows: number;
+  error_counts: Record<string, number>;
+}
+
+const ISSUE_LABELS: Record<string, string> = {
+  missing_required: 'Missing plant name (row will be skipped)',
+  invalid_email: 'Invalid email (left empty)',
+  invalid_phone: 'Invalid phone (left empty)',
+  duplicate: 'Matches an existing lead/client',
+};
+
+const JOB_POLL_INTERVAL_MS = 1000;
+
 export default function LeadImporter() {
   const { token } = useAuth();
   const [users, setUsers] = useState<User[]>([]);
   const [selectedUser, setSelectedUser] = useState<string>('');
+  const [duplicatePolicy, setDuplicatePolicy] = useState<string>('skip');
   const [file, setFile] = useState<File | null>(null);
   const [isUploading, setIsUploading] = useState(false);
   const [importResult, setImportResult] = useState<ImportResult | null>(null);
   const [error, setError] = useState<string>('');
   const [showModal, setShowModal] = useState(false);
+  const [job, setJob] = useState<ImportJob | null>(null);
+  const [validation, setValidation] = useState<DryRunReport | null>(null);
 
   // Load users on component mount
   useEffect(() => {
@@ -61,6 +93,33 @@ export default function LeadImporter() {
       
       setFile(selectedFile);
       setError('');
+      validateFile(selectedFile);
+    }
+  };
+
+  // Dry run: full validation without writing, so problems show up before importing
+  const validateFile = async (selectedFile: File) => {
+    setValidation(null);
+    try {
+      const formData = new FormData();
+      formData.append('file', selectedFile);
+      formData.append('dry_run', 'true');
+
+      const res = await fetch('https://pathsix-backend.fly.dev/api/import/leads', {
+        method: 'POST',
+        headers: {
+          Authorization: `Bearer ${token}`,
+        },
+        body: formData,
+      });
+      const data = await res.json();
+      if (!res.ok) {
+        setError(data.error || 'File validation failed');
+        return;
+      }
+      setValidation(data);
+    } catch (err) {
+      console.error('Validation error:', err);
     }
   };
 
@@ -78,6 +137,7 @@ export default function LeadImporter() {
       const formData = new FormData();
       formData.append('file', file);
       formData.append('assigned_user_email', selectedUser);
+      formData.append('duplicate_policy', duplicatePolicy);
 
       // Updated route to avoid conflicts
       const res = await fetch('https://pathsix-backend.fly.dev/api/import/leads', {
@@ -100,20 +160,50 @@ export default function LeadImporter() {
         }
       }
 
-      const data = await res.json();
-      setImportResult(data);
+      const { job_id } = await res.json();
       setFile(null);
+      setValidation(null);
       setSelectedUser('');
       
       // Reset file input
       const fileInput = document.getElementById('file-input') as HTMLInputElement;
       if (fileInput) fileInput.value = '';
 
+      // The import runs as a background job; poll until it finishes
+      let current: ImportJob;
+      do {
+        await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        const jobRes = await apiFetch(`/import/jobs/${job_id}`, {
+          headers: { Authorization: `Bearer ${token}` },
+        });
+        if (!jobRes.ok) throw new Error('Lost track of the import job');
+        current = await jobRes.json();
+        setJob(current);
+      } while (current.status === 'queued' || current.status === 'running');
+
+      if (current.status === 'failed') {
+        throw new Error(current.error || 'Import failed');
+      }
+      setImportResult(current as ImportResult);
+
     } catch (err: any) {
       console.error('Import error:', err);
       setError(err.message || 'Import failed');
     } finally {
       setIsUploading(false);
+      setJob(null);
+    }
+  };
+
+  const cancelImport = async () => {
+    if (!job) return;
+    try {
+      await apiFetch(`/import/jobs/${job.job_id}/cancel`, {
+        method: 'POST',
+        headers: { Authorization: `Bearer ${token}` },
+      });
+    } catch (err) {
+      setError('Failed to cancel import');
     }
   };
 
@@ -198,6 +288,23 @@ export default function LeadImporter() {
           </select>
         </div>
 
+        {/* Duplicate Handling */}
+        <div>
+          <label htmlFor="duplicate-policy" className="block text-sm font-medium text-gray-700 mb-2">
+            When a row matches an existing lead or client:
+          </label>
+          <select
+            id="duplicate-policy"
+            value={duplicatePolicy}
+            onChange={(e) => setDuplicatePolicy(e.target.value)}
+            className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent"
+          >
+            <option value="skip">Skip the row</option>
+            <option value="update">Update the existing lead</option>
+            <option value="flag">Import it and flag as a possible duplicate</option>
+          </select>
+        </div>
+
         {/* File Upload */}
         <div>
           <label htmlFor="file-input" className="block text-sm font-medium text-gray-700 mb-2">
@@ -215,6 +322,21 @@ export default function LeadImporter() {
               Selected: {file.name} ({(file.size / 1024).toFixed(1)} KB)
             </p>
           )}
+          {file && validation && (
+            <div className="mt-2 text-sm text-gray-700">
+              <p>
+                {validation.valid_rows} of {validation.rows_checked} rows look importable
+                {!validation.complete && ` (checked ${validation.rows_checked} of ${validation.total_rows})`}
+              </p>
+              {Object.entries(validation.error_counts)
+                .filter(([, count]) => count > 0)
+                .map(([category, count]) => (
+                  <p key={category} className="text-amber-700">
+                    ⚠️ {ISSUE_LABELS[category] || category}: {count}
+                  </p>
+                ))}
+            </div>
+          )}
         </div>
 
         {/* Import Button */}
@@ -226,7 +348,11 @@ export default function LeadImporter() {
           {isUploading ? (
             <>
               <div className="animate-spin rounded-full h-4 w-4 border-2 border-white border-t-transparent"></div>
-              Importing...
+              {job && job.total_rows
+                ? `Importing... ${job.processed_rows} / ${job.total_rows} rows${
+                    job.eta_seconds != null ? ` (~${Math.ceil(job.eta_seconds)}s left)` : ''
+                  }`
+                : 'Importing...'}
             </>
           ) : (
             <>
@@ -235,6 +361,15 @@ export default function LeadImporter() {
             </>
           )}
         </button>
+
+        {isUploading && job && (
+          <button
+            onClick={cancelImport}
+            className="w-full px-4 py-2 bg-gray-100 text-gray-700 rounded-md hover:bg-gray-200 transition-colors"
+          >
+            Cancel Import
+          </button>
+        )}
       </div>
 
       {/* Import Results */}
@@ -242,11 +377,19 @@ export default function LeadImporter() {
         <div className="mt-6 p-4 bg-green-50 border border-green-200 rounded-md">
           <div className="flex items-center gap-2 mb-2">
             <CheckCircle className="h-5 w-5 text-green-500" />
-            <h4 className="font-medium text-green-900">Import Completed</h4>
+            <h4 className="font-medium text-green-900">
+              {importResult.status === 'cancelled' ? 'Import Cancelled' : 'Import Completed'}
+            </h4>
           </div>
           <p className="text-green-800 mb-2">{importResult.message}</p>
           <div className="text-sm text-green-700">
             <p>✅ Successfully imported: {importResult.successful_imports} leads</p>
+            {!!importResult.updated_records && (
+              <p>🔄 Existing leads updated: {importResult.updated_records}</p>
+            )}
+            {!!importResult.duplicate_count && (
+              <p>⚠️ Duplicates found: {importResult.duplicate_count}</p>
+            )}
             {importResult.failed_imports > 0 && (
               <p>❌ Failed imports: {importResult.failed_imports}</p>
             )}
@@ -284,7 +427,7 @@ export default function LeadImporter() {
                 {importResult.failures.map((failure, index) => (
                   <div key={index} className="p-3 bg-red-50 border border-red-200 rounded">
                     <p className="font-medium text-red-900">
-                      Row {failure.row}: {failure.plant_name}
+                      Row {failure.row}: {failure.name}
                     </p>
                     <p className="text-sm text-red-700">{failure.error}</p>
                   </div>
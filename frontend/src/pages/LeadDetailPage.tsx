@@ -157,40 +157,14 @@ export default function LeadDetailPage() {
 
     if (!confirmed) return;
 
-    const res = await apiFetch("/clients/", {
+    const res = await apiFetch(`/leads/${lead.id}/convert`, {
       method: "POST",
       headers: { Authorization: `Bearer ${token}` },
-      body: JSON.stringify({
-        name: lead.name,
-        email: lead.email,
-        phone: lead.phone,
-        address: lead.address,
-        contact_person: lead.contact_person,
-        city: lead.city,
-        state: lead.state,
-        zip: lead.zip,
-        notes: lead.notes,
-      }),
     });
 
     if (res.ok) {
-      const newClient = await res.json();
-
-      await apiFetch("/interactions/transfer", {
-        method: "POST",
-        headers: { Authorization: `Bearer ${token}` },
-        body: JSON.stringify({
-          from_lead_id: lead.id,
-          to_client_id: newClient.id,
-        }),
-      });
-
-      await apiFetch(`/leads/${lead.id}`, {
-        method: "DELETE",
-        headers: { Authorization: `Bearer ${token}` },
-      });
-
-      window.location.href = `/clients/${newClient.id}`;
+      const { client_id } = await res.json();
+      window.location.href = `/clients/${client_id}`;
     } else {
       alert("Failed to convert lead to account.");
     }